@@ -1,24 +1,31 @@
 #!/usr/bin/env python3
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import metrics
+import profiling
+import serialization
 import os
 from database_service import DatabaseService
-from minio import Minio
-import json
+import query_log
+from pagination import decode_cursor
+import storage
 from datetime import datetime
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'backend-api')
+serialization.install(app)
 
 # Initialize services
 db_service = DatabaseService()
+query_log.configure(db_service.redis_client).register(app)
 
 # MinIO client
-minio_client = Minio(
+minio_client = storage.get_client(
     os.getenv('MINIO_ENDPOINT', 'localhost:9898'),
-    access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
-    secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin'),
-    secure=False
+    os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
+    os.getenv('MINIO_SECRET_KEY', 'minioadmin')
 )
 
 @app.route('/health')
@@ -77,9 +84,43 @@ def create_user_story(project_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def ndjson_export(project_id=None):
+    """Stream executions as newline-delimited JSON, resumable with ?cursor=
+
+    The last line is {"complete": true, ...} after the final row, or
+    {"complete": false, "error": ...} if the export failed part way; both carry
+    the next_cursor to resume from.
+    """
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+        rows = db_service.iter_executions(project_id, cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def lines():
+        count = 0
+        next_cursor = request.args.get('cursor')
+        try:
+            for row in rows:
+                yield serialization.dumps(row, default=str) + b'\n'
+                count += 1
+                next_cursor = row['cursor']
+        except Exception as e:
+            yield serialization.dumps({'complete': False, 'error': str(e), 'rows': count, 'next_cursor': next_cursor}) + b'\n'
+            return
+        yield serialization.dumps({'complete': True, 'rows': count, 'next_cursor': next_cursor}) + b'\n'
+    
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
 # Test Executions API
+@app.route('/api/executions', methods=['GET'])
+def export_executions():
+    return ndjson_export()
+
 @app.route('/api/projects/<project_id>/executions', methods=['GET'])
 def get_executions(project_id):
+    if request.args.get('format') == 'ndjson':
+        return ndjson_export(project_id)
     try:
         executions = db_service.get_project_executions(project_id)
         return jsonify(executions)
@@ -157,4 +198,4 @@ def upload_file():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8880, debug=True)
+    app.run(host='0.0.0.0', port=8880, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Trigger-maintained row counters for the dashboard statistics.
+
+Statement-level triggers append the number of inserted or deleted rows to
+entity_counter_deltas instead of updating a shared row, so concurrent writers
+to a table never wait on each other. A counter is its base value in
+entity_counters plus the pending deltas; fold() moves the deltas into the base
+every COUNTER_FOLD_INTERVAL seconds so reads stay a handful of rows.
+
+reconcile() recounts each table with COUNT(*) to repair any drift, so it is an
+occasional job: daily by default (COUNTER_RECONCILE_INTERVAL), right after the
+partition job detaches partitions, or on demand with `python counters.py`.
+
+This module holds the only definition of the tables, function and triggers;
+install() creates whatever is missing without touching existing triggers.
+"""
+import os
+import logging
+import threading
+from psycopg2 import errors, extensions
+
+logger = logging.getLogger(__name__)
+
+# entity name -> counted table
+COUNTED_TABLES = {
+    'projects': 'projects',
+    'test_cases': 'test_cases',
+    'executions': 'test_executions',
+}
+
+FOLD_INTERVAL = int(os.getenv('COUNTER_FOLD_INTERVAL', '5'))
+RECONCILE_INTERVAL = int(os.getenv('COUNTER_RECONCILE_INTERVAL', str(24 * 3600)))
+
+SNAPSHOT_QUERY = """
+    SELECT c.entity, (c.value + COALESCE(SUM(d.delta), 0))::bigint
+    FROM entity_counters c LEFT JOIN entity_counter_deltas d ON d.entity = c.entity
+    GROUP BY c.entity, c.value
+"""
+
+COUNTER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION bump_entity_counter() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            INSERT INTO entity_counter_deltas (entity, delta)
+            SELECT TG_ARGV[0], n FROM (SELECT COUNT(*) AS n FROM new_rows) c WHERE n > 0;
+        ELSIF TG_OP = 'DELETE' THEN
+            INSERT INTO entity_counter_deltas (entity, delta)
+            SELECT TG_ARGV[0], -n FROM (SELECT COUNT(*) AS n FROM old_rows) c WHERE n > 0;
+        ELSIF TG_OP = 'TRUNCATE' THEN
+            -- TRUNCATE holds an exclusive lock, so no writer is adding deltas
+            DELETE FROM entity_counter_deltas WHERE entity = TG_ARGV[0];
+            UPDATE entity_counters SET value = 0 WHERE entity = TG_ARGV[0];
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+TRIGGERS = {
+    'insert': "AFTER INSERT ON {table} REFERENCING NEW TABLE AS new_rows",
+    'delete': "AFTER DELETE ON {table} REFERENCING OLD TABLE AS old_rows",
+    'truncate': "AFTER TRUNCATE ON {table}",
+}
+
+# fold() and reconcile() run from different background jobs
+_maintenance_lock = threading.Lock()
+
+
+def install(conn):
+    """Create the counter tables, function and any missing triggers, seeding missing counters"""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS entity_counters (
+                entity VARCHAR(64) PRIMARY KEY,
+                value BIGINT NOT NULL DEFAULT 0,
+                reconciled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS entity_counter_deltas (
+                entity VARCHAR(64) NOT NULL,
+                delta BIGINT NOT NULL
+            )
+        """)
+        cur.execute(COUNTER_FUNCTION)
+        for entity, table in COUNTED_TABLES.items():
+            # CREATE TRIGGER locks the table, so existing triggers are left alone
+            cur.execute("SELECT tgname FROM pg_trigger WHERE tgrelid = %s::regclass", (table,))
+            existing = {row[0] for row in cur.fetchall()}
+            for event, clause in TRIGGERS.items():
+                name = f"trg_count_{table}_{event}"
+                if name not in existing:
+                    cur.execute(f"""
+                        CREATE TRIGGER {name} {clause.format(table=table)}
+                        FOR EACH STATEMENT EXECUTE FUNCTION bump_entity_counter('{entity}')
+                    """)
+            cur.execute(f"""
+                INSERT INTO entity_counters (entity, value)
+                SELECT %s, COUNT(*) FROM {table}
+                ON CONFLICT (entity) DO NOTHING
+            """, (entity,))
+    conn.commit()
+
+
+def snapshot(conn):
+    """Current counters as {entity: value}"""
+    with conn.cursor() as cur:
+        cur.execute(SNAPSHOT_QUERY)
+        values = dict(cur.fetchall())
+    return {entity: values.get(entity, 0) for entity in COUNTED_TABLES}
+
+
+def fold(conn):
+    """Move pending deltas into the base counters; returns the number folded"""
+    with _maintenance_lock, conn.cursor() as cur:
+        # One statement, one snapshot: only the deltas it deletes are added
+        cur.execute("""
+            WITH folded AS (DELETE FROM entity_counter_deltas RETURNING entity, delta),
+                 sums AS (SELECT entity, SUM(delta) AS delta, COUNT(*) AS n FROM folded GROUP BY entity),
+                 updated AS (
+                     UPDATE entity_counters c SET value = c.value + s.delta
+                     FROM sums s WHERE c.entity = s.entity
+                 )
+            SELECT COALESCE(SUM(n), 0) FROM sums
+        """)
+        folded = cur.fetchone()[0]
+        conn.commit()
+    return folded
+
+
+def reconcile(conn):
+    """Recount every table and correct counters that drifted; returns the corrections"""
+    corrected = {}
+    with _maintenance_lock:
+        for entity, table in COUNTED_TABLES.items():
+            # The row lock is taken first and the count, the folded deltas and
+            # the update share its snapshot: deltas committed later stay pending
+            conn.set_isolation_level(extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT value FROM entity_counters WHERE entity = %s FOR UPDATE", (entity,))
+                    row = cur.fetchone()
+                    if row is None:
+                        conn.rollback()
+                        continue
+                    cur.execute("DELETE FROM entity_counter_deltas WHERE entity = %s RETURNING delta", (entity,))
+                    previous = row[0] + sum(delta for delta, in cur.fetchall())
+                    cur.execute(f"SELECT COUNT(*) FROM {table}")
+                    total = cur.fetchone()[0]
+                    cur.execute("""
+                        UPDATE entity_counters SET value = %s, reconciled_at = CURRENT_TIMESTAMP
+                        WHERE entity = %s
+                    """, (total, entity))
+                conn.commit()
+            except (errors.SerializationFailure, errors.DeadlockDetected) as e:
+                # Another reconciliation got there first
+                conn.rollback()
+                logger.info(f"Counter reconciliation of {entity} skipped: {e}")
+                continue
+            finally:
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_DEFAULT)
+            if total != previous:
+                corrected[entity] = total - previous
+    if corrected:
+        logger.warning(f"Counter drift corrected: {corrected}")
+    return corrected
+
+
+def run_fold(get_db):
+    conn = get_db()
+    try:
+        return fold(conn)
+    finally:
+        conn.close()
+
+
+def run_reconcile(get_db):
+    conn = get_db()
+    try:
+        return reconcile(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    import psycopg2
+    from config import DB_CONFIG
+
+    logging.basicConfig(level=logging.INFO)
+    print(run_reconcile(lambda: psycopg2.connect(**DB_CONFIG)))
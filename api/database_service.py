@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import psycopg2
-import redis
+import metrics
+import serialization
+from http_cache import bump_versions
 import json
 from datetime import datetime
 import uuid
+from pagination import keyset_condition, encode_cursor
+
+EXPORT_BATCH_SIZE = 1000
 
 class DatabaseService:
     def __init__(self):
@@ -14,11 +19,11 @@ class DatabaseService:
             'user': 'veritas_user',
             'password': 'veritas_pass'
         }
-        self.redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        self.redis_client = metrics.InstrumentedRedis(host='localhost', port=6379, db=0, decode_responses=True)
         self.init_database()
     
     def get_pg_connection(self):
-        return psycopg2.connect(**self.pg_config)
+        return psycopg2.connect(cursor_factory=metrics.TimedCursor, **self.pg_config)
     
     def init_database(self):
         try:
@@ -98,6 +103,7 @@ class DatabaseService:
         conn.commit()
         cursor.close()
         conn.close()
+        bump_versions(self.redis_client, 'projects')
         
         # Cache in Redis
         project_data = {
@@ -108,7 +114,7 @@ class DatabaseService:
             'status': 'active',
             'created_at': created_at.isoformat()
         }
-        self.redis_client.setex(f"project:{project_id}", 3600, json.dumps(project_data))
+        self.redis_client.setex(f"project:{project_id}", 3600, serialization.dumps(project_data))
         
         return project_data
     
@@ -116,7 +122,7 @@ class DatabaseService:
         # Try Redis first
         cached_projects = self.redis_client.get("projects:all")
         if cached_projects:
-            return json.loads(cached_projects)
+            return serialization.loads(cached_projects)
         
         # Fallback to PostgreSQL
         conn = self.get_pg_connection()
@@ -139,7 +145,7 @@ class DatabaseService:
         conn.close()
         
         # Cache for 5 minutes
-        self.redis_client.setex("projects:all", 300, json.dumps(projects))
+        self.redis_client.setex("projects:all", 300, serialization.dumps(projects))
         return projects
     
     # Test execution operations
@@ -156,6 +162,7 @@ class DatabaseService:
         conn.commit()
         cursor.close()
         conn.close()
+        bump_versions(self.redis_client, 'executions')
         
         return {
             'id': str(execution_id),
@@ -189,6 +196,45 @@ class DatabaseService:
         conn.close()
         return executions
     
+    def iter_executions(self, project_id=None, cursor=None):
+        """Executions oldest first through a server-side cursor.
+        
+        Each row carries a 'cursor' token; passing it back resumes the export
+        right after that row. Memory use is bounded by EXPORT_BATCH_SIZE.
+        A bad cursor or project id raises ValueError here, before any row is read.
+        """
+        keyset, params = keyset_condition(cursor, 'start_time', 'id', descending=False, id_type=uuid.UUID)
+        if project_id:
+            keyset += " AND project_id = %s"
+            params.append(str(uuid.UUID(project_id)))
+        return self._iter_executions(keyset, params)
+    
+    def _iter_executions(self, keyset, params):
+        conn = self.get_pg_connection()
+        try:
+            with conn.cursor(name=f"executions_export_{uuid.uuid4().hex}") as cursor_:
+                cursor_.itersize = EXPORT_BATCH_SIZE
+                cursor_.execute(f"""
+                    SELECT id, project_id, execution_name, status, start_time, end_time, results, report_url
+                    FROM test_executions WHERE {keyset}
+                    ORDER BY start_time, id
+                """, params)
+                
+                for row in cursor_:
+                    yield {
+                        'id': str(row[0]),
+                        'project_id': str(row[1]) if row[1] else None,
+                        'name': row[2],
+                        'status': row[3],
+                        'start_time': row[4].isoformat() if row[4] else None,
+                        'end_time': row[5].isoformat() if row[5] else None,
+                        'results': row[6],
+                        'report_url': row[7],
+                        'cursor': encode_cursor(row[4], row[0])
+                    }
+        finally:
+            conn.close()
+    
     # User stories operations
     def create_user_story(self, project_id, story_data):
         conn = self.get_pg_connection()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Per-process PostgreSQL connection pool for the unified service.
+
+connect() hands out a pooled connection whose close() returns it to the pool,
+so existing get_db()/conn.close() call sites keep working unchanged. The pool
+belongs to the process that created it: after a fork the child starts a fresh
+one and never touches the sockets inherited from the parent.
+"""
+import os
+import time
+import weakref
+import threading
+from psycopg2 import pool, extensions
+import metrics
+from config import DB_CONFIG
+
+POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+_opened = weakref.WeakSet()
+
+
+class _TrackedConnection(extensions.connection):
+    """Connection remembered so a forked child can detach it from its socket"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = metrics.TimedCursor
+        _opened.add(self)
+
+
+class PooledConnection:
+    """psycopg2 connection proxy whose close() gives the connection back"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            release(conn)
+
+    def __del__(self):
+        # Error paths that never reach close() must not leak a pool slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _create(minconn, maxconn, config):
+    global _pool, _pool_pid, _slots
+    _pool = pool.ThreadedConnectionPool(minconn, maxconn, connection_factory=_TrackedConnection, **config)
+    _pool_pid = os.getpid()
+    _slots = threading.BoundedSemaphore(maxconn)
+    metrics.DB_POOL_SIZE.set(maxconn)
+    return _pool
+
+
+def init_pool(minconn=POOL_MIN, maxconn=POOL_MAX, **config):
+    """(Re)create the pool for the current process"""
+    with _lock:
+        return _create(minconn, maxconn, config or DB_CONFIG)
+
+
+def _current_pool():
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _create(POOL_MIN, POOL_MAX, DB_CONFIG)
+    return _pool
+
+
+def connect():
+    """Check out a connection, waiting up to DB_POOL_TIMEOUT for a free one"""
+    current = _current_pool()
+    slots = _slots
+    started = time.perf_counter()
+    metrics.DB_POOL_WAITING.inc()
+    try:
+        acquired = slots.acquire(timeout=CHECKOUT_TIMEOUT)
+    finally:
+        metrics.DB_POOL_WAITING.dec()
+        metrics.DB_POOL_WAIT.observe(time.perf_counter() - started)
+    if not acquired:
+        raise pool.PoolError(f"No database connection available after {CHECKOUT_TIMEOUT}s")
+    try:
+        conn = current.getconn()
+    except Exception:
+        slots.release()
+        raise
+    metrics.DB_POOL_IN_USE.inc()
+    return PooledConnection(conn)
+
+
+def release(conn):
+    if _pool_pid != os.getpid():
+        # Checked out before a fork; belongs to the parent's pool
+        return
+    broken = conn.closed
+    if not broken and conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+    try:
+        _pool.putconn(conn, close=broken)
+    finally:
+        _slots.release()
+        metrics.DB_POOL_IN_USE.dec()
+
+
+def reset():
+    """Start over after fork without disturbing the parent's connections.
+
+    Inherited connections still share their socket with the parent; closing
+    or deallocating them would send a terminate message on it, so their file
+    descriptors are pointed at /dev/null first.
+    """
+    global _pool, _pool_pid, _slots, _lock
+    devnull = os.open(os.devnull, os.O_RDWR)
+    try:
+        for conn in list(_opened):
+            if not conn.closed:
+                os.dup2(devnull, conn.fileno())
+    finally:
+        os.close(devnull)
+    _opened.clear()
+    _pool = None
+    _pool_pid = None
+    _slots = None
+    # The parent may have held the lock while forking
+    _lock = threading.Lock()
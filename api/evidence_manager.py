@@ -1,18 +1,26 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import os
 import logging
 from datetime import datetime
 import uuid
-import io
 import psycopg2
-import redis
+import metrics
+import profiling
+import serialization
+from health import HealthMonitor, database_probe
 import json
-from minio import Minio
+import storage
+import storage_index
+import mimetypes
+from retention import open_object
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'evidence-manager')
+serialization.install(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,11 +31,15 @@ def get_db():
         host='veritas-postgres',
         database='veritas_db', 
         user='veritas_user',
-        password='veritas_pass'
+        password='veritas_pass',
+        cursor_factory=metrics.TimedCursor
     )
 
+# Every put_bytes upload is recorded in storage_objects
+storage.set_index(storage_index.StorageIndex(get_db))
+
 def get_redis():
-    return redis.Redis(host='veritas-redis', port=6379, decode_responses=True)
+    return metrics.InstrumentedRedis(host='veritas-redis', port=6379, decode_responses=True)
 
 def get_config(key, default=None):
     try:
@@ -54,40 +66,28 @@ def get_config(key, default=None):
     
     return default
 
+_minio_client = None
+
 def get_minio():
-    endpoint = get_config('minio_endpoint', '172.21.48.1:9898')
-    access_key = get_config('minio_access_key', 'minioadmin')
-    secret_key = get_config('minio_secret_key', 'minioadmin123')
-    return Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=False)
+    global _minio_client
+    if _minio_client is None:
+        endpoint = get_config('minio_endpoint', '172.21.48.1:9898')
+        access_key = get_config('minio_access_key', 'minioadmin')
+        secret_key = get_config('minio_secret_key', 'minioadmin123')
+        _minio_client = storage.get_client(endpoint, access_key, secret_key)
+    return _minio_client
 
 @app.route('/')
 def index():
     with open('/app/templates/evidence_manager.html', 'r') as f:
         return f.read()
 
-@app.route('/health', methods=['GET'])
-def health():
-    status = {"service": "evidence-manager", "timestamp": datetime.utcnow().isoformat()}
-    
-    try:
-        get_db().cursor().execute("SELECT 1")
-        status["database"] = "healthy"
-    except Exception as e:
-        status["database"] = f"error: {str(e)}"
-    
-    try:
-        get_redis().ping()
-        status["cache"] = "healthy"
-    except Exception as e:
-        status["cache"] = f"error: {str(e)}"
-    
-    try:
-        get_minio().list_buckets()
-        status["storage"] = "healthy"
-    except Exception as e:
-        status["storage"] = f"error: {str(e)}"
-    
-    return jsonify(status)
+# Health checks (/health, /health/ready, /health/live) from background probes
+health_monitor = HealthMonitor('evidence-manager')
+health_monitor.add_check('database', database_probe(get_db))
+health_monitor.add_check('cache', get_redis().ping, critical=False)
+health_monitor.add_check('storage', lambda: get_minio().bucket_exists(get_config('minio_bucket', 'veritas-storage')))
+health_monitor.register(app)
 
 @app.route('/api/evidence', methods=['POST'])
 def upload_evidence():
@@ -105,12 +105,8 @@ def upload_evidence():
         object_name = f"evidence/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
         
         # Upload to MinIO
-        client = get_minio()
-        if not client.bucket_exists(bucket):
-            client.make_bucket(bucket)
-        
         content_bytes = content.encode('utf-8')
-        client.put_object(bucket, object_name, io.BytesIO(content_bytes), len(content_bytes))
+        storage.put_bytes(get_minio(), bucket, object_name, content_bytes)
         
         # Save to database
         evidence_id = str(uuid.uuid4())
@@ -136,6 +132,7 @@ def upload_evidence():
             "bucket": bucket,
             "object_path": object_name,
             "file_url": f"http://{endpoint}/{bucket}/{object_name}",
+            "download_url": f"/api/evidence/{evidence_id}/download",
             "console_url": f"http://localhost:9899/browser/{bucket}/{object_name}",
             "uploaded_at": datetime.utcnow().isoformat()
         })
@@ -143,6 +140,24 @@ def upload_evidence():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/evidence/<evidence_id>/download', methods=['GET'])
+def download_evidence(evidence_id):
+    """Evidence content, also once retention has moved it into an archive bundle"""
+    try:
+        with get_db() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT filename, minio_bucket, minio_object_path FROM evidence WHERE id = %s", (evidence_id,))
+                row = cur.fetchone()
+        if row is None:
+            return jsonify({"error": "Evidence not found"}), 404
+        stream = open_object(get_minio(), row[1], row[2], get_db)
+    except FileNotFoundError:
+        return jsonify({"error": "Evidence file is no longer in storage"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return Response(stream, mimetype=mimetypes.guess_type(row[0] or '')[0] or 'application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{row[0]}"'})
+
 @app.route('/api/reports', methods=['POST'])
 def generate_report():
     try:
@@ -160,12 +175,7 @@ def generate_report():
         object_name = f"reports/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
         
         # Upload to MinIO
-        client = get_minio()
-        if not client.bucket_exists(bucket):
-            client.make_bucket(bucket)
-        
-        content_bytes = report_content.encode('utf-8')
-        client.put_object(bucket, object_name, io.BytesIO(content_bytes), len(content_bytes), 'text/html')
+        storage.put_bytes(get_minio(), bucket, object_name, report_content, 'text/html')
         
         endpoint = get_config('minio_endpoint')
         return jsonify({
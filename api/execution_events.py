@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Live execution events for the /api/executions/stream server-sent events feed.
+
+Events are appended to a capped Redis stream (for Last-Event-ID resume) and
+published on a pub/sub channel. Each process keeps a single subscription to
+the channel and fans events out to in-memory subscriber queues, so clients
+only wait on their own queue; run the service with an async worker class
+(gevent) to serve many subscribers without a thread each. AsyncEventBroker
+does the same on an asyncio event loop for the async serving mode.
+"""
+import os
+import queue
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+import metrics
+import serialization
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'executions:events'
+STREAM_KEY = 'executions:events:log'
+STREAM_MAXLEN = int(os.getenv('EXECUTION_EVENTS_MAXLEN', '10000'))
+HEARTBEAT_INTERVAL = int(os.getenv('EXECUTION_EVENTS_HEARTBEAT', '15'))
+SUBSCRIBER_QUEUE_SIZE = 1000
+RETRY_MS = 3000
+
+
+def publish(redis_client, event_type, execution_id, project_id=None, **data):
+    """Record and broadcast an event; returns its id or None if Redis is unavailable"""
+    payload = serialization.dumps_str({
+        'execution_id': execution_id,
+        'project_id': project_id,
+        'timestamp': datetime.now().isoformat(),
+        **data
+    }, default=str)
+    try:
+        event_id = redis_client.xadd(
+            STREAM_KEY, {'type': event_type, 'data': payload},
+            maxlen=STREAM_MAXLEN, approximate=True
+        )
+        redis_client.publish(CHANNEL, serialization.dumps_str({'id': event_id, 'type': event_type, 'data': payload}))
+        return event_id
+    except Exception as e:
+        logger.warning(f"Could not publish {event_type} event for execution {execution_id}: {e}")
+        return None
+
+
+def _id_key(event_id):
+    ms, _, seq = event_id.partition('-')
+    return int(ms), int(seq or 0)
+
+
+def _matches(event, project_id):
+    if project_id is None:
+        return True
+    return str(serialization.loads(event['data']).get('project_id')) == str(project_id)
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {event['data']}\n\n"
+
+
+class Subscriber:
+    def __init__(self, queue_class=queue.Queue):
+        self.queue = queue_class(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when the client fell too far behind; it reconnects and resumes from the stream
+        self.overflowed = False
+
+
+class EventBroker:
+    def __init__(self, redis_client):
+        self.redis = redis_client
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        metrics.SSE_SUBSCRIBERS.inc()
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='execution-events', daemon=True)
+                self._listener.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+        metrics.SSE_SUBSCRIBERS.dec()
+        metrics.SSE_QUEUED.dec(subscriber.queue.qsize())
+
+    def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    self._dispatch(serialization.loads(message['data']))
+            except Exception as e:
+                logger.error(f"Execution event listener error: {e}")
+                time.sleep(1)
+            finally:
+                pubsub.close()
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+                metrics.SSE_QUEUED.inc()
+            except (queue.Full, asyncio.QueueFull):
+                if not subscriber.overflowed:
+                    metrics.SSE_OVERFLOWS.inc()
+                subscriber.overflowed = True
+
+    def replay(self, last_event_id, project_id=None):
+        """Events recorded after last_event_id, oldest first"""
+        events = []
+        for event_id, fields in self.redis.xrange(STREAM_KEY, min=f'({last_event_id}', max='+'):
+            event = {'id': event_id, 'type': fields['type'], 'data': fields['data']}
+            if _matches(event, project_id):
+                events.append(event)
+        return events
+
+    def stream(self, last_event_id=None, project_id=None):
+        """Generator of SSE frames: missed events first, then live ones"""
+        subscriber = self.subscribe()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            last_key = (0, 0)
+            if last_event_id:
+                try:
+                    last_key = _id_key(last_event_id)
+                    missed = self.replay(last_event_id, project_id)
+                except Exception as e:
+                    logger.warning(f"Cannot resume execution events from {last_event_id}: {e}")
+                    missed = []
+                for event in missed:
+                    last_key = _id_key(event['id'])
+                    yield format_event(event)
+
+            while not subscriber.overflowed:
+                try:
+                    event = subscriber.queue.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                metrics.SSE_QUEUED.dec()
+                # Skip events already sent during replay
+                if _id_key(event['id']) <= last_key or not _matches(event, project_id):
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+class AsyncEventBroker(EventBroker):
+    """EventBroker on an asyncio loop; redis_client is a redis.asyncio client"""
+
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.Queue)
+        metrics.SSE_SUBSCRIBERS.inc()
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._listener is None or self._listener.done():
+                self._listener = asyncio.get_running_loop().create_task(self._listen())
+        return subscriber
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    self._dispatch(serialization.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Execution event listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+
+    async def replay(self, last_event_id, project_id=None):
+        events = []
+        for event_id, fields in await self.redis.xrange(STREAM_KEY, min=f'({last_event_id}', max='+'):
+            event = {'id': event_id, 'type': fields['type'], 'data': fields['data']}
+            if _matches(event, project_id):
+                events.append(event)
+        return events
+
+    async def stream(self, last_event_id=None, project_id=None):
+        subscriber = self.subscribe()
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            last_key = (0, 0)
+            if last_event_id:
+                try:
+                    last_key = _id_key(last_event_id)
+                    missed = await self.replay(last_event_id, project_id)
+                except Exception as e:
+                    logger.warning(f"Cannot resume execution events from {last_event_id}: {e}")
+                    missed = []
+                for event in missed:
+                    last_key = _id_key(event['id'])
+                    yield format_event(event)
+
+            while not subscriber.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                metrics.SSE_QUEUED.dec()
+                if _id_key(event['id']) <= last_key or not _matches(event, project_id):
+                    continue
+                yield format_event(event)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+async def publish_async(redis_client, event_type, execution_id, project_id=None, **data):
+    """publish() for redis.asyncio clients"""
+    payload = serialization.dumps_str({
+        'execution_id': execution_id,
+        'project_id': project_id,
+        'timestamp': datetime.now().isoformat(),
+        **data
+    }, default=str)
+    try:
+        event_id = await redis_client.xadd(
+            STREAM_KEY, {'type': event_type, 'data': payload},
+            maxlen=STREAM_MAXLEN, approximate=True
+        )
+        await redis_client.publish(CHANNEL, serialization.dumps_str({'id': event_id, 'type': event_type, 'data': payload}))
+        return event_id
+    except Exception as e:
+        logger.warning(f"Could not publish {event_type} event for execution {execution_id}: {e}")
+        return None
@@ -0,0 +1,90 @@
+"""
+Gunicorn settings for the unified service (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Worker and thread counts default to values derived from the CPUs available to
+the container and can be overridden with GUNICORN_* variables. Send HUP to the
+master to gracefully replace the workers (e.g. after changing settings).
+
+gevent is the default worker class: every open /api/executions/stream holds
+its request for as long as the page is open, which would exhaust a fixed
+number of gthread threads. Patching happens here, before preload_app imports
+the app, so threading, ssl, redis and psycopg2 are loaded already patched.
+"""
+import os
+import shutil
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+
+if worker_class == 'gevent':
+    from gevent import monkey
+    if not monkey.is_module_patched('socket'):
+        monkey.patch_all()
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+cores = _cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8869')}"
+# gevent workers do not block on I/O, so one per core is enough; gthread needs more
+workers = int(os.getenv('GUNICORN_WORKERS', str(cores if worker_class == 'gevent' else cores * 2 + 1)))
+# gthread: threads per worker for I/O-bound requests; gevent: concurrent greenlets (SSE clients)
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# PostgreSQL connections for the whole service, split between the workers so
+# the other services still fit under max_connections (100 by default).
+# gthread: each thread may hold a connection plus a couple of spares;
+# gevent: greenlets wait for one of the worker's share of connections
+connection_budget = int(os.getenv('DB_CONNECTION_BUDGET', '60'))
+pool_max = max(2, connection_budget // workers)
+if worker_class == 'gthread':
+    pool_max = min(pool_max, threads + 2)
+os.environ.setdefault('DB_POOL_MAX', str(pool_max))
+
+# Workers write metrics to files in this directory so /metrics reports all of
+# them. It is emptied once at startup (this file is evaluated again on HUP)
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = '/tmp/veritas-metrics'
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.init_worker()
+
+
+def post_worker_init(worker):
+    # Retention, partition and counter jobs run in one worker, never in the
+    # master, so no thread is running (and holding locks) when workers fork
+    import wsgi
+    if wsgi.start_background_jobs():
+        worker.log.info("Background jobs running in this worker")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Dependency health checks served from a cached snapshot.
+
+A HealthMonitor probes every registered dependency in parallel on a background
+thread (started in the process that first serves a health request, so each
+gunicorn worker runs its own) and keeps the latest results. Probes never run
+on the request path:
+
+    /health/live   the process is up and serving requests (no dependency I/O)
+    /health/ready  200 when every critical dependency passed its last probe
+    /health        the full snapshot with per-dependency status and latency,
+                   with the readiness status code
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '10'))
+PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '3'))
+# A snapshot this old means the probe thread stopped; report not ready
+STALE_AFTER = CHECK_INTERVAL * 3 + PROBE_TIMEOUT
+
+
+class HealthMonitor:
+    def __init__(self, service, interval=CHECK_INTERVAL, timeout=PROBE_TIMEOUT):
+        self.service = service
+        self.interval = interval
+        self.timeout = timeout
+        self._checks = {}
+        self._pending = {}
+        self._snapshot = None
+        self._checked = 0
+        self._lock = threading.Lock()
+        self._round = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self._pid = None
+
+    def add_check(self, name, probe, critical=True):
+        """probe() raises (or returns False) when the dependency is unavailable.
+
+        Failing non-critical dependencies report the service as degraded but
+        still ready.
+        """
+        self._checks[name] = (probe, critical)
+
+    def check_now(self):
+        """Run all probes in parallel and store the snapshot"""
+        with self._round:
+            return self._check()
+
+    def _check(self):
+        started = {}
+        for name, (probe, _) in self._checks.items():
+            # A probe still stuck from a previous round is not started again
+            if name not in self._pending or self._pending[name][0].done():
+                self._pending[name] = (self._executor.submit(self._timed, probe), time.perf_counter())
+            started[name] = self._pending[name]
+
+        deadline = time.perf_counter() + self.timeout
+        results = {}
+        for name, (future, submitted) in started.items():
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.perf_counter()))
+            except Exception as e:
+                waited = round((time.perf_counter() - submitted) * 1000, 2)
+                error = f"timed out after {waited}ms" if not future.done() else str(e)
+                results[name] = {'status': 'unhealthy', 'latency_ms': waited, 'error': error}
+
+        failing = [name for name, result in results.items() if result['status'] != 'healthy']
+        if any(self._checks[name][1] for name in failing):
+            status = 'unhealthy'
+        else:
+            status = 'degraded' if failing else 'healthy'
+        snapshot = {
+            'service': self.service,
+            'status': status,
+            'services': results,
+            'checked_at': datetime.now().isoformat()
+        }
+        for name in failing:
+            logger.warning(f"Health check {name} failed: {results[name].get('error')}")
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked = time.monotonic()
+        return snapshot
+
+    @staticmethod
+    def _timed(probe):
+        started = time.perf_counter()
+        try:
+            ok = probe() is not False
+            error = None if ok else 'probe returned False'
+        except Exception as e:
+            ok, error = False, str(e)
+        result = {'status': 'healthy' if ok else 'unhealthy', 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+        if error:
+            result['error'] = error
+        return result
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check_now()
+            except Exception as e:
+                logger.error(f"Health monitor error: {e}")
+
+    def _ensure_started(self):
+        # Threads do not survive fork; each process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=max(1, len(self._checks)) * 2,
+                                                thread_name_prefix='health-probe')
+            self._pending = {}
+            self._snapshot = None
+            self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def status(self):
+        """Latest snapshot and whether the service is ready"""
+        self._ensure_started()
+        with self._lock:
+            snapshot, checked = self._snapshot, self._checked
+        if snapshot is None:
+            # First request in this process: probe once before answering
+            snapshot, checked = self.check_now(), time.monotonic()
+        fresh = time.monotonic() - checked < STALE_AFTER
+        return snapshot, fresh and snapshot['status'] != 'unhealthy'
+
+    def register(self, app):
+        """Add /health, /health/ready and /health/live to a Flask app"""
+
+        def health():
+            snapshot, ready = self.status()
+            body = dict(snapshot, timestamp=datetime.now().isoformat())
+            if not ready and snapshot['status'] != 'unhealthy':
+                body['status'] = 'stale'
+            return jsonify(body), 200 if ready else 503
+
+        def ready():
+            snapshot, ready = self.status()
+            return jsonify({'status': 'ready' if ready else 'not ready', 'checked_at': snapshot['checked_at']}), \
+                200 if ready else 503
+
+        def live():
+            return jsonify({'status': 'alive', 'service': self.service, 'timestamp': datetime.now().isoformat()})
+
+        app.add_url_rule('/health', 'health', health)
+        app.add_url_rule('/health/ready', 'health_ready', ready)
+        app.add_url_rule('/health/live', 'health_live', live)
+        return self
+
+
+def database_probe(connect):
+    """SELECT 1 on a connection from connect(), always closing it"""
+    def probe():
+        conn = connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        finally:
+            conn.close()
+    return probe
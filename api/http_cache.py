@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Conditional GET and response caching for the read endpoints.
+
+Every cached view declares the entities it depends on. Each entity has a
+version counter in Redis that writers bump; the ETag of a response is derived
+from the request URL and those versions, so a poll with a matching
+If-None-Match is answered with 304 before the view runs. Full bodies are kept
+per ETag (plain and compressed) so new clients do not recompute them either.
+
+ResultCache sits below the views: query results are keyed by the same entity
+versions plus a hash of the normalized query parameters, so equivalent requests
+share an entry, and are stored as compact JSON bytes that are sent as-is on a
+hit. A write bumps one counter per entity; stale entries simply expire.
+
+Without a Redis client versions and bodies are kept in process memory, which is
+enough for services that run a single process.
+
+ETags also include an epoch, a random token kept in Redis (or per process in
+memory mode) and recreated when it is missing, so the restarted counters after
+a Redis flush or restart never repeat ETags clients already hold, and
+HTTP_CACHE_EPOCH, which a deployment can set to e.g. its release id.
+"""
+import os
+import gzip
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+import serialization
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = int(os.getenv('HTTP_CACHE_TTL', '300'))
+COMPRESS_MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', '1024'))
+LOCAL_MAX_ENTRIES = 256
+
+VERSION_KEY = 'httpcache:version:{}'
+EPOCH_KEY = 'httpcache:epoch'
+DEPLOYMENT_EPOCH = os.getenv('HTTP_CACHE_EPOCH', '')
+BODY_KEY = 'httpcache:body:{}'
+RESULT_KEY = 'resultcache:{}:{}:{}'
+
+# Headers recomputed for every response instead of being replayed from the cache
+_SKIP_HEADERS = {'content-length', 'content-encoding', 'etag', 'cache-control', 'vary'}
+
+
+def bump_versions(redis_client, *entities):
+    """Invalidate cached responses depending on entities; usable from any service"""
+    pipe = redis_client.pipeline(transaction=False)
+    for entity in entities:
+        pipe.incr(VERSION_KEY.format(entity))
+    pipe.execute()
+
+
+def _compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class ResponseCache:
+    def __init__(self, redis_client=None, ttl=CACHE_TTL):
+        """redis_client must not decode responses, bodies are stored as bytes"""
+        self.redis = redis_client
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = OrderedDict()
+        # In-memory versions restart at 0 with the process
+        self._local_epoch = uuid.uuid4().hex
+
+    def bump(self, *entities):
+        if self.redis is None:
+            with self._lock:
+                for entity in entities:
+                    self._versions[entity] = self._versions.get(entity, 0) + 1
+            return
+        try:
+            bump_versions(self.redis, *entities)
+        except Exception as e:
+            logger.warning(f"Could not bump versions {entities}: {e}")
+
+    def versions(self, entities):
+        if self.redis is None:
+            with self._lock:
+                return [self._versions.get(entity, 0) for entity in entities]
+        values = self.redis.mget([VERSION_KEY.format(entity) for entity in entities]) if entities else []
+        return [int(value or 0) for value in values]
+
+    def epoch_and_versions(self, entities):
+        if self.redis is None:
+            return self._local_epoch, self.versions(entities)
+        values = self.redis.mget([EPOCH_KEY] + [VERSION_KEY.format(entity) for entity in entities])
+        epoch = values[0]
+        if epoch is None:
+            # First use, or Redis lost its data and the version counters restarted
+            self.redis.set(EPOCH_KEY, uuid.uuid4().hex, nx=True)
+            epoch = self.redis.get(EPOCH_KEY)
+        if isinstance(epoch, bytes):
+            epoch = epoch.decode()
+        return epoch, [int(value or 0) for value in values[1:]]
+
+    def _load(self, key):
+        if self.redis is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry['expires'] > time.time():
+                    return entry
+                self._entries.pop(key, None)
+                return None
+        stored = self.redis.hgetall(BODY_KEY.format(key))
+        if not stored:
+            return None
+        entry = {field.decode(): value for field, value in stored.items()}
+        entry['headers'] = json.loads(entry['headers'])
+        entry['status'] = int(entry['status'])
+        return entry
+
+    def _store(self, key, entry):
+        if self.redis is None:
+            with self._lock:
+                entry['expires'] = time.time() + self.ttl
+                self._entries[key] = entry
+                while len(self._entries) > LOCAL_MAX_ENTRIES:
+                    self._entries.popitem(last=False)
+            return
+        name = BODY_KEY.format(key)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(name, mapping={
+            'status': entry['status'],
+            'headers': json.dumps(entry['headers']),
+            'identity': entry['identity']
+        })
+        pipe.expire(name, self.ttl)
+        pipe.execute()
+
+    def _store_variant(self, key, entry, encoding, body):
+        entry[encoding] = body
+        if self.redis is not None:
+            self.redis.hset(BODY_KEY.format(key), encoding, body)
+
+    def cached(self, *entities, max_age=0):
+        """Cache GET responses of a view until one of entities changes.
+
+        Other methods on the same route pass straight through; writers must
+        call bump() for the entities they modify.
+        """
+        cache_control = f"max-age={max_age}, must-revalidate"
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+
+                try:
+                    epoch, versions = self.epoch_and_versions(entities)
+                except Exception as e:
+                    logger.warning(f"Response cache unavailable: {e}")
+                    return view(*args, **kwargs)
+
+                key = hashlib.sha1(json.dumps([
+                    DEPLOYMENT_EPOCH, epoch, request.path, sorted(request.args.items(multi=True)), entities, versions
+                ]).encode()).hexdigest()
+                etag = key[:32]
+
+                if request.if_none_match.contains_weak(etag):
+                    return self._finish(Response(status=304), etag, cache_control)
+
+                entry = None
+                try:
+                    entry = self._load(key)
+                except Exception as e:
+                    logger.warning(f"Response cache read error: {e}")
+
+                if entry is None:
+                    response = view(*args, **kwargs)
+                    if not isinstance(response, Response):
+                        # (body, status) tuples from error paths
+                        response = current_app.make_response(response)
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    entry = {
+                        'status': response.status_code,
+                        'headers': [(k, v) for k, v in response.headers.items() if k.lower() not in _SKIP_HEADERS],
+                        'identity': response.get_data()
+                    }
+                    try:
+                        self._store(key, entry)
+                    except Exception as e:
+                        logger.warning(f"Response cache write error: {e}")
+
+                return self._finish(self._respond(key, entry), etag, cache_control)
+            return wrapper
+        return decorator
+
+    def _respond(self, key, entry):
+        body = entry['identity']
+        encoding = self._negotiate(len(body))
+        headers = list(entry['headers'])
+        if encoding:
+            compressed = entry.get(encoding)
+            if compressed is None:
+                compressed = _compress(body, encoding)
+                try:
+                    self._store_variant(key, entry, encoding, compressed)
+                except Exception as e:
+                    logger.warning(f"Response cache write error: {e}")
+            body = compressed
+            headers.append(('Content-Encoding', encoding))
+        return Response(body, status=entry['status'], headers=headers)
+
+    def _negotiate(self, size):
+        if size < COMPRESS_MIN_BYTES:
+            return None
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def _finish(self, response, etag, cache_control):
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class ResultCache:
+    """Query results as JSON bytes, keyed by entity version and normalized parameters"""
+
+    def __init__(self, response_cache, ttl=CACHE_TTL):
+        # Versions (and the Redis client) are shared, so ResponseCache.bump() invalidates both
+        self.response_cache = response_cache
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def key(self, entity, params):
+        """params must already be normalized (defaults filled in, lists sorted)"""
+        version = self.response_cache.versions([entity])[0]
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+        return RESULT_KEY.format(entity, version, digest)
+
+    def json(self, entity, params, compute):
+        """Cached JSON bytes for params, or compute() serialized and stored"""
+        try:
+            key = self.key(entity, params)
+            body = self._get(key)
+        except Exception as e:
+            logger.warning(f"Result cache unavailable: {e}")
+            return serialization.dumps(compute())
+        if body is None:
+            body = serialization.dumps(compute())
+            try:
+                self._set(key, body)
+            except Exception as e:
+                logger.warning(f"Result cache write error: {e}")
+        return body
+
+    def _get(self, key):
+        redis_client = self.response_cache.redis
+        if redis_client is not None:
+            return redis_client.get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+            return None
+
+    def _set(self, key, body):
+        redis_client = self.response_cache.redis
+        if redis_client is not None:
+            redis_client.set(key, body, ex=self.ttl)
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, body)
+            while len(self._entries) > LOCAL_MAX_ENTRIES:
+                self._entries.popitem(last=False)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics shared by the Veritas services.
+
+instrument_app() adds per-route request latency to a Flask app and serves
+/metrics; the client wrappers below (psycopg2 cursor, Redis client, urllib3
+pool used by MinIO) time every call made through them, so routes need no code
+of their own. Under gunicorn set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py
+does) and /metrics aggregates all workers.
+"""
+import os
+import re
+import time
+import functools
+import urllib3
+import redis
+import redis.asyncio as aioredis
+from flask import g, request, Response
+from psycopg2 import extensions
+from query_log import query_log
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Datastore calls are mostly sub-millisecond; requests default buckets start at 5ms
+CALL_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    'veritas_http_request_duration_seconds', 'Time until the response is returned, by route',
+    ['method', 'route', 'status']
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'veritas_http_requests_in_progress', 'Requests currently being handled', multiprocess_mode='livesum'
+)
+DB_QUERY_LATENCY = Histogram(
+    'veritas_db_query_duration_seconds', 'PostgreSQL statement time by statement label',
+    ['statement'], buckets=CALL_BUCKETS
+)
+DB_POOL_SIZE = Gauge(
+    'veritas_db_pool_max_connections', 'Configured pool size', multiprocess_mode='livesum'
+)
+DB_POOL_IN_USE = Gauge(
+    'veritas_db_pool_connections_in_use', 'Connections checked out of the pool', multiprocess_mode='livesum'
+)
+DB_POOL_WAITING = Gauge(
+    'veritas_db_pool_waiting', 'Callers waiting for a free connection', multiprocess_mode='livesum'
+)
+DB_POOL_WAIT = Histogram(
+    'veritas_db_pool_checkout_seconds', 'Time spent waiting for a pooled connection', buckets=CALL_BUCKETS
+)
+REDIS_LATENCY = Histogram(
+    'veritas_redis_command_duration_seconds', 'Redis command time', ['command'], buckets=CALL_BUCKETS
+)
+MINIO_LATENCY = Histogram(
+    'veritas_minio_request_duration_seconds', 'MinIO request time until response headers',
+    ['method', 'status'], buckets=CALL_BUCKETS
+)
+SSE_SUBSCRIBERS = Gauge(
+    'veritas_sse_subscribers', 'Open execution event streams', multiprocess_mode='livesum'
+)
+SSE_QUEUED = Gauge(
+    'veritas_sse_queued_events', 'Events waiting in subscriber queues', multiprocess_mode='livesum'
+)
+SSE_OVERFLOWS = Counter(
+    'veritas_sse_overflows', 'Subscribers disconnected for falling behind'
+)
+
+
+def instrument_app(app, path='/metrics'):
+    """Record request latency for every route of a Flask app and expose path"""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+    @app.after_request
+    def _observe_request(response):
+        _observe(response.status_code)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc):
+        # after_request is skipped when the view raised
+        if exc is not None:
+            _observe(500)
+        if g.pop('_metrics_started', None) is not None:
+            REQUESTS_IN_PROGRESS.dec()
+
+    app.add_url_rule(path, 'metrics', metrics_view)
+    return app
+
+
+def _observe(status):
+    started = g.get('_metrics_started')
+    if started is None or g.get('_metrics_observed'):
+        return
+    g._metrics_observed = True
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+
+def metrics_view():
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+class MetricsMiddleware:
+    """ASGI counterpart of instrument_app() for routes served on the event loop.
+
+    Requests not matched by a native Route (e.g. mounted WSGI apps) are left
+    to the mounted app's own instrumentation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                route = self._route(scope)
+                if route is not None:
+                    REQUEST_LATENCY.labels(scope['method'], route, str(message['status'])).observe(
+                        time.perf_counter() - started)
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+
+    def _route(self, scope):
+        endpoint = scope.get('endpoint')
+        if endpoint not in self._routes:
+            router = scope.get('router')
+            self._routes[endpoint] = next(
+                (route.path for route in getattr(router, 'routes', [])
+                 if getattr(route, 'endpoint', None) is endpoint and hasattr(route, 'methods')),
+                None
+            )
+        return self._routes[endpoint]
+
+
+# Statement labels: verb plus the first table, e.g. "select test_executions"
+_VERB = re.compile(r'\s*(\w+)')
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|JOIN)\s+(?:ONLY\s+|IF\s+(?:NOT\s+)?EXISTS\s+)?([\w."]+)', re.I)
+
+
+@functools.lru_cache(maxsize=512)
+def statement_label(query):
+    verb = _VERB.match(query)
+    if verb is None:
+        return 'unknown'
+    table = _TABLE.search(query)
+    label = verb.group(1).lower()
+    if table:
+        label += ' ' + table.group(1).strip('"').lower()
+    return label
+
+
+def _query_text(query):
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    return query if isinstance(query, str) else type(query).__name__
+
+
+class TimedCursor(extensions.cursor):
+    """psycopg2 cursor recording statement time and the slow query log; pass as cursor_factory"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_QUERY_LATENCY.labels(statement_label(_query_text(query))).observe(elapsed)
+            query_log.record(query, elapsed, self.rowcount, self, vars)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            DB_QUERY_LATENCY.labels(statement_label(_query_text(query))).observe(time.perf_counter() - started)
+
+    def copy_expert(self, sql, file, size=8192):
+        # psycopg2 refuses COPY while a wait callback (psycogreen under gevent)
+        # is set; callers copy from in-memory buffers, so it runs blocking
+        callback = extensions.get_wait_callback()
+        if callback is not None:
+            extensions.set_wait_callback(None)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            if callback is not None:
+                extensions.set_wait_callback(callback)
+            DB_QUERY_LATENCY.labels(statement_label(_query_text(sql))).observe(time.perf_counter() - started)
+
+
+def log_asyncpg_query(record):
+    """asyncpg query logger (Connection.add_query_logger) feeding DB_QUERY_LATENCY"""
+    DB_QUERY_LATENCY.labels(statement_label(record.query)).observe(record.elapsed)
+    query_log.record(record.query, record.elapsed)
+
+
+class InstrumentedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            REDIS_LATENCY.labels('PIPELINE').observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """redis.Redis recording the latency of every command and pipeline"""
+
+    def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class AsyncInstrumentedPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error=True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_LATENCY.labels('PIPELINE').observe(time.perf_counter() - started)
+
+
+class AsyncInstrumentedRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return AsyncInstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class InstrumentedPoolManager(urllib3.PoolManager):
+    """urllib3 pool for the MinIO client recording request latency"""
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = super().urlopen(method, url, redirect=redirect, **kw)
+            status = str(response.status)
+            return response
+        finally:
+            MINIO_LATENCY.labels(method, status).observe(time.perf_counter() - started)
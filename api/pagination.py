@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Opaque keyset cursors shared by the paginated list endpoints.
+
+A cursor encodes the sort key of the last row of a page, e.g.
+(created_at, id); the next page is fetched with WHERE (created_at, id) < cursor.
+List bodies stay plain JSON arrays; the token for the next page is returned in
+the X-Next-Cursor response header.
+"""
+import json
+import uuid
+import base64
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(*values):
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the list of key values in a cursor, None for no cursor; ValueError if malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def with_next_cursor(response, token):
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
+    return response
+
+
+def _cursor_id(value, id_type):
+    if id_type is int:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError
+        return int(value)
+    if id_type is uuid.UUID:
+        return str(uuid.UUID(value))
+    raise TypeError(f"Unsupported cursor id type {id_type}")
+
+
+def parse_cursor(cursor, id_type=int):
+    """(timestamp, id) from a decoded cursor; ValueError if the values do not parse"""
+    try:
+        if len(cursor) != 2:
+            raise ValueError
+        return [datetime.fromisoformat(cursor[0]), _cursor_id(cursor[1], id_type)]
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_condition(cursor, sort_column, id_column, descending=True, id_type=int):
+    """SQL condition (and params) selecting rows after a (timestamp, id) cursor in the given order"""
+    if not cursor:
+        return 'TRUE', []
+    operator = '<' if descending else '>'
+    return f"({sort_column}, {id_column}) {operator} (%s, %s)", parse_cursor(cursor, id_type)
+
+
+def split_page(rows, limit, key):
+    """Trim a LIMIT limit+1 result to one page; returns (rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
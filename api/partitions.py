@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Monthly range partitioning of test_executions.
+
+Partitions are named test_executions_pYYYYMM and cover one calendar month of
+the execution timestamp. Maintenance keeps PARTITION_MONTHS_AHEAD future
+partitions in place and detaches partitions older than
+PARTITION_RETENTION_MONTHS into the archive schema, so expiring history is a
+catalog operation instead of a mass DELETE. Rows that landed in the DEFAULT
+partition (months without a partition yet) are moved into their month's
+partition when it is created, so they age out like the rest.
+"""
+import os
+import re
+import sys
+import logging
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'test_executions'
+ARCHIVE_SCHEMA = os.getenv('PARTITION_ARCHIVE_SCHEMA', 'archive')
+MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '24'))
+MAINTENANCE_INTERVAL = int(os.getenv('PARTITION_MAINTENANCE_INTERVAL', str(6 * 3600)))
+
+_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y%m}"
+
+
+def is_partitioned(cur):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (TABLE,))
+    row = cur.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(cur):
+    """Return [(name, lower_bound, upper_bound)] for the range partitions of the table"""
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (TABLE,))
+    partitions = []
+    for name, bound in cur.fetchall():
+        match = _BOUND.search(bound or '')
+        if match:
+            partitions.append((name, date.fromisoformat(match.group(1)[:10]), date.fromisoformat(match.group(2)[:10])))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def partition_key(cur):
+    cur.execute("SELECT pg_get_partkeydef(to_regclass(%s))", (TABLE,))
+    return re.search(r"\((\w+)\)", cur.fetchone()[0]).group(1)
+
+
+def default_partition(cur):
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s) AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'
+    """, (TABLE,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _create_partition(cur, start, default, key):
+    """Create one month's partition, moving its rows out of the DEFAULT partition; returns rows moved"""
+    end = month_start(start, 1)
+    moved = 0
+    if default:
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {key} >= %s AND {key} < %s)", (start, end))
+        if cur.fetchone()[0]:
+            # Through the parent table, so the statement-level counter triggers see -n and +n
+            cur.execute(f"CREATE TEMP TABLE partition_rows AS SELECT * FROM {TABLE} WHERE {key} >= %s AND {key} < %s",
+                        (start, end))
+            cur.execute(f"DELETE FROM {TABLE} WHERE {key} >= %s AND {key} < %s", (start, end))
+            moved = cur.rowcount
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        (start, end)
+    )
+    if moved:
+        cur.execute(f"INSERT INTO {TABLE} SELECT * FROM partition_rows")
+        cur.execute("DROP TABLE partition_rows")
+    return moved
+
+
+def ensure_partitions(conn, months_ahead=MONTHS_AHEAD, today=None):
+    """Create the current month's partition, months_ahead future ones and one for
+    every month that has rows in the DEFAULT partition"""
+    today = today or date.today()
+    created = []
+    with conn.cursor() as cur:
+        if not is_partitioned(cur):
+            return created
+        existing = {p[1] for p in list_partitions(cur)}
+        months = {month_start(today, offset) for offset in range(months_ahead + 1)}
+        default = default_partition(cur)
+        key = partition_key(cur) if default else None
+        if default:
+            cur.execute(f"SELECT DISTINCT date_trunc('month', {key})::date FROM {default}")
+            months.update(row[0] for row in cur.fetchall())
+        for start in sorted(months - existing):
+            # One failed month must not abort the others
+            cur.execute("SAVEPOINT partition_month")
+            try:
+                moved = _create_partition(cur, start, default, key)
+                cur.execute("RELEASE SAVEPOINT partition_month")
+            except Exception as e:
+                cur.execute("ROLLBACK TO SAVEPOINT partition_month")
+                logger.error(f"Could not create partition {partition_name(start)}: {e}")
+                continue
+            created.append(partition_name(start))
+            if moved:
+                logger.info(f"Moved {moved} rows from {default} into {partition_name(start)}")
+    conn.commit()
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+def detach_old_partitions(conn, retention_months=RETENTION_MONTHS, today=None):
+    """Detach partitions entirely older than the retention window into the archive schema"""
+    if retention_months <= 0:
+        return []
+    cutoff = month_start(today or date.today(), -retention_months)
+    detached = []
+    with conn.cursor() as cur:
+        if not is_partitioned(cur):
+            return detached
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        for name, _, upper in list_partitions(cur):
+            if upper > cutoff:
+                continue
+            cur.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            cur.execute(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+            detached.append(name)
+    conn.commit()
+    if detached:
+        logger.info(f"Detached partitions into {ARCHIVE_SCHEMA}: {', '.join(detached)}")
+    return detached
+
+
+def run_maintenance(get_db):
+    conn = get_db()
+    try:
+        return {
+            'created': ensure_partitions(conn),
+            'detached': detach_old_partitions(conn)
+        }
+    finally:
+        conn.close()
+
+
+def migrate_to_partitioned(conn, time_column):
+    """One-off conversion of an existing plain test_executions table.
+
+    The old table is renamed, an empty partitioned copy takes its name and the
+    rows are copied across. Run during a maintenance window.
+    """
+    with conn.cursor() as cur:
+        if is_partitioned(cur):
+            return False
+        cur.execute(f"SELECT MIN({time_column}) FROM {TABLE}")
+        oldest = cur.fetchone()[0] or date.today()
+
+        cur.execute(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned")
+        cur.execute(f"ALTER TABLE {TABLE}_unpartitioned DROP CONSTRAINT IF EXISTS {TABLE}_pkey")
+        cur.execute(f"""
+            CREATE TABLE {TABLE} (LIKE {TABLE}_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+            PARTITION BY RANGE ({time_column})
+        """)
+        cur.execute(f"UPDATE {TABLE}_unpartitioned SET {time_column} = CURRENT_TIMESTAMP WHERE {time_column} IS NULL")
+        cur.execute(f"ALTER TABLE {TABLE} ALTER COLUMN {time_column} SET NOT NULL")
+        cur.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, {time_column})")
+        cur.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+        start = month_start(oldest)
+        last = month_start(date.today(), MONTHS_AHEAD)
+        while start <= last:
+            cur.execute(
+                f"CREATE TABLE {partition_name(start)} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+                (start, month_start(start, 1))
+            )
+            start = month_start(start, 1)
+
+        cur.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_unpartitioned")
+        # Keep id sequences attached to the new table
+        cur.execute(f"""
+            SELECT pg_get_serial_sequence('{TABLE}_unpartitioned', 'id')
+        """)
+        sequence = cur.fetchone()[0]
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+        cur.execute(f"DROP TABLE {TABLE}_unpartitioned")
+    conn.commit()
+    return True
+
+
+if __name__ == '__main__':
+    import psycopg2
+    from config import DB_CONFIG
+
+    logging.basicConfig(level=logging.INFO)
+    conn = psycopg2.connect(**DB_CONFIG)
+    if len(sys.argv) > 2 and sys.argv[1] == '--migrate':
+        print(migrate_to_partitioned(conn, sys.argv[2]))
+    conn.close()
+    print(run_maintenance(lambda: psycopg2.connect(**DB_CONFIG)))
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Opt-in request profiling for the Flask apps.
+
+With PROFILING_ENABLED=true, a request is profiled when it is picked by
+PROFILE_SAMPLE_RATE or carries the X-Veritas-Profile header (whose value must
+match PROFILE_TOKEN when one is set). A sampler thread records the stack of
+each profiled request thread every PROFILE_INTERVAL_MS; at the end of the
+request the samples are written to MinIO as a speedscope profile
+(https://www.speedscope.app) under profiles/<service>/YYYY/MM/DD/, and the
+object key is returned in the X-Veritas-Profile-Key response header.
+
+When disabled no hooks are installed at all. Under gevent the sampled stack is
+whichever greenlet is running on the worker thread, so profiles may mix
+concurrent requests.
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime
+from flask import g, request
+import storage
+import serialization
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+TOKEN = os.getenv('PROFILE_TOKEN', '')
+INTERVAL = float(os.getenv('PROFILE_INTERVAL_MS', '1')) / 1000
+# Long requests (e.g. event streams) stop being sampled after this
+MAX_DURATION = float(os.getenv('PROFILE_MAX_SECONDS', '30'))
+BUCKET = os.getenv('PROFILE_BUCKET', os.getenv('MINIO_BUCKET', 'veritas-projects'))
+
+HEADER = 'X-Veritas-Profile'
+KEY_HEADER = 'X-Veritas-Profile-Key'
+SKIP_PATHS = ('/metrics', '/health', '/static/')
+
+
+class Profile:
+    """Stack samples of one thread, exportable as a speedscope sampled profile"""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.weights = []
+        self.started = time.perf_counter()
+        self._last = self.started
+
+    def sample(self, frame, now):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_qualname, code.co_filename, code.co_firstlineno)
+            index = self._frame_index.get(key)
+            if index is None:
+                index = self._frame_index[key] = len(self.frames)
+                self.frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples.append(stack)
+        self.weights.append((now - self._last) * 1000)
+        self._last = now
+
+    def speedscope(self):
+        end = (self._last - self.started) * 1000
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.name,
+            'exporter': 'veritas-profiling',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.name,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': end,
+                'samples': self.samples,
+                'weights': self.weights
+            }]
+        }
+
+
+class Sampler:
+    """One thread sampling every thread that currently has a Profile attached"""
+
+    def __init__(self, interval=INTERVAL):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._switch_interval = None
+
+    def start(self, profile):
+        thread_id = threading.get_ident()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Sampler threads do not survive fork
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name='profile-sampler', daemon=True).start()
+            self._active[thread_id] = profile
+            if self._switch_interval is None:
+                # CPU-bound handlers would otherwise hold the GIL for 5ms between samples
+                self._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self._switch_interval, self.interval))
+        self._wakeup.set()
+
+    def stop(self):
+        """Detach the calling thread's profile; no sample is added to it afterwards"""
+        with self._lock:
+            profile = self._active.pop(threading.get_ident(), None)
+            self._restore()
+            return profile
+
+    def _restore(self):
+        if not self._active and self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+
+    def _run(self):
+        while True:
+            if not self._active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            # Sampling under the lock means a profile is never written to once
+            # stop() has returned it for upload
+            with self._lock:
+                for thread_id, profile in list(self._active.items()):
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    if now - profile.started > MAX_DURATION:
+                        self._active.pop(thread_id, None)
+                        self._restore()
+                        continue
+                    profile.sample(frame, now)
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+def _requested():
+    if any(request.path.startswith(path) for path in SKIP_PATHS):
+        return False
+    header = request.headers.get(HEADER)
+    if header is not None and (not TOKEN or header == TOKEN):
+        return True
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def _upload(client, key, profile):
+    try:
+        storage.put_bytes(client, BUCKET, key, serialization.dumps(profile.speedscope()), 'application/json')
+    except Exception as e:
+        logger.warning(f"Could not store profile {key}: {e}")
+
+
+def instrument_app(app, service):
+    """Profile sampled or flagged requests of a Flask app; no-op unless PROFILING_ENABLED"""
+    if not ENABLED:
+        return app
+
+    client = storage.get_client(
+        os.getenv('MINIO_ENDPOINT', 'localhost:9898'),
+        os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
+        os.getenv('MINIO_SECRET_KEY', 'minioadmin123')
+    )
+
+    @app.before_request
+    def _start_profile():
+        if _requested():
+            g._profile = Profile(f"{request.method} {request.full_path.rstrip('?')}")
+            g._profile_key = (
+                f"profiles/{service}/{datetime.now().strftime('%Y/%m/%d/%H%M%S')}-"
+                f"{request.endpoint or 'unmatched'}-{uuid.uuid4().hex[:8]}.speedscope.json"
+            )
+            sampler.start(g._profile)
+
+    @app.after_request
+    def _add_profile_header(response):
+        if g.get('_profile') is not None:
+            response.headers[KEY_HEADER] = g._profile_key
+            g._profile.name += f" -> {response.status_code}"
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        sampler.stop()
+        # Upload off the request thread
+        threading.Thread(target=_upload, args=(client, g._profile_key, profile), daemon=True).start()
+
+    return app
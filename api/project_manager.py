@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+import metrics
+import profiling
+import serialization
 import json
 import os
 import requests
@@ -10,6 +13,9 @@ import uuid
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'project-manager')
+serialization.install(app)
 
 # Dev-Core Providers Integration
 DEV_CORE_PROVIDERS = {
@@ -300,4 +306,4 @@ def providers_status():
     return jsonify(status)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8874, debug=True)
+    app.run(host='0.0.0.0', port=8874, debug=os.environ.get('FLASK_DEBUG') == '1')
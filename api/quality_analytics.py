@@ -1,16 +1,27 @@
 #!/usr/bin/env python3
 from flask import Flask, jsonify, request
 from flask_cors import CORS
+import metrics
+import profiling
+import serialization
 import os
 import logging
 from datetime import datetime
+from http_cache import ResponseCache
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'quality-analytics')
+serialization.install(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shares entity versions with the other services through Redis; ingesting
+# results bumps 'executions'
+response_cache = ResponseCache(metrics.InstrumentedRedis(host='veritas-redis', port=6379))
+
 @app.route('/')
 def index():
     with open('/app/templates/quality_analytics.html', 'r') as f:
@@ -21,6 +32,7 @@ def health():
     return jsonify({"status": "healthy", "service": "quality-analytics", "timestamp": datetime.utcnow().isoformat()})
 
 @app.route('/api/metrics', methods=['GET'])
+@response_cache.cached('executions', max_age=60)
 def get_metrics():
     return jsonify({
         "code_coverage": 85.2,
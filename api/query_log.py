@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Slow query log with sampled query plans.
+
+metrics.TimedCursor reports every statement here. Statements are grouped by a
+normalized fingerprint (whitespace collapsed, literals replaced) and counted in
+process memory: calls, total and max time, rows and slow calls. Every
+QUERY_LOG_FLUSH_INTERVAL seconds the counts are added to Redis, so
+/api/slow-queries ranks statements across every worker and service sharing it.
+
+Statements slower than SLOW_QUERY_MS are logged; for a sample of slow SELECTs
+the plan is captured on the same connection, at most once per statement every
+QUERY_LOG_EXPLAIN_INTERVAL seconds. The capture runs between SAVEPOINT and
+ROLLBACK TO SAVEPOINT with a statement timeout, so it never changes or aborts
+the caller's transaction. EXPLAIN (ANALYZE, BUFFERS) runs the statement a
+second time, so it is only used for SELECTs without row locks that call no
+functions outside a known side-effect-free list; other statements get a plain
+EXPLAIN.
+"""
+import os
+import re
+import time
+import random
+import hashlib
+import logging
+import functools
+import threading
+from datetime import datetime
+from flask import request, jsonify
+from psycopg2 import extensions
+import serialization
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv('QUERY_LOG_ENABLED', 'true').lower() == 'true'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+EXPLAIN_SAMPLE = float(os.getenv('QUERY_LOG_EXPLAIN_SAMPLE', '0.1'))
+EXPLAIN_INTERVAL = float(os.getenv('QUERY_LOG_EXPLAIN_INTERVAL', '300'))
+FLUSH_INTERVAL = float(os.getenv('QUERY_LOG_FLUSH_INTERVAL', '10'))
+MAX_STATEMENTS = 1000
+# Statements fall out of Redis after a week without being seen
+STATEMENT_TTL = 7 * 24 * 3600
+
+TOTAL_KEY = 'querylog:total'
+MAX_KEY = 'querylog:max'
+STATEMENT_KEY = 'querylog:statement:{}'
+PLAN_KEY = 'querylog:plan:{}'
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r'\s+')
+_ROW_LOCKS = re.compile(r'\bFOR\s+(NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b', re.IGNORECASE)
+_CALLS = re.compile(r'\b([a-z_][a-z0-9_]*)\s*\(', re.IGNORECASE)
+
+# Keywords followed by a parenthesis and functions without side effects; any
+# other call may be volatile and is not run a second time by ANALYZE
+SAFE_CALLS = {
+    'select', 'from', 'join', 'on', 'using', 'where', 'and', 'or', 'not', 'in', 'any', 'all', 'exists',
+    'values', 'as', 'over', 'filter', 'within', 'partition', 'by', 'sets', 'rollup', 'cube', 'distinct',
+    'cast', 'case', 'when', 'then', 'else', 'limit', 'offset', 'lateral', 'with', 'union', 'except',
+    'intersect', 'grouping', 'coalesce', 'nullif', 'greatest', 'least', 'count', 'sum', 'avg', 'min',
+    'max', 'array_agg', 'string_agg', 'json_agg', 'jsonb_agg', 'bool_and', 'bool_or', 'percentile_cont',
+    'percentile_disc', 'row_number', 'rank', 'dense_rank', 'lag', 'lead', 'round', 'abs', 'floor', 'ceil',
+    'lower', 'upper', 'length', 'substring', 'trim', 'concat', 'split_part', 'position', 'replace',
+    'date_trunc', 'date_part', 'extract', 'now', 'to_char', 'to_timestamp', 'age', 'interval', 'unnest',
+    'array_length', 'jsonb_array_elements', 'jsonb_array_length', 'jsonb_build_object', 'json_build_object',
+    'to_tsvector', 'websearch_to_tsquery', 'plainto_tsquery', 'to_tsquery', 'ts_rank', 'setweight',
+    'to_regclass', 'generate_series', 'pg_relation_size', 'pg_total_relation_size',
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """(id, normalized text) of a statement"""
+    normalized = _SPACES.sub(' ', _LITERALS.sub('?', query)).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+def analyze_safe(query):
+    """Whether running the statement again under EXPLAIN ANALYZE has no side effects"""
+    if _ROW_LOCKS.search(query):
+        return False
+    without_literals = _LITERALS.sub('?', query)
+    return all(name.lower() in SAFE_CALLS for name in _CALLS.findall(without_literals))
+
+
+class QueryLog:
+    def __init__(self, redis_client=None):
+        """redis_client must decode responses"""
+        self.redis = redis_client
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._pending = {}
+        self._last_plan = {}
+        self._flusher_pid = None
+
+    def record(self, query, elapsed, rows=None, cursor=None, params=None):
+        """Account one statement; cursor allows a plan to be captured when it is slow"""
+        if not ENABLED or not isinstance(query, str):
+            return
+        statement_id, normalized = fingerprint(query)
+        elapsed_ms = elapsed * 1000
+        slow = elapsed_ms >= SLOW_QUERY_MS
+        rows = rows if rows is not None and rows >= 0 else 0
+
+        self._ensure_flusher()
+        with self._lock:
+            # With Redis only the deltas since the last flush are kept here
+            stats = self._stats if self.redis is None else self._pending
+            entry = stats.get(statement_id)
+            if entry is None and len(stats) < MAX_STATEMENTS:
+                entry = stats[statement_id] = {
+                    'query': normalized, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow_calls': 0
+                }
+            if entry is not None:
+                entry['calls'] += 1
+                entry['total_ms'] += elapsed_ms
+                entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+                entry['rows'] += rows
+                entry['slow_calls'] += slow
+
+        if slow:
+            logger.warning(f"Slow query {elapsed_ms:.1f}ms ({rows} rows) [{statement_id}]: {normalized[:500]}")
+            if cursor is not None and self._should_explain(statement_id, normalized):
+                self._capture_plan(cursor, statement_id, query, params, elapsed_ms)
+
+    def _should_explain(self, statement_id, normalized):
+        if normalized[:6].upper() != 'SELECT' or random.random() >= EXPLAIN_SAMPLE:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_plan.get(statement_id, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+                return False
+            self._last_plan[statement_id] = now
+        return True
+
+    def _capture_plan(self, cursor, statement_id, query, params, elapsed_ms):
+        conn = cursor.connection
+        status = conn.info.transaction_status
+        if cursor.name is not None or status not in (
+                extensions.TRANSACTION_STATUS_IDLE, extensions.TRANSACTION_STATUS_INTRANS):
+            return
+        analyze = analyze_safe(query)
+        options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+        # Without a transaction to nest in, the savepoint gets one of its own
+        own_transaction = conn.autocommit or status == extensions.TRANSACTION_STATUS_IDLE
+        plan = None
+        try:
+            # A plain cursor: the caller's results stay untouched and this is not recorded again
+            with extensions.cursor(conn) as explain:
+                if conn.autocommit:
+                    explain.execute("BEGIN")
+                explain.execute("SAVEPOINT query_log_plan")
+                try:
+                    explain.execute("SET LOCAL statement_timeout = %s", (int(elapsed_ms * 2) + 1000,))
+                    explain.execute(f"EXPLAIN ({options}) " + query, params)
+                    plan = explain.fetchone()[0]
+                except Exception as e:
+                    logger.warning(f"Could not capture plan for {statement_id}: {e}")
+                finally:
+                    explain.execute("ROLLBACK TO SAVEPOINT query_log_plan")
+                    explain.execute("RELEASE SAVEPOINT query_log_plan")
+                    if own_transaction:
+                        explain.execute("ROLLBACK")
+        except Exception as e:
+            logger.warning(f"Could not capture plan for {statement_id}: {e}")
+        if plan is None:
+            return
+        self.store_plan(statement_id, {
+            'plan': plan,
+            'analyzed': analyze,
+            'duration_ms': round(elapsed_ms, 2),
+            'captured_at': datetime.now().isoformat()
+        })
+
+    def store_plan(self, statement_id, plan):
+        if self.redis is None:
+            with self._lock:
+                if statement_id in self._stats:
+                    self._stats[statement_id]['plan'] = plan
+            return
+        try:
+            self.redis.set(PLAN_KEY.format(statement_id), serialization.dumps(plan), ex=STATEMENT_TTL)
+        except Exception as e:
+            logger.warning(f"Could not store plan for {statement_id}: {e}")
+
+    def _ensure_flusher(self):
+        if self.redis is None or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            # Counts inherited across fork belong to the parent
+            self._pending = {}
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='query-log', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Query log flush failed: {e}")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending or self.redis is None:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for statement_id, entry in pending.items():
+            key = STATEMENT_KEY.format(statement_id)
+            pipe.hsetnx(key, 'query', entry['query'])
+            pipe.hincrby(key, 'calls', entry['calls'])
+            pipe.hincrbyfloat(key, 'total_ms', entry['total_ms'])
+            pipe.hincrby(key, 'rows', entry['rows'])
+            pipe.hincrby(key, 'slow_calls', entry['slow_calls'])
+            pipe.expire(key, STATEMENT_TTL)
+            pipe.zincrby(TOTAL_KEY, entry['total_ms'], statement_id)
+            pipe.zadd(MAX_KEY, {statement_id: entry['max_ms']}, gt=True)
+        # Keep the heaviest statements only
+        pipe.zremrangebyrank(TOTAL_KEY, 0, -MAX_STATEMENTS - 1)
+        pipe.zremrangebyrank(MAX_KEY, 0, -MAX_STATEMENTS - 1)
+        pipe.execute()
+
+    def top(self, limit=20, order='total'):
+        """Statements ordered by total (default), max, mean time or calls"""
+        if self.redis is None:
+            with self._lock:
+                statements = [dict(entry, id=statement_id) for statement_id, entry in self._stats.items()]
+        else:
+            statements = self._load()
+        for entry in statements:
+            entry['total_ms'] = round(entry['total_ms'], 2)
+            entry['max_ms'] = round(entry['max_ms'], 2)
+            entry['mean_ms'] = round(entry['total_ms'] / entry['calls'], 2) if entry['calls'] else 0
+        sort_key = {'total': 'total_ms', 'max': 'max_ms', 'mean': 'mean_ms', 'calls': 'calls'}[order]
+        statements.sort(key=lambda entry: entry[sort_key], reverse=True)
+        return statements[:limit]
+
+    def _load(self):
+        ids = self.redis.zrevrange(TOTAL_KEY, 0, MAX_STATEMENTS - 1)
+        if not ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for statement_id in ids:
+            pipe.hgetall(STATEMENT_KEY.format(statement_id))
+            pipe.get(PLAN_KEY.format(statement_id))
+        pipe.zmscore(MAX_KEY, ids)
+        *rows, max_times = pipe.execute()
+
+        statements = []
+        for index, statement_id in enumerate(ids):
+            entry, plan = rows[index * 2], rows[index * 2 + 1]
+            if not entry:
+                continue
+            statements.append({
+                'id': statement_id,
+                'query': entry.get('query'),
+                'calls': int(entry.get('calls', 0)),
+                'total_ms': float(entry.get('total_ms', 0)),
+                'max_ms': max_times[index] or 0.0,
+                'rows': int(entry.get('rows', 0)),
+                'slow_calls': int(entry.get('slow_calls', 0)),
+                'plan': serialization.loads(plan) if plan else None
+            })
+        return statements
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._pending.clear()
+            self._last_plan.clear()
+        if self.redis is not None:
+            keys = [STATEMENT_KEY.format(statement_id) for statement_id in self.redis.zrange(TOTAL_KEY, 0, -1)]
+            keys += [PLAN_KEY.format(key.rsplit(':', 1)[1]) for key in keys]
+            self.redis.delete(TOTAL_KEY, MAX_KEY, *keys)
+
+    def register(self, app, path='/api/slow-queries'):
+        """GET lists the top statements (?limit=&order=total|max|mean|calls); DELETE resets"""
+
+        def slow_queries():
+            if request.method == 'DELETE':
+                self.reset()
+                return jsonify({'message': 'Query statistics reset'})
+            order = request.args.get('order', 'total')
+            if order not in ('total', 'max', 'mean', 'calls'):
+                return jsonify({'error': 'order must be one of total, max, mean, calls'}), 400
+            try:
+                limit = min(int(request.args.get('limit', 20)), 200)
+                return jsonify({
+                    'slow_query_ms': SLOW_QUERY_MS,
+                    'statements': self.top(limit, order)
+                })
+            except ValueError:
+                return jsonify({'error': 'limit must be an integer'}), 400
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        app.add_url_rule(path, 'slow_queries', slow_queries, methods=['GET', 'DELETE'])
+        return self
+
+
+# Process-wide log fed by metrics.TimedCursor; services call configure() to share it through Redis
+query_log = QueryLog()
+
+
+def configure(redis_client):
+    query_log.redis = redis_client
+    return query_log
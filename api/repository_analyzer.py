@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
+import metrics
+import profiling
+import serialization
 import git
 import os
 import json
@@ -11,6 +14,9 @@ import re
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'repository-analyzer')
+serialization.install(app)
 
 class RepositoryAnalyzer:
     def __init__(self):
@@ -323,4 +329,4 @@ def generate_test_plans():
     return jsonify(test_plans)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8875, debug=True)
+    app.run(host='0.0.0.0', port=8875, debug=os.environ.get('FLASK_DEBUG') == '1')
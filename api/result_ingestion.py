@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Ingestion of real test output (JUnit XML and pytest-json-report).
+
+Both parsers read the report incrementally and yield one normalized result
+per test case, so memory stays flat regardless of report size. Results are
+written to test_results in batches with COPY and linked to test_cases by name.
+"""
+import io
+import re
+import csv
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+import ijson
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+FORMATS = ('junit', 'pytest-json')
+
+# Raised for malformed reports (client errors)
+PARSE_ERRORS = (ET.ParseError, ijson.JSONError, ValueError)
+
+# Suite-level children that are not needed once closed
+_SUITE_NOISE = {'properties', 'system-out', 'system-err'}
+
+
+def detect_format(requested, content_type):
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format '{requested}', expected one of {', '.join(FORMATS)}")
+        return requested
+    content_type = (content_type or '').lower()
+    if 'xml' in content_type:
+        return 'junit'
+    if 'json' in content_type:
+        return 'pytest-json'
+    raise ValueError("Cannot detect report format; pass ?format=junit or ?format=pytest-json")
+
+
+def iter_results(stream, report_format):
+    if report_format == 'junit':
+        return iter_junit_results(stream)
+    return iter_pytest_json_results(stream)
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_junit_results(stream):
+    """Yield results from a JUnit XML stream, discarding each element once read"""
+    stack = []
+    suites = []
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = _local(elem.tag)
+        if event == 'start':
+            stack.append(elem)
+            if tag == 'testsuite':
+                suites.append(elem.get('name'))
+            continue
+
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        if tag == 'testcase':
+            status, message, details = 'passed', None, None
+            for child in elem:
+                child_tag = _local(child.tag)
+                if child_tag in ('failure', 'error', 'skipped'):
+                    status = 'failed' if child_tag == 'failure' else child_tag
+                    message = child.get('message')
+                    details = (child.text or '').strip() or None
+                    break
+            try:
+                duration = float(elem.get('time') or 0)
+            except ValueError:
+                duration = None
+            yield {
+                'name': elem.get('name'),
+                'classname': elem.get('classname'),
+                'suite': suites[-1] if suites else None,
+                'status': status,
+                'duration': duration,
+                'message': message,
+                'error_details': details
+            }
+        elif tag == 'testsuite':
+            suites.pop()
+        elif tag not in _SUITE_NOISE:
+            continue
+
+        elem.clear()
+        if parent is not None:
+            parent.remove(elem)
+
+
+def iter_pytest_json_results(stream):
+    """Yield results from a pytest-json-report document without loading it whole"""
+    for test in ijson.items(stream, 'tests.item', use_float=True):
+        nodeid = test.get('nodeid', '')
+        path, _, name = nodeid.rpartition('::')
+        outcome = test.get('outcome', 'unknown')
+        status = {'xfailed': 'skipped', 'xpassed': 'passed'}.get(outcome, outcome)
+
+        duration = 0.0
+        message = None
+        details = None
+        for phase in ('setup', 'call', 'teardown'):
+            stage = test.get(phase) or {}
+            duration += stage.get('duration') or 0
+            if message is None and stage.get('outcome') not in (None, 'passed'):
+                crash = stage.get('crash') or {}
+                message = crash.get('message')
+                details = stage.get('longrepr')
+
+        yield {
+            'name': name or nodeid,
+            'classname': path.replace('.py', '').replace('/', '.').replace('::', '.') or None,
+            'suite': nodeid.split('::', 1)[0] or None,
+            'status': status,
+            'duration': duration,
+            'message': message,
+            'error_details': details
+        }
+
+
+_VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d+')
+
+
+def error_hash(message, details):
+    """Stable fingerprint of a failure so identical errors group together"""
+    text = message or (details or '').strip().split('\n', 1)[0]
+    if not text:
+        return None
+    return hashlib.sha1(_VOLATILE.sub('#', text.strip()).encode('utf-8')).hexdigest()
+
+
+def normalize(result):
+    """Coerce a client-supplied result dict to the shape produced by the parsers"""
+    status = str(result.get('status', 'unknown')).lower()
+    try:
+        duration = float(result['duration']) if result.get('duration') is not None else None
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        'test_case_id': result.get('test_case_id'),
+        'name': result.get('name'),
+        'classname': result.get('classname'),
+        'suite': result.get('suite'),
+        'status': status,
+        'duration': duration,
+        'message': result.get('message'),
+        'error_details': result.get('error_details')
+    }
+
+
+def _link_test_cases(cur, names):
+    cur.execute("""
+        SELECT DISTINCT ON (name) name, id FROM test_cases
+        WHERE name = ANY(%s)
+        ORDER BY name, created_at DESC
+    """, (list(names),))
+    return dict(cur.fetchall())
+
+
+COPY_COLUMNS = ('execution_id', 'test_case_id', 'name', 'classname', 'status',
+                'duration', 'message', 'error_details', 'error_hash')
+
+
+def write_batch(cur, execution_id, batch):
+    """COPY one batch of results, resolving test_case_id by name where not given"""
+    names = {r['name'] for r in batch if r['name'] and not r.get('test_case_id')}
+    case_ids = _link_test_cases(cur, names) if names else {}
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for r in batch:
+        writer.writerow((
+            execution_id,
+            r.get('test_case_id') or case_ids.get(r['name']),
+            r['name'], r['classname'], r['status'], r['duration'],
+            r['message'], r['error_details'],
+            error_hash(r['message'], r['error_details']) if r['status'] != 'passed' else None
+        ))
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY test_results ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    return len(batch)
+
+
+def ingest(conn, execution_id, results, batch_size=BATCH_SIZE, on_batch=None):
+    """Write results for an execution inside the caller's transaction.
+
+    Returns summary counters; on_batch(summary) is called after every batch.
+    """
+    summary = {'tests_run': 0, 'tests_passed': 0, 'tests_failed': 0, 'tests_skipped': 0, 'duration': 0.0}
+    batch = []
+    with conn.cursor() as cur:
+        for result in results:
+            batch.append(result)
+            summary['tests_run'] += 1
+            status = result['status']
+            if status == 'passed':
+                summary['tests_passed'] += 1
+            elif status == 'skipped':
+                summary['tests_skipped'] += 1
+            else:
+                summary['tests_failed'] += 1
+            summary['duration'] += result['duration'] or 0
+            if len(batch) >= batch_size:
+                write_batch(cur, execution_id, batch)
+                batch = []
+                if on_batch:
+                    on_batch(summary)
+        if batch:
+            write_batch(cur, execution_id, batch)
+            if on_batch:
+                on_batch(summary)
+    summary['duration'] = round(summary['duration'], 3)
+    summary['status'] = 'passed' if summary['tests_failed'] == 0 else 'failed'
+    return summary
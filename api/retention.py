@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Retention and archival engine for evidence and reports stored in MinIO.
+
+Each run walks a bounded slice of the bucket starting from a cursor kept in
+Redis, so a full pass over the bucket is spread across many runs:
+
+- projects/{project}/evidence|reports/* older than the project's hot window are
+  packed into compressed bundles under archives/{project}/; the dated
+  evidence|reports/YYYY/MM/DD/* objects written by the evidence manager belong
+  to no project, follow the default policy and go to archives/_shared/. Each
+  archived key is recorded in archived_objects before the originals are removed
+- temp/* older than the temp window is deleted
+
+Database references keep the original keys: open_object() reads an object
+from its bundle once it has been archived.
+"""
+import os
+import re
+import uuid
+import logging
+import tarfile
+import tempfile
+from datetime import datetime, timedelta, timezone
+from minio.deleteobjects import DeleteObject
+from minio.error import S3Error
+import storage
+
+logger = logging.getLogger(__name__)
+
+RETENTION_INTERVAL = int(os.getenv('RETENTION_INTERVAL', '900'))
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+DEFAULT_HOT_DAYS = int(os.getenv('RETENTION_HOT_DAYS', '30'))
+DEFAULT_TEMP_HOURS = int(os.getenv('RETENTION_TEMP_HOURS', '24'))
+BUNDLE_MAX_BYTES = int(os.getenv('RETENTION_BUNDLE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+LOCK_KEY = 'retention:lock'
+CURSOR_KEY = 'retention:cursor:{}'
+
+PROJECT_OBJECT = re.compile(r'^projects/(?P<project>[^/]+)/(?P<kind>evidence|reports)/.+[^/]$')
+DATED_OBJECT = re.compile(r'^(?P<kind>evidence|reports)/\d{4}/\d{2}/\d{2}/.+[^/]$')
+# Archive folder for objects outside projects/
+SHARED_PROJECT = '_shared'
+ARCHIVED_PREFIXES = ('projects/', 'evidence/', 'reports/')
+
+# Deletes the lock only while it still holds this run's token
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _ObjectStream:
+    """Readable, iterable object content; close() releases the bundle or HTTP response behind it"""
+
+    def __init__(self, reader, *resources):
+        self.reader = reader
+        self.resources = resources
+        self.closed = False
+
+    def read(self, size=-1):
+        return self.reader.read(size)
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self.read(64 * 1024)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for resource in (self.reader,) + self.resources:
+            resource.close()
+            if hasattr(resource, 'release_conn'):
+                resource.release_conn()
+
+
+def _archive_key(get_db, object_name):
+    conn = get_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT archive_key FROM archived_objects WHERE object_key = %s", (object_name,))
+            row = cur.fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def open_object(client, bucket, object_name, get_db):
+    """Stream of an object's content, read from its archive bundle once retention has moved it.
+
+    Raises FileNotFoundError when the object is neither in the bucket nor archived.
+    """
+    if object_name.startswith('archives/') and '#' in object_name:
+        # References rewritten as "<archive>#<key>" by earlier versions
+        archive_key, member_name = object_name.split('#', 1)
+    else:
+        member_name = object_name
+        try:
+            return _ObjectStream(storage.with_retry(client.get_object, bucket, object_name))
+        except S3Error as e:
+            if e.code != 'NoSuchKey':
+                raise
+        archive_key = _archive_key(get_db, object_name)
+        if archive_key is None:
+            raise FileNotFoundError(object_name)
+
+    bundle = storage.with_retry(client.get_object, bucket, archive_key)
+    tar = tarfile.open(fileobj=bundle, mode='r|gz')
+    for member in tar:
+        if member.name == member_name:
+            return _ObjectStream(tar.extractfile(member), tar, bundle)
+    tar.close()
+    bundle.close()
+    bundle.release_conn()
+    raise FileNotFoundError(object_name)
+
+
+class RetentionEngine:
+    def __init__(self, minio_client, bucket, get_db, redis_client):
+        self.client = minio_client
+        self.bucket = bucket
+        self.get_db = get_db
+        self.redis = redis_client
+        self._release_lock = redis_client.register_script(RELEASE_LOCK)
+
+    def run_once(self):
+        """Run one bounded retention pass; skipped if another process holds the lock"""
+        token = uuid.uuid4().hex
+        if not self.redis.set(LOCK_KEY, token, nx=True, ex=RETENTION_INTERVAL):
+            return None
+        try:
+            policies = self.load_policies()
+            stats = {
+                'purged': self.purge_temp(policies.get('*', {}).get('temp_hours', DEFAULT_TEMP_HOURS)),
+                'archived': self.archive_projects(policies)
+            }
+            logger.info(f"Retention pass finished: {stats}")
+            return stats
+        finally:
+            # A pass that outlived the lock must not release the next holder's
+            self._release_lock(keys=[LOCK_KEY], args=[token])
+
+    def load_policies(self):
+        """Per-project policies keyed by project name; '*' holds the defaults"""
+        policies = {'*': {'hot_days': DEFAULT_HOT_DAYS, 'temp_hours': DEFAULT_TEMP_HOURS, 'enabled': True}}
+        conn = self.get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT project_name, hot_days, temp_hours, enabled FROM retention_policies")
+                for name, hot_days, temp_hours, enabled in cur.fetchall():
+                    policies[name] = {'hot_days': hot_days, 'temp_hours': temp_hours, 'enabled': enabled}
+        except Exception as e:
+            logger.warning(f"Could not load retention policies, using defaults: {e}")
+        finally:
+            conn.close()
+        return policies
+
+    def _scan(self, prefix):
+        """Yield at most RETENTION_BATCH_SIZE objects after the stored cursor"""
+        cursor_key = CURSOR_KEY.format(prefix.strip('/'))
+        start_after = self.redis.get(cursor_key) or None
+        objects = self.client.list_objects(self.bucket, prefix=prefix, recursive=True, start_after=start_after)
+        last_key = None
+        count = 0
+        for obj in objects:
+            yield obj
+            last_key = obj.object_name
+            count += 1
+            if count >= RETENTION_BATCH_SIZE:
+                break
+        if count < RETENTION_BATCH_SIZE:
+            # Reached the end of the prefix, next run starts over
+            self.redis.delete(cursor_key)
+        else:
+            self.redis.set(cursor_key, last_key)
+
+    def purge_temp(self, temp_hours):
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=temp_hours)
+        expired = [
+            obj.object_name
+            for obj in self._scan('temp/')
+            if not obj.object_name.endswith('/') and obj.last_modified and obj.last_modified < cutoff
+        ]
+        if expired:
+            for error in self.client.remove_objects(self.bucket, [DeleteObject(key) for key in expired]):
+                logger.error(f"Temp purge error: {error}")
+            self._unindex(expired)
+        return len(expired)
+
+    def _unindex(self, keys):
+        conn = self.get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT to_regclass('storage_objects')")
+                    if cur.fetchone()[0] is not None:
+                        cur.execute(
+                            "DELETE FROM storage_objects WHERE bucket = %s AND object_name = ANY(%s)",
+                            (self.bucket, keys)
+                        )
+        except Exception as e:
+            logger.warning(f"Storage index cleanup error: {e}")
+        finally:
+            conn.close()
+
+    def archive_projects(self, policies):
+        now = datetime.now(timezone.utc)
+        default = policies['*']
+        groups = {}
+        for prefix in ARCHIVED_PREFIXES:
+            for obj in self._scan(prefix):
+                match = PROJECT_OBJECT.match(obj.object_name) or DATED_OBJECT.match(obj.object_name)
+                if not match or not obj.last_modified:
+                    continue
+                project = match.groupdict().get('project') or SHARED_PROJECT
+                policy = policies.get(project, default)
+                if not policy['enabled']:
+                    continue
+                if obj.last_modified < now - timedelta(days=policy['hot_days']):
+                    groups.setdefault((project, match.group('kind')), []).append(obj)
+
+        archived = 0
+        for (project, kind), objects in groups.items():
+            for chunk in self._chunks(objects):
+                archived += self.archive_bundle(project, kind, chunk)
+        return archived
+
+    def _chunks(self, objects):
+        chunk, size = [], 0
+        for obj in objects:
+            if chunk and size + (obj.size or 0) > BUNDLE_MAX_BYTES:
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(obj)
+            size += obj.size or 0
+        if chunk:
+            yield chunk
+
+    def archive_bundle(self, project, kind, objects):
+        """Pack objects into one tar.gz bundle, record where each went, then remove originals"""
+        objects = self._skip_already_archived(objects)
+        if not objects:
+            return 0
+
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        archive_key = f"archives/{project}/{kind}/{stamp}.tar.gz"
+
+        with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as buffer:
+            with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+                for obj in objects:
+                    response = storage.with_retry(self.client.get_object, self.bucket, obj.object_name)
+                    try:
+                        info = tarfile.TarInfo(obj.object_name)
+                        info.size = obj.size
+                        info.mtime = obj.last_modified.timestamp()
+                        tar.addfile(info, response)
+                    finally:
+                        response.close()
+                        response.release_conn()
+            length = buffer.tell()
+
+            def _put():
+                buffer.seek(0)
+                return self.client.put_object(self.bucket, archive_key, buffer, length, 'application/gzip')
+
+            storage.with_retry(_put)
+
+        try:
+            self._record_archive(project, archive_key, length, objects)
+        except Exception:
+            # Leave the originals untouched if the database could not be updated
+            self.client.remove_object(self.bucket, archive_key)
+            raise
+
+        for error in self.client.remove_objects(self.bucket, [DeleteObject(o.object_name) for o in objects]):
+            logger.error(f"Archive cleanup error: {error}")
+
+        logger.info(f"Archived {len(objects)} objects into {archive_key}")
+        return len(objects)
+
+    def _skip_already_archived(self, objects):
+        """Drop objects whose archive committed but whose delete did not run"""
+        conn = self.get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT object_key FROM archived_objects WHERE object_key = ANY(%s)",
+                    ([o.object_name for o in objects],)
+                )
+                done = {row[0] for row in cur.fetchall()}
+        finally:
+            conn.close()
+        if done:
+            for error in self.client.remove_objects(self.bucket, [DeleteObject(key) for key in done]):
+                logger.error(f"Archive cleanup error: {error}")
+        return [o for o in objects if o.object_name not in done]
+
+    def _record_archive(self, project, archive_key, archive_size, objects):
+        conn = self.get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    cur.executemany("""
+                        INSERT INTO archived_objects (object_key, archive_key, size, archived_at)
+                        VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                        ON CONFLICT (object_key) DO UPDATE SET archive_key = EXCLUDED.archive_key
+                    """, [(o.object_name, archive_key, o.size) for o in objects])
+
+                    # Keep the object index in step with the bucket
+                    cur.execute("SELECT to_regclass('storage_objects')")
+                    if cur.fetchone()[0] is not None:
+                        cur.execute(
+                            "DELETE FROM storage_objects WHERE bucket = %s AND object_name = ANY(%s)",
+                            (self.bucket, [o.object_name for o in objects])
+                        )
+                        cur.execute("""
+                            INSERT INTO storage_objects
+                                (bucket, object_name, project, storage_type, size, content_type, last_modified)
+                            VALUES (%s, %s, %s, 'archive', %s, 'application/gzip', CURRENT_TIMESTAMP)
+                            ON CONFLICT (bucket, object_name) DO NOTHING
+                        """, (self.bucket, archive_key, project, archive_size))
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    import redis
+    import psycopg2
+    from config import DB_CONFIG, REDIS_CONFIG, MINIO_CONFIG
+
+    logging.basicConfig(level=logging.INFO)
+    engine = RetentionEngine(
+        storage.get_client(MINIO_CONFIG['endpoint'], MINIO_CONFIG['access_key'], MINIO_CONFIG['secret_key']),
+        MINIO_CONFIG['bucket'],
+        lambda: psycopg2.connect(**DB_CONFIG),
+        redis.Redis(decode_responses=True, **REDIS_CONFIG)
+    )
+    print(engine.run_once())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared JSON serialization for API responses, caches and stored objects.
+
+Uses orjson when it is installed, which encodes straight to UTF-8 bytes and
+handles datetime, date, UUID and dataclasses natively (datetimes as ISO 8601);
+otherwise falls back to the json module with the same conversions. install()
+makes it the JSON provider of a Flask app, so jsonify() and request.get_json()
+go through it as well.
+"""
+import json
+import uuid
+import decimal
+import dataclasses
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(value):
+    """Types the encoder does not know; same set as Flask's default provider"""
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if orjson is None:
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if dataclasses.is_dataclass(value):
+            return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _with_fallback(fallback):
+    def default(value):
+        try:
+            return _default(value)
+        except TypeError:
+            return fallback(value)
+    return default
+
+
+def dumps(value, indent=False, sort_keys=False, default=None):
+    """JSON as UTF-8 bytes; compact unless indent.
+
+    default converts values of any other type (e.g. str, as json.dumps(default=str) did).
+    """
+    encode = _with_fallback(default) if default is not None else _default
+    if orjson is not None:
+        options = _OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(value, default=encode, option=options)
+    return json.dumps(value, default=encode, ensure_ascii=False, sort_keys=sort_keys,
+                      indent=2 if indent else None, separators=None if indent else (',', ':')).encode('utf-8')
+
+
+def dumps_str(value, indent=False, default=None):
+    """JSON as text, for Redis values and JSON database columns"""
+    return dumps(value, indent, default=default).decode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps() and loads().
+
+    ensure_ascii is ignored: output is always UTF-8.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, indent=bool(kwargs.get('indent')),
+                     sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = dumps(obj, indent=indent, sort_keys=self.sort_keys) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def install(app):
+    app.json = JSONProvider(app)
+    return app
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Shared MinIO access for all Veritas services.
+
+Clients are created once per (endpoint, credentials) and reuse a tuned
+urllib3 connection pool. Buckets that have been verified are remembered for
+the life of the process, so an upload is a single PUT round trip. Uploads are
+recorded in the object index set with set_index() (see storage_index.py).
+"""
+import io
+import os
+import time
+import random
+import logging
+import threading
+import urllib3
+from minio import Minio
+from minio.error import S3Error, ServerError
+from metrics import InstrumentedPoolManager
+
+logger = logging.getLogger(__name__)
+
+# Connection pool tuning
+POOL_MAXSIZE = int(os.getenv('MINIO_POOL_MAXSIZE', '32'))
+CONNECT_TIMEOUT = float(os.getenv('MINIO_CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('MINIO_READ_TIMEOUT', '60'))
+
+# Application level retries for transient failures
+MAX_RETRIES = int(os.getenv('MINIO_MAX_RETRIES', '3'))
+BACKOFF_BASE = float(os.getenv('MINIO_BACKOFF_BASE', '0.2'))
+BACKOFF_MAX = float(os.getenv('MINIO_BACKOFF_MAX', '5'))
+
+TRANSIENT_S3_CODES = {
+    'InternalError',
+    'ServiceUnavailable',
+    'SlowDown',
+    'RequestTimeout',
+    'RequestTimeTooSkewed',
+    'OperationAborted',
+}
+
+_clients = {}
+_http_pools = {}
+_verified_buckets = set()
+_lock = threading.Lock()
+_index = None
+
+
+def _http_client():
+    return InstrumentedPoolManager(
+        num_pools=4,
+        maxsize=POOL_MAXSIZE,
+        block=False,
+        timeout=urllib3.util.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT),
+        # Retries are done once, by with_retry; urllib3 retrying as well would multiply them
+        retries=False
+    )
+
+
+def get_client(endpoint, access_key, secret_key, secure=False):
+    """Return the long-lived client for an endpoint, creating it on first use"""
+    secure = str(secure).lower() in ('1', 'true', 'yes')
+    key = (endpoint, access_key, secret_key, secure)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                http = _http_client()
+                client = Minio(
+                    endpoint,
+                    access_key=access_key,
+                    secret_key=secret_key,
+                    secure=secure,
+                    http_client=http
+                )
+                _clients[key] = client
+                _http_pools[key] = http
+    return client
+
+
+def reset():
+    """Drop cached clients and bucket memo"""
+    with _lock:
+        _clients.clear()
+        _http_pools.clear()
+        _verified_buckets.clear()
+
+
+def set_index(index):
+    """Record every put_bytes() upload in index (a storage_index.StorageIndex); None disables it"""
+    global _index
+    _index = index
+
+
+def after_fork():
+    """Close sockets inherited from the parent process; clients stay usable"""
+    with _lock:
+        for http in _http_pools.values():
+            http.clear()
+
+
+def _bucket_key(client, bucket):
+    return (id(client), bucket)
+
+
+def ensure_bucket(client, bucket):
+    """Create the bucket if needed; checked at most once per process"""
+    key = _bucket_key(client, bucket)
+    if key in _verified_buckets:
+        return
+    if not with_retry(client.bucket_exists, bucket):
+        try:
+            with_retry(client.make_bucket, bucket)
+            logger.info(f"Created MinIO bucket: {bucket}")
+        except S3Error as e:
+            if e.code not in ('BucketAlreadyOwnedByYou', 'BucketAlreadyExists'):
+                raise
+    _verified_buckets.add(key)
+
+
+def forget_bucket(client, bucket):
+    _verified_buckets.discard(_bucket_key(client, bucket))
+
+
+def is_transient(error):
+    if isinstance(error, S3Error):
+        return error.code in TRANSIENT_S3_CODES
+    return isinstance(error, (ServerError, urllib3.exceptions.HTTPError, ConnectionError, TimeoutError))
+
+
+def with_retry(func, *args, **kwargs):
+    """Call func, retrying transient errors with exponential backoff and jitter"""
+    attempt = 0
+    while True:
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not is_transient(e):
+                raise
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+            delay = random.uniform(delay / 2, delay)
+            logger.warning(f"Transient MinIO error ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def put_bytes(client, bucket, object_name, data, content_type='application/octet-stream',
+              storage_type=None, project=None):
+    """Upload an in-memory payload, creating the bucket only on first use, and index it"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    ensure_bucket(client, bucket)
+
+    def _put():
+        return client.put_object(bucket, object_name, io.BytesIO(data), len(data), content_type)
+
+    try:
+        result = with_retry(_put)
+    except S3Error as e:
+        if e.code != 'NoSuchBucket':
+            raise
+        # Bucket was removed behind our back; verify again and retry once
+        forget_bucket(client, bucket)
+        ensure_bucket(client, bucket)
+        result = with_retry(_put)
+    if _index is not None:
+        _index.record(bucket, object_name, len(data), content_type, getattr(result, 'etag', None),
+                      storage_type, project)
+    return result
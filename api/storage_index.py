@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Postgres index of the objects stored in MinIO (storage_objects).
+
+Once a service calls storage.set_index(StorageIndex(get_db)), every
+storage.put_bytes() upload is recorded here, so listings page through the
+table instead of the bucket. reindex() re-syncs a bucket: it picks up objects
+written by other means and drops rows for objects that no longer exist. It
+runs as a background job every STORAGE_REINDEX_INTERVAL seconds.
+"""
+import os
+import logging
+from datetime import datetime, timezone
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+REINDEX_INTERVAL = int(os.getenv('STORAGE_REINDEX_INTERVAL', '3600'))
+REINDEX_BATCH_SIZE = 1000
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS storage_objects (
+        bucket VARCHAR(255) NOT NULL,
+        object_name VARCHAR(1024) NOT NULL,
+        project VARCHAR(255),
+        storage_type VARCHAR(100),
+        size BIGINT NOT NULL DEFAULT 0,
+        content_type VARCHAR(255),
+        etag VARCHAR(255),
+        last_modified TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (bucket, object_name)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_storage_objects_prefix ON storage_objects(bucket, object_name varchar_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_storage_objects_project_modified ON storage_objects(bucket, project, last_modified)",
+    "CREATE INDEX IF NOT EXISTS idx_storage_objects_modified ON storage_objects(bucket, last_modified)",
+]
+
+UPSERT = """
+    INSERT INTO storage_objects
+        (bucket, object_name, project, storage_type, size, content_type, etag, last_modified)
+    VALUES %s
+    ON CONFLICT (bucket, object_name) DO UPDATE SET
+        project = COALESCE(EXCLUDED.project, storage_objects.project),
+        storage_type = COALESCE(EXCLUDED.storage_type, storage_objects.storage_type),
+        size = EXCLUDED.size,
+        content_type = COALESCE(EXCLUDED.content_type, storage_objects.content_type),
+        etag = EXCLUDED.etag,
+        last_modified = EXCLUDED.last_modified
+"""
+
+
+def install(conn):
+    with conn.cursor() as cur:
+        for statement in SCHEMA:
+            cur.execute(statement)
+    conn.commit()
+
+
+def project_of(object_name):
+    parts = object_name.split('/')
+    if len(parts) > 2 and parts[0] == 'projects':
+        return parts[1]
+    return None
+
+
+def like_prefix(prefix):
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _utc(value):
+    """Naive UTC, as stored in the TIMESTAMP column"""
+    if value is None:
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class StorageIndex:
+    def __init__(self, get_db):
+        self.get_db = get_db
+
+    def _execute(self, func):
+        conn = self.get_db()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    return func(cur)
+        finally:
+            conn.close()
+
+    def record(self, bucket, object_name, size, content_type=None, etag=None, storage_type=None, project=None):
+        """Index one uploaded object; errors are logged, the upload already succeeded"""
+        if object_name.endswith('/'):
+            return
+        row = (bucket, object_name, project or project_of(object_name), storage_type,
+               size, content_type, etag, datetime.utcnow())
+        try:
+            self._execute(lambda cur: execute_values(cur, UPSERT, [row]))
+        except Exception as e:
+            logger.error(f"Storage index update error for {object_name}: {e}")
+
+    def remove(self, bucket, object_names):
+        try:
+            self._execute(lambda cur: cur.execute(
+                "DELETE FROM storage_objects WHERE bucket = %s AND object_name = ANY(%s)",
+                (bucket, list(object_names))
+            ))
+        except Exception as e:
+            logger.error(f"Storage index delete error: {e}")
+
+    def reindex(self, client, bucket, prefix='', batch_size=REINDEX_BATCH_SIZE):
+        """Sync the rows under prefix with the bucket; returns (indexed, removed)"""
+        started = datetime.utcnow()
+        conn = self.get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE TEMP TABLE IF NOT EXISTS storage_index_seen (object_name VARCHAR(1024) PRIMARY KEY)")
+                cur.execute("TRUNCATE storage_index_seen")
+            conn.commit()
+
+            indexed = 0
+            batch = []
+            for obj in client.list_objects(bucket, prefix=prefix, recursive=True):
+                if obj.object_name.endswith('/'):
+                    continue
+                batch.append((bucket, obj.object_name, project_of(obj.object_name), None,
+                              obj.size or 0, None, obj.etag, _utc(obj.last_modified)))
+                if len(batch) >= batch_size:
+                    indexed += self._sync_batch(conn, batch)
+                    batch = []
+            if batch:
+                indexed += self._sync_batch(conn, batch)
+
+            # Rows written after the listing started may not have been listed yet
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM storage_objects o
+                    WHERE o.bucket = %s AND o.object_name LIKE %s AND o.last_modified < %s
+                      AND NOT EXISTS (SELECT 1 FROM storage_index_seen s WHERE s.object_name = o.object_name)
+                """, (bucket, like_prefix(prefix), started))
+                removed = cur.rowcount
+                cur.execute("DROP TABLE storage_index_seen")
+            conn.commit()
+            return indexed, removed
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _sync_batch(self, conn, batch):
+        with conn.cursor() as cur:
+            execute_values(cur, UPSERT, batch)
+            execute_values(cur, "INSERT INTO storage_index_seen (object_name) VALUES %s ON CONFLICT DO NOTHING",
+                           [(row[1],) for row in batch])
+        conn.commit()
+        return len(batch)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Bulk import of test cases from a JSON array or CSV stream.
+
+Rows are validated one by one and upserted in batches inside the caller's
+transaction: each batch is COPYed into a temporary staging table and merged
+into test_cases with one UPDATE and one INSERT. A row updates the test case
+with the same id when it carries one, otherwise the most recent test case with
+the same name in the same suite; rows matching nothing are inserted. Invalid
+rows are reported by line and skipped; a batch the database rejects is rolled
+back to a savepoint and retried row by row, so only the offending rows fail.
+"""
+import io
+import csv
+import uuid
+import logging
+import ijson
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+FORMATS = ('json', 'csv')
+# Errors beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 1000
+
+PARSE_ERRORS = (ijson.JSONError, csv.Error, UnicodeDecodeError, ValueError)
+# Database errors that reject a row's values rather than the whole import
+ROW_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError)
+
+FIELDS = ('id', 'suite_id', 'name', 'description', 'test_type', 'priority', 'status')
+DEFAULTS = {'test_type': 'unit', 'priority': 'medium', 'status': 'active'}
+MAX_LENGTHS = {'name': 255, 'test_type': 50, 'priority': 20, 'status': 20}
+
+STAGING_COLUMNS = ('line', 'id', 'new_id', 'suite_id', 'name', 'description', 'test_type', 'priority', 'status')
+
+
+def detect_format(requested, content_type):
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format '{requested}', expected one of {', '.join(FORMATS)}")
+        return requested
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return 'csv'
+    if 'json' in content_type:
+        return 'json'
+    raise ValueError("Cannot detect import format; pass ?format=json or ?format=csv")
+
+
+class _Reader:
+    """Werkzeug's request stream raises on read(0), which ijson uses to sniff bytes vs text"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        return self.stream.read(size) if size else b''
+
+
+def iter_rows(stream, import_format):
+    """Yield (line, row dict); line is the CSV line or the array position"""
+    if import_format == 'csv':
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for index, row in enumerate(ijson.items(_Reader(stream), 'item'), 1):
+            yield index, row
+
+
+def _uuid(value, field):
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"{field} is not a valid UUID")
+
+
+def _check_text(value, field):
+    """PostgreSQL text cannot hold NUL, and lone surrogates have no UTF-8 encoding"""
+    if '\x00' in value:
+        raise ValueError(f"{field} contains a NUL character")
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        raise ValueError(f"{field} contains characters that cannot be encoded as UTF-8")
+
+
+def validate(row):
+    """Normalized test case from a client row; raises ValueError with the reason"""
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    case = {}
+    for field in FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        case[field] = value if value not in ('', None) else DEFAULTS.get(field)
+    if not case['name']:
+        raise ValueError("name is required")
+    for field in ('name', 'description', 'test_type', 'priority', 'status'):
+        if case[field] is not None and not isinstance(case[field], str):
+            case[field] = str(case[field])
+        if case[field] is not None:
+            _check_text(case[field], field)
+    for field, limit in MAX_LENGTHS.items():
+        if case[field] and len(case[field]) > limit:
+            raise ValueError(f"{field} is longer than {limit} characters")
+    for field in ('id', 'suite_id'):
+        if case[field] is not None:
+            case[field] = _uuid(case[field], field)
+    return case
+
+
+class Import:
+    """Counters and per-row errors of one import"""
+
+    def __init__(self):
+        self.received = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def summary(self):
+        return {
+            'received': self.received,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _create_staging(cur):
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS test_case_import (
+            line INTEGER,
+            id UUID,
+            new_id UUID,
+            suite_id UUID,
+            name VARCHAR(255),
+            description TEXT,
+            test_type VARCHAR(50),
+            priority VARCHAR(20),
+            status VARCHAR(20),
+            target UUID
+        ) ON COMMIT DROP
+    """)
+
+
+def _missing_suites(cur, batch):
+    suite_ids = list({case['suite_id'] for _, case in batch if case['suite_id']})
+    if not suite_ids:
+        return set()
+    cur.execute("SELECT id::text FROM test_suites WHERE id = ANY(%s::uuid[])", (suite_ids,))
+    return set(suite_ids) - {row[0] for row in cur.fetchall()}
+
+
+def _write(cur, batch):
+    """Upsert (line, case) pairs through the staging table; returns (updated, inserted)"""
+    # Later rows for the same test case win
+    rows = {}
+    for line, case in batch:
+        key = ('id', case['id']) if case['id'] else ('name', case['suite_id'], case['name'])
+        rows[key] = (line, case)
+    if not rows:
+        return 0, 0
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for line, case in rows.values():
+        writer.writerow((line, case['id'], case['id'] or uuid.uuid4(), case['suite_id'], case['name'],
+                         case['description'], case['test_type'], case['priority'], case['status']))
+    buffer.seek(0)
+    cur.execute("TRUNCATE test_case_import")
+    cur.copy_expert(f"COPY test_case_import ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    cur.execute("""
+        UPDATE test_case_import s SET target = t.id
+        FROM test_cases t WHERE s.id IS NOT NULL AND t.id = s.id
+    """)
+    cur.execute("""
+        UPDATE test_case_import s SET target = m.id
+        FROM (
+            SELECT DISTINCT ON (t.name, t.suite_id) t.id, t.name, t.suite_id
+            FROM test_cases t JOIN test_case_import i ON t.name = i.name AND i.id IS NULL
+            ORDER BY t.name, t.suite_id, t.created_at DESC
+        ) m
+        WHERE s.id IS NULL AND m.name = s.name AND m.suite_id IS NOT DISTINCT FROM s.suite_id
+    """)
+    cur.execute("""
+        UPDATE test_cases t SET
+            suite_id = s.suite_id, name = s.name, description = s.description,
+            test_type = s.test_type, priority = s.priority, status = s.status
+        FROM test_case_import s WHERE t.id = s.target
+    """)
+    updated = cur.rowcount
+    cur.execute("""
+        INSERT INTO test_cases (id, suite_id, name, description, test_type, priority, status)
+        SELECT new_id, suite_id, name, description, test_type, priority, status
+        FROM test_case_import WHERE target IS NULL
+    """)
+    return updated, cur.rowcount
+
+
+def _attempt(cur, batch):
+    """_write inside a savepoint; a rejected batch rolls back to it and the error is raised"""
+    cur.execute("SAVEPOINT test_case_batch")
+    try:
+        counts = _write(cur, batch)
+    except ROW_ERRORS:
+        cur.execute("ROLLBACK TO SAVEPOINT test_case_batch")
+        raise
+    cur.execute("RELEASE SAVEPOINT test_case_batch")
+    return counts
+
+
+def write_batch(cur, batch, result):
+    """Upsert one batch; when the database rejects it, retry row by row and report the failures"""
+    missing = _missing_suites(cur, batch)
+    valid = []
+    for line, case in batch:
+        if case['suite_id'] in missing:
+            result.error(line, f"suite_id {case['suite_id']} does not exist")
+        else:
+            valid.append((line, case))
+
+    try:
+        updated, inserted = _attempt(cur, valid)
+    except ROW_ERRORS:
+        updated = inserted = 0
+        for line, case in valid:
+            try:
+                row_updated, row_inserted = _attempt(cur, [(line, case)])
+            except ROW_ERRORS as e:
+                result.error(line, (e.diag.message_primary or str(e)).strip())
+                continue
+            updated += row_updated
+            inserted += row_inserted
+    result.updated += updated
+    result.inserted += inserted
+
+
+def import_test_cases(conn, rows, batch_size=BATCH_SIZE):
+    """Validate and upsert (line, row) pairs inside the caller's transaction; returns an Import"""
+    result = Import()
+    batch = []
+    with conn.cursor() as cur:
+        _create_staging(cur)
+        for line, row in rows:
+            result.received += 1
+            try:
+                batch.append((line, validate(row)))
+            except ValueError as e:
+                result.error(line, str(e))
+                continue
+            if len(batch) >= batch_size:
+                write_batch(cur, batch, result)
+                batch = []
+        if batch:
+            write_batch(cur, batch, result)
+    return result
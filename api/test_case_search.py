@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Full-text and faceted search over test_cases.
+
+Words in q are matched against name and description through a GIN index on
+the stored search_vector column (name weighted above description). When the
+pg_trgm index exists, q is also matched as a substring of the name, so partial
+identifiers like "login_redir" are found; without it only whole words match,
+since an unindexed substring test would scan the table. Results are ranked by
+text relevance, then recency, and come with facet counts by priority, status
+and test_type over all matches.
+"""
+import uuid
+import logging
+from psycopg2 import errors
+
+logger = logging.getLogger(__name__)
+
+MAX_OFFSET = 10000
+FACETS = ('priority', 'status', 'test_type')
+FILTERS = FACETS + ('suite_id',)
+
+# Stored so that matching and ranking do not re-parse every row
+SEARCH_VECTOR = ("setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                 "setweight(to_tsvector('simple', coalesce(description, '')), 'B')")
+TRIGRAM_INDEX = 'idx_test_cases_name_trgm'
+SORTS = ('created_at', 'name', 'priority')
+
+_trigram = None
+
+COLUMNS = ('id', 'suite_id', 'name', 'description', 'priority', 'status', 'test_type', 'created_at')
+
+
+def install(conn):
+    """Add the search column and indexes; the trigram index is skipped when pg_trgm is unavailable"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_test_cases_search ON test_cases USING GIN (search_vector)")
+        cur.execute("SAVEPOINT trigram")
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON test_cases USING GIN (name gin_trgm_ops)")
+        except (errors.FeatureNotSupported, errors.UndefinedFile, errors.InsufficientPrivilege) as e:
+            cur.execute("ROLLBACK TO SAVEPOINT trigram")
+            logger.warning(f"pg_trgm not available, substring search will not be indexed: {e}")
+    conn.commit()
+
+
+def parse_filters(args):
+    """Facet filters from query args; comma separated values match any.
+
+    Values are deduplicated and sorted so equivalent queries normalize alike.
+    A suite_id that is not a UUID raises ValueError.
+    """
+    filters = {}
+    for field in FILTERS:
+        value = args.get(field)
+        if value:
+            values = {v.strip() for v in value.split(',') if v.strip()}
+            if field == 'suite_id':
+                try:
+                    values = {str(uuid.UUID(v)) for v in values}
+                except ValueError:
+                    raise ValueError('suite_id must be a comma separated list of UUIDs')
+            if values:
+                filters[field] = sorted(values)
+    return filters
+
+
+def normalize_query(q):
+    """Whitespace collapsed and lowercased; matching is case-insensitive either way"""
+    return ' '.join((q or '').split()).lower()
+
+
+def _like_pattern(q):
+    escaped = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _has_trigram(cur):
+    """Only a positive answer is cached; the index may be created after the first search"""
+    global _trigram
+    if not _trigram:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (TRIGRAM_INDEX,))
+        _trigram = cur.fetchone()[0]
+    return _trigram
+
+
+def _conditions(cur, q, filters):
+    conditions, params = [], []
+    if q and _has_trigram(cur):
+        conditions.append("(search_vector @@ websearch_to_tsquery('simple', %s) OR name ILIKE %s)")
+        params += [q, _like_pattern(q)]
+    elif q:
+        conditions.append("search_vector @@ websearch_to_tsquery('simple', %s)")
+        params.append(q)
+    for field, values in filters.items():
+        cast = '::uuid[]' if field == 'suite_id' else ''
+        conditions.append(f"{field} = ANY(%s{cast})")
+        params.append(values)
+    return ' AND '.join(conditions) or 'TRUE', params
+
+
+def list_cases(conn, filters=None, sort='created_at', descending=True, limit=100, offset=0):
+    """One page of test cases matching filters, in the given order"""
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    direction = 'DESC' if descending else 'ASC'
+    offset = max(0, min(offset, MAX_OFFSET))
+    with conn.cursor() as cur:
+        where, params = _conditions(cur, '', filters or {})
+        cur.execute(f"""
+            SELECT {', '.join(COLUMNS)} FROM test_cases WHERE {where}
+            ORDER BY {sort} {direction}, id {direction}
+            LIMIT %s OFFSET %s
+        """, params + [limit, offset])
+        return [dict(zip(COLUMNS, row)) for row in cur.fetchall()]
+
+
+def search(conn, q='', filters=None, limit=50, offset=0):
+    """One page of matching test cases, the total and facet counts"""
+    q = (q or '').strip()
+    offset = max(0, min(offset, MAX_OFFSET))
+    with conn.cursor() as cur:
+        where, params = _conditions(cur, q, filters or {})
+        if q:
+            rank = "ts_rank(search_vector, websearch_to_tsquery('simple', %s))"
+            order = "rank DESC, created_at DESC, id DESC"
+            rank_params = [q]
+        else:
+            rank, order, rank_params = "0", "created_at DESC, id DESC", []
+        cur.execute(f"""
+            SELECT {', '.join(COLUMNS)}, {rank} AS rank
+            FROM test_cases WHERE {where}
+            ORDER BY {order}
+            LIMIT %s OFFSET %s
+        """, rank_params + params + [limit, offset])
+        results = []
+        for row in cur.fetchall():
+            case = dict(zip(COLUMNS, row))
+            case['id'] = str(case['id'])
+            case['suite_id'] = str(case['suite_id']) if case['suite_id'] else None
+            case['created_at'] = case['created_at'].isoformat() if case['created_at'] else None
+            case['rank'] = round(row[-1], 4)
+            results.append(case)
+
+        # Every facet and the total in a single pass over the matches
+        cur.execute(f"""
+            SELECT priority, status, test_type, GROUPING(priority, status, test_type), COUNT(*)
+            FROM test_cases WHERE {where}
+            GROUP BY GROUPING SETS ((priority), (status), (test_type), ())
+        """, params)
+        facets = {facet: {} for facet in FACETS}
+        total = 0
+        for priority, status, test_type, grouping, count in cur.fetchall():
+            # GROUPING() bits are set for the columns rolled up in that row
+            if grouping == 0b111:
+                total = count
+            elif grouping == 0b011:
+                facets['priority'][priority or 'none'] = count
+            elif grouping == 0b101:
+                facets['status'][status or 'none'] = count
+            elif grouping == 0b110:
+                facets['test_type'][test_type or 'none'] = count
+
+    return {
+        'results': results,
+        'total': total,
+        'facets': facets,
+        'limit': limit,
+        'offset': offset
+    }
@@ -6,13 +6,19 @@ import logging
 from datetime import datetime
 import uuid
 import psycopg2
-import redis
-import json
-from minio import Minio
-import io
+import metrics
+import profiling
+import serialization
+from health import HealthMonitor, database_probe
+import storage
+import storage_index
+from http_cache import bump_versions
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'test-execution-engine')
+serialization.install(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,11 +28,15 @@ def get_db():
         host='veritas-postgres',
         database='veritas_db',
         user='veritas_user',
-        password='veritas_pass'
+        password='veritas_pass',
+        cursor_factory=metrics.TimedCursor
     )
 
+# Every put_bytes upload is recorded in storage_objects
+storage.set_index(storage_index.StorageIndex(get_db))
+
 def get_redis():
-    return redis.Redis(host='veritas-redis', port=6379, decode_responses=True)
+    return metrics.InstrumentedRedis(host='veritas-redis', port=6379, decode_responses=True)
 
 def get_config(key, default=None):
     try:
@@ -53,11 +63,16 @@ def get_config(key, default=None):
     
     return default
 
+_minio_client = None
+
 def get_minio():
-    endpoint = get_config('minio_endpoint', '172.21.48.1:9898')
-    access_key = get_config('minio_access_key', 'minioadmin')
-    secret_key = get_config('minio_secret_key', 'minioadmin123')
-    return Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=False)
+    global _minio_client
+    if _minio_client is None:
+        endpoint = get_config('minio_endpoint', '172.21.48.1:9898')
+        access_key = get_config('minio_access_key', 'minioadmin')
+        secret_key = get_config('minio_secret_key', 'minioadmin123')
+        _minio_client = storage.get_client(endpoint, access_key, secret_key)
+    return _minio_client
 
 @app.route('/')
 def index():
@@ -67,29 +82,12 @@ def index():
         "endpoints": ["/api/execute", "/api/executions"]
     })
 
-@app.route('/health', methods=['GET'])
-def health():
-    status = {"service": "test-execution-engine", "timestamp": datetime.utcnow().isoformat()}
-    
-    try:
-        get_db().cursor().execute("SELECT 1")
-        status["database"] = "healthy"
-    except Exception as e:
-        status["database"] = f"error: {str(e)}"
-    
-    try:
-        get_redis().ping()
-        status["cache"] = "healthy"
-    except Exception as e:
-        status["cache"] = f"error: {str(e)}"
-    
-    try:
-        get_minio().list_buckets()
-        status["storage"] = "healthy"
-    except Exception as e:
-        status["storage"] = f"error: {str(e)}"
-    
-    return jsonify(status)
+# Health checks (/health, /health/ready, /health/live) from background probes
+health_monitor = HealthMonitor('test-execution-engine')
+health_monitor.add_check('database', database_probe(get_db))
+health_monitor.add_check('cache', get_redis().ping, critical=False)
+health_monitor.add_check('storage', lambda: get_minio().bucket_exists(get_config('minio_bucket', 'veritas-storage')))
+health_monitor.register(app)
 
 @app.route('/api/execute', methods=['POST'])
 def execute_test():
@@ -99,22 +97,17 @@ def execute_test():
         
         # Store execution results in single bucket
         bucket = get_config('minio_bucket', 'veritas-storage')
-        result_content = json.dumps({
+        result_content = serialization.dumps({
             "execution_id": execution_id,
             "test_id": data.get('test_id'),
             "status": "completed",
             "results": "Test executed successfully",
             "timestamp": datetime.utcnow().isoformat()
-        }, indent=2)
+        }, indent=True)
         
         # Upload to MinIO
-        client = get_minio()
-        if not client.bucket_exists(bucket):
-            client.make_bucket(bucket)
-        
         object_name = f"executions/{datetime.now().strftime('%Y/%m/%d')}/execution_{execution_id}.json"
-        content_bytes = result_content.encode('utf-8')
-        client.put_object(bucket, object_name, io.BytesIO(content_bytes), len(content_bytes), 'application/json')
+        storage.put_bytes(get_minio(), bucket, object_name, result_content, 'application/json')
         
         # Save to database
         with get_db() as conn:
@@ -125,6 +118,12 @@ def execute_test():
                 """, (execution_id, 'completed', datetime.utcnow(), datetime.utcnow(), object_name))
                 conn.commit()
         
+        # Invalidate cached statistics in the other services
+        try:
+            bump_versions(get_redis(), 'executions')
+        except Exception as e:
+            logger.warning(f"Could not invalidate response cache: {e}")
+        
         endpoint = get_config('minio_endpoint')
         return jsonify({
             "execution_id": execution_id,
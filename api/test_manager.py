@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import os
 import logging
 from datetime import datetime
 import uuid
 import psycopg2
-import redis
+import metrics
+import profiling
+import serialization
+from health import HealthMonitor, database_probe
 import json
 from minio import Minio
 import io
+from http_cache import ResponseCache, ResultCache
+import test_case_import
+import test_case_search
+from pagination import parse_limit
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'test-manager')
+serialization.install(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,11 +33,17 @@ def get_db():
         host='veritas-postgres',
         database='veritas_db',
         user='veritas_user',
-        password='veritas_pass'
+        password='veritas_pass',
+        cursor_factory=metrics.TimedCursor
     )
 
 def get_redis():
-    return redis.Redis(host='veritas-redis', port=6379, decode_responses=True)
+    return metrics.InstrumentedRedis(host='veritas-redis', port=6379, decode_responses=True)
+
+# Shares entity versions with the other services through Redis
+response_cache = ResponseCache(metrics.InstrumentedRedis(host='veritas-redis', port=6379))
+# Query results keyed by normalized parameters; bumping 'test_cases' invalidates both caches
+result_cache = ResultCache(response_cache)
 
 def get_config(key, default=None):
     try:
@@ -59,52 +75,65 @@ def index():
     with open('/app/templates/test_manager.html', 'r') as f:
         return f.read()
 
-@app.route('/health', methods=['GET'])
-def health():
-    status = {"service": "test-manager", "timestamp": datetime.utcnow().isoformat()}
-    
-    try:
-        get_db().cursor().execute("SELECT 1")
-        status["database"] = "healthy"
-    except Exception as e:
-        status["database"] = f"error: {str(e)}"
-    
+# Health checks (/health, /health/ready, /health/live) from background probes
+health_monitor = HealthMonitor('test-manager')
+health_monitor.add_check('database', database_probe(get_db))
+health_monitor.add_check('cache', get_redis().ping, critical=False)
+health_monitor.register(app)
+
+def _page_params(args, default_limit):
     try:
-        get_redis().ping()
-        status["cache"] = "healthy"
-    except Exception as e:
-        status["cache"] = f"error: {str(e)}"
-    
-    return jsonify(status)
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise ValueError('offset must be an integer')
+    return {
+        'filters': test_case_search.parse_filters(args),
+        'limit': parse_limit(args.get('limit'), default=default_limit),
+        'offset': max(0, min(offset, test_case_search.MAX_OFFSET))
+    }
+
+def _json_body(body, status=200):
+    return Response(body, status=status, mimetype='application/json')
 
 @app.route('/api/test-cases', methods=['GET'])
+@response_cache.cached('test_cases')
 def get_test_cases():
-    cache_key = "test_cases_list"
-    
-    try:
-        cached = get_redis().get(cache_key)
-        if cached:
-            return jsonify(json.loads(cached))
-    except:
-        pass
-    
+    """Test cases with ?priority=&status=&test_type=&suite_id=&sort=&order=&limit=&offset="""
     try:
+        params = _page_params(request.args, 100)
+        params['sort'] = request.args.get('sort', 'created_at')
+        params['descending'] = request.args.get('order', 'desc').lower() != 'asc'
+        if params['sort'] not in test_case_search.SORTS:
+            raise ValueError(f"sort must be one of {', '.join(test_case_search.SORTS)}")
+    except ValueError as e:
+        return jsonify({"test_cases": [], "error": str(e)}), 400
+
+    def compute():
         with get_db() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT * FROM test_cases ORDER BY created_at DESC LIMIT 100")
-                columns = [desc[0] for desc in cur.description] if cur.description else []
-                cases = [dict(zip(columns, row)) for row in cur.fetchall()]
-        
-        result = {"test_cases": cases}
-        try:
-            get_redis().setex(cache_key, 300, json.dumps(result, default=str))
-        except:
-            pass
-        
-        return jsonify(result)
+            return {"test_cases": test_case_search.list_cases(conn, **params)}
+    try:
+        return _json_body(result_cache.json('test_cases', params, compute))
     except Exception as e:
         return jsonify({"test_cases": [], "error": str(e)}), 500
 
+@app.route('/api/test-cases/search', methods=['GET'])
+@response_cache.cached('test_cases')
+def search_test_cases():
+    """Ranked full-text search with facets: ?q=&priority=&status=&test_type=&suite_id=&limit=&offset="""
+    try:
+        params = _page_params(request.args, 50)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    params['q'] = test_case_search.normalize_query(request.args.get('q'))
+
+    def compute():
+        with get_db() as conn:
+            return test_case_search.search(conn, **params)
+    try:
+        return _json_body(result_cache.json('test_cases', params, compute))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/test-cases', methods=['POST'])
 def create_test_case():
     try:
@@ -120,11 +149,7 @@ def create_test_case():
                       data.get('test_type', 'unit'), data.get('priority', 'medium'), 'active'))
                 conn.commit()
         
-        # Clear cache
-        try:
-            get_redis().delete("test_cases_list")
-        except:
-            pass
+        response_cache.bump('test_cases')
         
         return jsonify({
             "id": test_case_id,
@@ -135,6 +160,36 @@ def create_test_case():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/test-cases/import', methods=['POST'])
+def import_test_cases():
+    """Upsert test cases from a JSON array or CSV body (?format=json|csv, ?atomic=true)"""
+    try:
+        import_format = test_case_import.detect_format(request.args.get('format'), request.content_type)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    atomic = request.args.get('atomic', 'false').lower() == 'true'
+    
+    # Multipart uploads are spooled by Werkzeug; raw bodies are read straight from the socket
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    
+    try:
+        with get_db() as conn:
+            result = test_case_import.import_test_cases(conn, test_case_import.iter_rows(stream, import_format))
+            if atomic and result.failed:
+                conn.rollback()
+                return jsonify(dict(result.summary(), inserted=0, updated=0)), 422
+    except test_case_import.PARSE_ERRORS as e:
+        return jsonify({"error": f"Malformed {import_format} body: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    # One invalidation for the whole import
+    if result.inserted or result.updated:
+        response_cache.bump('test_cases')
+    logger.info(f"Imported test cases: {result.inserted} inserted, {result.updated} updated, {result.failed} failed")
+    return jsonify(result.summary())
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8870))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -1,31 +1,24 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
+import metrics
+import profiling
+import serialization
 import json
 import os
+import sqlite3
+import threading
 from datetime import datetime
 import uuid
+from pagination import parse_limit, encode_cursor, decode_cursor, with_next_cursor, NEXT_CURSOR_HEADER
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=[NEXT_CURSOR_HEADER])
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'test-results-viewer')
+serialization.install(app)
 
-class TestResultsViewer:
-    def __init__(self):
-        self.results_dir = '/tmp/test_results'
-        os.makedirs(self.results_dir, exist_ok=True)
-    
-    def generate_test_report(self, project_name, execution_data):
-        report_id = str(uuid.uuid4())
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Calculate metrics
-        total_tests = len(execution_data.get('test_cases', []))
-        passed_tests = len([t for t in execution_data.get('test_cases', []) if t.get('status') == 'passed'])
-        failed_tests = total_tests - passed_tests
-        pass_rate = round((passed_tests / total_tests * 100) if total_tests > 0 else 0, 1)
-        
-        # Generate HTML report
-        html_content = f"""
+_REPORT_HEADER = """
 <!DOCTYPE html>
 <html lang="es">
 <head>
@@ -83,7 +76,7 @@ class TestResultsViewer:
     <div class="test-report">
         <div class="execution-summary">
             <h1>📊 Test Execution Report</h1>
-            <p style="opacity: 0.9; margin: 0.5rem 0 2rem 0;">Project: {project_name} | Execution ID: {execution_data.get('execution_id', report_id)}</p>
+            <p style="opacity: 0.9; margin: 0.5rem 0 2rem 0;">Project: {project_name} | Execution ID: {execution_id}</p>
             
             <div class="summary-grid">
                 <div class="summary-item">
@@ -107,98 +100,286 @@ class TestResultsViewer:
         
         <div class="metric-grid">
             <div class="metric-card">
-                <div class="metric-value">{execution_data.get('duration', 'N/A')}</div>
+                <div class="metric-value">{duration}</div>
                 <div class="metric-label">Duration</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{execution_data.get('environment', 'Production')}</div>
+                <div class="metric-value">{environment}</div>
                 <div class="metric-label">Environment</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{execution_data.get('coverage', '85')}%</div>
+                <div class="metric-value">{coverage}%</div>
                 <div class="metric-label">Code Coverage</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{datetime.now().strftime('%H:%M')}</div>
+                <div class="metric-value">{execution_time}</div>
                 <div class="metric-label">Execution Time</div>
             </div>
         </div>
         
         <h2 style="margin: 2rem 0 1rem 0; color: var(--text-primary);">🧪 Test Cases Details</h2>
         
-        {self._generate_test_cases_html(execution_data.get('test_cases', []))}
-        
+"""
+
+_REPORT_FOOTER = """        
         <div style="text-align: center; margin-top: 3rem; padding: 2rem; background: var(--card-bg); border-radius: 1rem;">
             <h3>📋 Report Generated</h3>
             <p style="color: var(--text-secondary);">
-                Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')} | Report ID: {report_id}
+                Generated on {generated_on} | Report ID: {report_id}
             </p>
         </div>
     </div>
 </body>
 </html>
-        """
-        
-        # Save report
-        filename = f"test_report_{timestamp}_{report_id}.html"
-        filepath = os.path.join(self.results_dir, filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        return {
-            'report_id': report_id,
-            'filename': filename,
-            'filepath': filepath,
-            'url': f'/test-results/{filename}',
-            'metrics': {
-                'total_tests': total_tests,
-                'passed_tests': passed_tests,
-                'failed_tests': failed_tests,
-                'pass_rate': pass_rate
-            }
-        }
-    
-    def _generate_test_cases_html(self, test_cases):
-        html = ""
-        for i, test_case in enumerate(test_cases):
-            status = test_case.get('status', 'unknown')
-            status_class = 'passed' if status == 'passed' else 'failed'
-            
-            html += f"""
+"""
+
+_TEST_CASE = """
             <div class="test-case {status_class}">
                 <div class="test-header">
                     <h3 style="margin: 0; color: var(--text-primary);">
-                        {i+1}. {test_case.get('name', 'Unknown Test')}
+                        {number}. {name}
                     </h3>
-                    <span class="test-status status-{status}">{status.upper()}</span>
+                    <span class="test-status status-{status}">{status_upper}</span>
                 </div>
                 
                 <p style="color: var(--text-secondary); margin-bottom: 1rem;">
-                    {test_case.get('description', 'No description available')}
+                    {description}
                 </p>
                 
                 <div class="test-details">
                     <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(150px, 1fr)); gap: 1rem;">
                         <div>
-                            <strong>Duration:</strong> {test_case.get('duration', 'N/A')}
+                            <strong>Duration:</strong> {duration}
                         </div>
                         <div>
-                            <strong>Priority:</strong> {test_case.get('priority', 'Medium')}
+                            <strong>Priority:</strong> {priority}
                         </div>
                         <div>
-                            <strong>Category:</strong> {test_case.get('category', 'Functional')}
+                            <strong>Category:</strong> {category}
                         </div>
                     </div>
                     
-                    {f'<div style="margin-top: 1rem;"><strong>Message:</strong> {test_case.get("message", "")}</div>' if test_case.get("message") else ''}
+                    {message_block}
                     
-                    {f'<div style="margin-top: 1rem;"><strong>Error Details:</strong><pre style="background: rgba(239, 68, 68, 0.1); padding: 1rem; border-radius: 0.5rem; overflow-x: auto;">{test_case.get("error_details", "")}</pre></div>' if test_case.get("error_details") else ''}
+                    {error_block}
                 </div>
             </div>
             """
+
+_MESSAGE_BLOCK = '<div style="margin-top: 1rem;"><strong>Message:</strong> {}</div>'
+
+_ERROR_BLOCK = '<div style="margin-top: 1rem;"><strong>Error Details:</strong><pre style="background: rgba(239, 68, 68, 0.1); padding: 1rem; border-radius: 0.5rem; overflow-x: auto;">{}</pre></div>'
+
+# Rendered chunks are coalesced up to this size before being written or sent
+CHUNK_SIZE = 64 * 1024
+
+class ReportCatalog:
+    """SQLite index of generated reports so listings never touch the directory"""
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    report_id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL UNIQUE,
+                    project_name TEXT,
+                    execution_id TEXT,
+                    created_ts REAL NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    total_tests INTEGER,
+                    passed_tests INTEGER,
+                    failed_tests INTEGER,
+                    pass_rate REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_ts DESC, report_id DESC);
+                CREATE INDEX IF NOT EXISTS idx_reports_project_created ON reports(project_name, created_ts DESC, report_id DESC);
+            """)
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def add(self, report_id, filename, created_ts, size, project_name=None, execution_id=None, metrics=None):
+        metrics = metrics or {}
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO reports
+                    (report_id, filename, project_name, execution_id, created_ts, size,
+                     total_tests, passed_tests, failed_tests, pass_rate)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (report_id, filename, project_name, execution_id, created_ts, size,
+                  metrics.get('total_tests'), metrics.get('passed_tests'),
+                  metrics.get('failed_tests'), metrics.get('pass_rate')))
+    
+    def is_empty(self):
+        return self._connect().execute("SELECT 1 FROM reports LIMIT 1").fetchone() is None
+    
+    def backfill(self, results_dir):
+        """Register report files created before the catalog existed"""
+        count = 0
+        for entry in os.scandir(results_dir):
+            if entry.name.endswith('.html'):
+                stat = entry.stat()
+                report_id = os.path.splitext(entry.name)[0].rsplit('_', 1)[-1]
+                self.add(report_id, entry.name, stat.st_mtime, stat.st_size)
+                count += 1
+        return count
+    
+    def list(self, limit, cursor=None, project_name=None, since=None, until=None):
+        """One page ordered by newest first; returns (rows, next_cursor); ValueError for a bad cursor"""
+        if cursor is not None and (len(cursor) != 2 or isinstance(cursor[0], bool)
+                                   or not isinstance(cursor[0], (int, float)) or not isinstance(cursor[1], str)):
+            raise ValueError('Invalid cursor')
+        conditions = []
+        params = []
+        if cursor:
+            conditions.append("(created_ts < ? OR (created_ts = ? AND report_id < ?))")
+            params.extend([cursor[0], cursor[0], cursor[1]])
+        if project_name:
+            conditions.append("project_name = ?")
+            params.append(project_name)
+        if since:
+            conditions.append("created_ts >= ?")
+            params.append(since)
+        if until:
+            conditions.append("created_ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        params.append(limit + 1)
+        
+        rows = self._connect().execute(f"""
+            SELECT * FROM reports {where}
+            ORDER BY created_ts DESC, report_id DESC
+            LIMIT ?
+        """, params).fetchall()
         
-        return html
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['created_ts'], rows[-1]['report_id'])
+        return [self._to_dict(row) for row in rows], next_cursor
+    
+    def _to_dict(self, row):
+        return {
+            'report_id': row['report_id'],
+            'filename': row['filename'],
+            'url': f"/test-results/{row['filename']}",
+            'project_name': row['project_name'],
+            'execution_id': row['execution_id'],
+            'created_at': datetime.fromtimestamp(row['created_ts']).isoformat(),
+            'size': row['size'],
+            'metrics': {
+                'total_tests': row['total_tests'],
+                'passed_tests': row['passed_tests'],
+                'failed_tests': row['failed_tests'],
+                'pass_rate': row['pass_rate']
+            }
+        }
+
+class TestResultsViewer:
+    def __init__(self):
+        self.results_dir = '/tmp/test_results'
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.catalog = ReportCatalog(os.path.join(self.results_dir, 'catalog.db'))
+        if self.catalog.is_empty():
+            self.catalog.backfill(self.results_dir)
+    
+    def generate_test_report(self, project_name, execution_data):
+        report_id = str(uuid.uuid4())
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        metrics = self.calculate_metrics(execution_data.get('test_cases', []))
+        
+        # Save report, streaming chunks straight to disk
+        filename = f"test_report_{timestamp}_{report_id}.html"
+        filepath = os.path.join(self.results_dir, filename)
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for chunk in self.render_report(project_name, execution_data, report_id, metrics):
+                f.write(chunk)
+        
+        self.catalog.add(report_id, filename, datetime.now().timestamp(), os.path.getsize(filepath),
+                         project_name, execution_data.get('execution_id'), metrics)
+        
+        return {
+            'report_id': report_id,
+            'filename': filename,
+            'filepath': filepath,
+            'url': f'/test-results/{filename}',
+            'metrics': metrics
+        }
+    
+    def calculate_metrics(self, test_cases):
+        """Count totals in a single pass over the test cases"""
+        total_tests = 0
+        passed_tests = 0
+        for test_case in test_cases:
+            total_tests += 1
+            if test_case.get('status') == 'passed':
+                passed_tests += 1
+        
+        return {
+            'total_tests': total_tests,
+            'passed_tests': passed_tests,
+            'failed_tests': total_tests - passed_tests,
+            'pass_rate': round((passed_tests / total_tests * 100) if total_tests > 0 else 0, 1)
+        }
+    
+    def render_report(self, project_name, execution_data, report_id, metrics):
+        """Yield the report HTML in chunks of roughly CHUNK_SIZE characters"""
+        now = datetime.now()
+        header = _REPORT_HEADER.format(
+            project_name=project_name,
+            execution_id=execution_data.get('execution_id', report_id),
+            duration=execution_data.get('duration', 'N/A'),
+            environment=execution_data.get('environment', 'Production'),
+            coverage=execution_data.get('coverage', '85'),
+            execution_time=now.strftime('%H:%M'),
+            **metrics
+        )
+        footer = _REPORT_FOOTER.format(
+            generated_on=now.strftime('%Y-%m-%d at %H:%M:%S'),
+            report_id=report_id
+        )
+        
+        buffer = [header]
+        size = len(header)
+        for fragment in self._iter_test_cases_html(execution_data.get('test_cases', [])):
+            buffer.append(fragment)
+            size += len(fragment)
+            if size >= CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+                size = 0
+        buffer.append(footer)
+        yield ''.join(buffer)
+    
+    def _iter_test_cases_html(self, test_cases):
+        for i, test_case in enumerate(test_cases):
+            status = test_case.get('status', 'unknown')
+            message = test_case.get('message')
+            error_details = test_case.get('error_details')
+            
+            yield _TEST_CASE.format(
+                status_class='passed' if status == 'passed' else 'failed',
+                number=i + 1,
+                name=test_case.get('name', 'Unknown Test'),
+                status=status,
+                status_upper=status.upper(),
+                description=test_case.get('description', 'No description available'),
+                duration=test_case.get('duration', 'N/A'),
+                priority=test_case.get('priority', 'Medium'),
+                category=test_case.get('category', 'Functional'),
+                message_block=_MESSAGE_BLOCK.format(message) if message else '',
+                error_block=_ERROR_BLOCK.format(error_details) if error_details else ''
+            )
 
 viewer = TestResultsViewer()
 
@@ -219,25 +400,36 @@ def generate_report():
     report = viewer.generate_test_report(project_name, execution_data)
     return jsonify(report)
 
+@app.route('/api/render-report', methods=['POST'])
+def render_report():
+    """Stream a report straight to the client without storing it"""
+    data = request.json
+    project_name = data.get('project_name', 'Unknown Project')
+    execution_data = data.get('execution_data', {})
+    report_id = str(uuid.uuid4())
+    metrics = viewer.calculate_metrics(execution_data.get('test_cases', []))
+    
+    chunks = viewer.render_report(project_name, execution_data, report_id, metrics)
+    return Response(stream_with_context(chunks), mimetype='text/html')
+
 @app.route('/api/reports', methods=['GET'])
 def list_reports():
-    reports = []
-    for filename in os.listdir(viewer.results_dir):
-        if filename.endswith('.html'):
-            filepath = os.path.join(viewer.results_dir, filename)
-            stat = os.stat(filepath)
-            reports.append({
-                'filename': filename,
-                'url': f'/test-results/{filename}',
-                'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'size': stat.st_size
-            })
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = decode_cursor(request.args.get('cursor'))
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.fromisoformat(since).timestamp() if since else None
+        until = datetime.fromisoformat(until).timestamp() if until else None
+        reports, next_cursor = viewer.catalog.list(limit, cursor, request.args.get('project'), since, until)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(sorted(reports, key=lambda x: x['created_at'], reverse=True))
+    return with_next_cursor(jsonify(reports), next_cursor)
 
 @app.route('/health')
 def health():
     return jsonify({"status": "healthy", "service": "test-results-viewer"})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8877, debug=True)
+    app.run(host='0.0.0.0', port=8877, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -1,8 +1,10 @@
 import os
 import redis
 import psycopg2
-from minio import Minio
-import json
+import storage as minio_storage
+from storage_index import StorageIndex, like_prefix
+import metrics
+import serialization
 from datetime import datetime, timedelta
 import logging
 from config_manager import config
@@ -18,15 +20,20 @@ class DatabaseManager:
         self.password = os.getenv('POSTGRES_PASSWORD', 'postgres123')
         self._connection = None
     
+    def connect(self):
+        """A new connection, owned by the caller"""
+        return psycopg2.connect(
+            host=self.host,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+            cursor_factory=metrics.TimedCursor
+        )
+    
     def get_connection(self):
         if not self._connection or self._connection.closed:
             pool_size = config.get_config('db_connection_pool_size', 10)
-            self._connection = psycopg2.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
+            self._connection = self.connect()
         return self._connection
     
     def execute_query(self, query, params=None):
@@ -59,7 +66,7 @@ class CacheManager:
         try:
             client = self.get_client()
             data = client.get(key)
-            return json.loads(data) if data else None
+            return serialization.loads(data) if data else None
         except Exception as e:
             logger.error(f"Cache get error: {e}")
             return None
@@ -70,7 +77,7 @@ class CacheManager:
                 ttl = config.get_config('cache_ttl_default', 3600)
             
             client = self.get_client()
-            client.setex(key, ttl, json.dumps(value, default=str))
+            client.setex(key, ttl, serialization.dumps(value, default=str))
             return True
         except Exception as e:
             logger.error(f"Cache set error: {e}")
@@ -97,10 +104,14 @@ class CacheManager:
             logger.error(f"Cache clear pattern error: {e}")
             return False
 
+STORAGE_PAGE_MAX = 1000
+
 class StorageManager:
     def __init__(self):
         self._client = None
         self._bucket = None
+        self._base_url = None
+        self.index = StorageIndex(db.connect)
     
     def get_client(self):
         if not self._client:
@@ -109,12 +120,7 @@ class StorageManager:
             secret_key = config.get_config('minio_secret_key', 'minioadmin123')
             secure = config.get_config('minio_secure', False)
             
-            self._client = Minio(
-                endpoint,
-                access_key=access_key,
-                secret_key=secret_key,
-                secure=secure
-            )
+            self._client = minio_storage.get_client(endpoint, access_key, secret_key, secure)
         return self._client
     
     def get_bucket(self):
@@ -125,18 +131,13 @@ class StorageManager:
     
     def _ensure_bucket(self):
         try:
-            client = self.get_client()
-            if not client.bucket_exists(self._bucket):
-                client.make_bucket(self._bucket)
-                logger.info(f"Created MinIO bucket: {self._bucket}")
+            minio_storage.ensure_bucket(self.get_client(), self._bucket)
         except Exception as e:
             logger.error(f"Bucket creation error: {e}")
     
-    def upload_file(self, object_name, data, content_type='application/octet-stream', storage_type='general'):
+    def upload_file(self, object_name, data, content_type='application/octet-stream', storage_type='general', project=None):
         """Upload file to MinIO with organized paths"""
         try:
-            from io import BytesIO
-            
             # Get storage paths from config
             storage_paths = config.get_config('storage_paths', {})
             base_path = storage_paths.get(storage_type, 'general')
@@ -151,17 +152,11 @@ class StorageManager:
             client = self.get_client()
             bucket = self.get_bucket()
             
-            client.put_object(
-                bucket,
-                full_object_name,
-                BytesIO(data),
-                length=len(data),
-                content_type=content_type
-            )
+            minio_storage.put_bytes(client, bucket, full_object_name, data, content_type,
+                                    storage_type=storage_type, project=project)
             
-            endpoint = config.get_config('minio_endpoint')
             return {
-                'url': f"http://{endpoint}/{bucket}/{full_object_name}",
+                'url': self.get_file_url(full_object_name),
                 'bucket': bucket,
                 'object_name': full_object_name,
                 'size': len(data)
@@ -172,46 +167,117 @@ class StorageManager:
     
     def get_file_url(self, object_name):
         """Get public URL for file"""
-        endpoint = config.get_config('minio_endpoint')
-        bucket = self.get_bucket()
-        return f"http://{endpoint}/{bucket}/{object_name}"
+        if not self._base_url:
+            endpoint = config.get_config('minio_endpoint')
+            self._base_url = f"http://{endpoint}/{self.get_bucket()}/"
+        return self._base_url + object_name
     
     def delete_file(self, object_name):
         """Delete file from MinIO"""
         try:
             client = self.get_client()
             bucket = self.get_bucket()
-            client.remove_object(bucket, object_name)
+            minio_storage.with_retry(client.remove_object, bucket, object_name)
+            self.index.remove(bucket, [object_name])
             return True
         except Exception as e:
             logger.error(f"Delete error: {e}")
             return False
     
-    def list_files(self, prefix='', limit=100):
-        """List files in bucket with prefix"""
+    def list_files(self, prefix='', limit=100, start_after=None):
+        """List files in bucket with prefix, one page at a time"""
+        return self.query_files(prefix=prefix, limit=limit, start_after=start_after)['files']
+    
+    def query_files(self, prefix='', project=None, since=None, until=None, limit=100, start_after=None):
+        """Page through the object index ordered by name.
+        
+        Returns {'files': [...], 'next_token': str|None}; pass next_token back as
+        start_after to get the following page. Falls back to listing the bucket
+        when the index is unavailable.
+        """
+        limit = max(1, min(int(limit), STORAGE_PAGE_MAX))
+        try:
+            bucket = self.get_bucket()
+            conditions = ["bucket = %s", "object_name LIKE %s"]
+            params = [bucket, like_prefix(prefix)]
+            if start_after:
+                conditions.append("object_name > %s")
+                params.append(start_after)
+            if project:
+                conditions.append("project = %s")
+                params.append(project)
+            if since:
+                conditions.append("last_modified >= %s")
+                params.append(since)
+            if until:
+                conditions.append("last_modified < %s")
+                params.append(until)
+            params.append(limit + 1)
+            
+            rows = db.execute_query(f"""
+                SELECT object_name, size, last_modified
+                FROM storage_objects
+                WHERE {' AND '.join(conditions)}
+                ORDER BY object_name
+                LIMIT %s
+            """, params)
+            files = [self._file_entry(r['object_name'], r['size'], r['last_modified']) for r in rows[:limit]]
+            next_token = files[-1]['name'] if len(rows) > limit else None
+            return {'files': files, 'next_token': next_token}
+        except Exception as e:
+            logger.error(f"Storage index query error, listing bucket instead: {e}")
+            return self._list_from_bucket(prefix, limit, start_after)
+    
+    def total_size(self, prefix='', project=None):
+        """Total bytes and object count from the index"""
+        try:
+            query = "SELECT COUNT(*) AS objects, COALESCE(SUM(size), 0) AS bytes FROM storage_objects WHERE bucket = %s AND object_name LIKE %s"
+            params = [self.get_bucket(), like_prefix(prefix)]
+            if project:
+                query += " AND project = %s"
+                params.append(project)
+            row = db.execute_query(query, params)[0]
+            return {'objects': row['objects'], 'bytes': int(row['bytes'])}
+        except Exception as e:
+            logger.error(f"Storage index size error: {e}")
+            return None
+    
+    def reindex(self, prefix='', batch_size=1000):
+        """Sync index rows for a prefix with the bucket; returns the number of objects indexed"""
+        indexed, _ = self.index.reindex(self.get_client(), self.get_bucket(), prefix, batch_size)
+        return indexed
+    
+    def _file_entry(self, name, size, last_modified):
+        return {
+            'name': name,
+            'size': size,
+            'last_modified': last_modified.isoformat() if last_modified else None,
+            'url': self.get_file_url(name)
+        }
+    
+    def _list_from_bucket(self, prefix, limit, start_after):
         try:
             client = self.get_client()
             bucket = self.get_bucket()
             
-            objects = client.list_objects(bucket, prefix=prefix, recursive=True)
+            objects = client.list_objects(bucket, prefix=prefix, recursive=True, start_after=start_after)
             files = []
+            next_token = None
             
             for obj in objects:
                 if len(files) >= limit:
+                    next_token = files[-1]['name']
                     break
-                files.append({
-                    'name': obj.object_name,
-                    'size': obj.size,
-                    'last_modified': obj.last_modified.isoformat() if obj.last_modified else None,
-                    'url': self.get_file_url(obj.object_name)
-                })
+                files.append(self._file_entry(obj.object_name, obj.size, obj.last_modified))
             
-            return files
+            return {'files': files, 'next_token': next_token}
         except Exception as e:
             logger.error(f"List files error: {e}")
-            return []
+            return {'files': [], 'next_token': None}
 
 # Global instances
 db = DatabaseManager()
 cache = CacheManager()
 storage = StorageManager()
+# Uploads through storage.put_bytes in this process are indexed
+minio_storage.set_index(storage.index)
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Asyncio serving mode for the unified service:
+
+    uvicorn veritas_async_service:app --host 0.0.0.0 --port 8869 --loop uvloop
+
+The hot API routes (stats, lists, per-test results, the SSE feed and simple
+creates) run on the event loop with an asyncpg pool and redis.asyncio, so a
+single process can hold thousands of in-flight requests and streams; MinIO
+calls are offloaded to threads. Every other route (pages, report ingestion,
+uploads, executions POST) is served by the regular Flask app through a WSGI
+adapter on a thread pool, so both modes expose the same API.
+"""
+import os
+import asyncio
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import asyncpg
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse as StarletteJSONResponse, StreamingResponse
+from starlette.routing import Route, Mount
+import storage
+import counters
+import metrics
+import serialization
+import veritas_unified_service as service
+from veritas_unified_service import (
+    project_json, test_json, execution_json, result_json, case_result_json, evidence_json
+)
+from execution_events import AsyncEventBroker
+from http_cache import VERSION_KEY
+from pagination import parse_limit, decode_cursor, keyset_condition, split_page, NEXT_CURSOR_HEADER
+from config import DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+POOL_MIN = int(os.getenv('ASYNC_DB_POOL_MIN', '5'))
+POOL_MAX = int(os.getenv('ASYNC_DB_POOL_MAX', '50'))
+# Threads for the Flask fallback and offloaded MinIO calls
+WSGI_THREADS = int(os.getenv('ASYNC_WSGI_THREADS', '16'))
+
+db = None
+redis_client = None
+broker = None
+
+
+class JSONResponse(StarletteJSONResponse):
+    def render(self, content):
+        return serialization.dumps(content)
+
+
+def pg(query):
+    """Translate psycopg2 %s placeholders to asyncpg $n ones"""
+    parts = query.split('%s')
+    translated = parts[0]
+    for position, part in enumerate(parts[1:], 1):
+        translated += f'${position}' + part
+    return translated
+
+
+def arg(value):
+    """Query string ids arrive as text; asyncpg wants ints for integer columns"""
+    return int(value) if value is not None and value.isdigit() else value
+
+
+def keyset(request, sort_column, id_column):
+    return keyset_condition(decode_cursor(request.query_params.get('cursor')), sort_column, id_column)
+
+
+def page(items, next_cursor):
+    response = JSONResponse(items)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+def error(e, status_code=500):
+    return JSONResponse({'error': str(e)}, status_code=status_code)
+
+
+async def bump(*entities):
+    """Invalidate ETags served by the sync routes (see http_cache.py)"""
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for entity in entities:
+                pipe.incr(VERSION_KEY.format(entity))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not bump versions {entities}: {e}")
+
+
+async def get_stats(request):
+    try:
+        async with db.acquire() as conn:
+            values = dict(await conn.fetch(counters.SNAPSHOT_QUERY))
+        return JSONResponse({entity: values.get(entity, 0) for entity in counters.COUNTED_TABLES})
+    except Exception as e:
+        return error(e)
+
+
+async def list_projects(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        condition, params = keyset(request, 'created_at', 'id')
+    except ValueError as e:
+        return error(e, 400)
+    try:
+        async with db.acquire() as conn:
+            rows = await conn.fetch(pg(f"""
+                SELECT id, name, description, created_at FROM projects
+                WHERE {condition}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            """), *params, limit + 1)
+        rows, next_cursor = split_page(rows, limit, lambda row: (row[3], row[0]))
+        return page([project_json(row) for row in rows], next_cursor)
+    except Exception as e:
+        return error(e)
+
+
+async def create_project(request):
+    try:
+        data = await request.json()
+        async with db.acquire() as conn:
+            project_id = await conn.fetchval(
+                "INSERT INTO projects (name, description) VALUES ($1, $2) RETURNING id",
+                data['name'], data.get('description', '')
+            )
+        await bump('projects')
+        await asyncio.to_thread(
+            storage.put_bytes, service.minio_client, service.bucket_name, f"projects/{data['name']}/tests/", b''
+        )
+        return JSONResponse({'id': project_id, 'message': 'Project created successfully'})
+    except Exception as e:
+        return error(e)
+
+
+async def list_tests(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        condition, params = keyset(request, 'created_at', 'id')
+    except ValueError as e:
+        return error(e, 400)
+    try:
+        suite_id = request.query_params.get('suite_id')
+        async with db.acquire() as conn:
+            if suite_id:
+                rows = await conn.fetch(pg(f"""
+                    SELECT * FROM test_cases WHERE suite_id = %s AND {condition}
+                    ORDER BY created_at DESC, id DESC LIMIT %s
+                """), arg(suite_id), *params, limit + 1)
+            else:
+                rows = await conn.fetch(pg(f"""
+                    SELECT * FROM test_cases WHERE {condition}
+                    ORDER BY created_at DESC, id DESC LIMIT %s
+                """), *params, limit + 1)
+        rows, next_cursor = split_page(rows, limit, lambda row: (row['created_at'], row[0]))
+        return page([test_json(row) for row in rows], next_cursor)
+    except Exception as e:
+        return error(e)
+
+
+async def create_test(request):
+    try:
+        data = await request.json()
+        async with db.acquire() as conn:
+            test_id = await conn.fetchval(
+                "INSERT INTO test_cases (suite_id, name, description, test_type, priority) VALUES ($1, $2, $3, $4, $5) RETURNING id",
+                data.get('suite_id'), data['name'], data.get('description', ''),
+                data.get('test_type', 'unit'), data.get('priority', 'medium')
+            )
+        await bump('test_cases')
+        return JSONResponse({'id': test_id, 'message': 'Test case created successfully'})
+    except Exception as e:
+        return error(e)
+
+
+async def list_executions(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        condition, params = keyset(request, 'e.executed_at', 'e.id')
+    except ValueError as e:
+        return error(e, 400)
+    try:
+        async with db.acquire() as conn:
+            rows = await conn.fetch(pg(f"""
+                SELECT e.id, e.project_id, e.status, e.results, e.executed_at, p.name as project_name
+                FROM test_executions e
+                JOIN projects p ON e.project_id = p.id
+                WHERE {condition}
+                ORDER BY e.executed_at DESC, e.id DESC
+                LIMIT %s
+            """), *params, limit + 1)
+        rows, next_cursor = split_page(rows, limit, lambda row: (row[4], row[0]))
+        return page([execution_json(row) for row in rows], next_cursor)
+    except Exception as e:
+        return error(e)
+
+
+async def execution_stream(request):
+    last_event_id = request.headers.get('last-event-id') or request.query_params.get('last_event_id')
+    return StreamingResponse(
+        broker.stream(last_event_id, request.query_params.get('project_id')),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def execution_results(request):
+    try:
+        execution_id = request.path_params['execution_id']
+        status = request.query_params.get('status')
+        async with db.acquire() as conn:
+            if status == 'failed':
+                rows = await conn.fetch("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = $1 AND status IN ('failed', 'error')
+                    ORDER BY id
+                """, execution_id)
+            elif status:
+                rows = await conn.fetch("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = $1 AND status = $2
+                    ORDER BY id
+                """, execution_id, status)
+            else:
+                rows = await conn.fetch("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = $1
+                    ORDER BY id
+                """, execution_id)
+        return JSONResponse([result_json(row) for row in rows])
+    except Exception as e:
+        return error(e)
+
+
+async def test_case_results(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit'), default=20, maximum=500)
+        async with db.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT execution_id, status, duration, message, error_hash, created_at
+                FROM test_results WHERE test_case_id = $1
+                ORDER BY created_at DESC
+                LIMIT $2
+            """, request.path_params['test_case_id'], limit)
+        return JSONResponse([case_result_json(row) for row in rows])
+    except Exception as e:
+        return error(e)
+
+
+async def list_evidence(request):
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        condition, params = keyset(request, 'uploaded_at', 'id')
+    except ValueError as e:
+        return error(e, 400)
+    try:
+        project_id = request.query_params.get('project_id')
+        async with db.acquire() as conn:
+            if project_id:
+                rows = await conn.fetch(pg(f"""
+                    SELECT * FROM evidence_files WHERE project_id = %s AND {condition}
+                    ORDER BY uploaded_at DESC, id DESC LIMIT %s
+                """), arg(project_id), *params, limit + 1)
+            else:
+                rows = await conn.fetch(pg(f"""
+                    SELECT * FROM evidence_files WHERE {condition}
+                    ORDER BY uploaded_at DESC, id DESC LIMIT %s
+                """), *params, limit + 1)
+        rows, next_cursor = split_page(rows, limit, lambda row: (row[7], row[0]))
+        return page([evidence_json(row) for row in rows], next_cursor)
+    except Exception as e:
+        return error(e)
+
+
+async def init_connection(conn):
+    conn.add_query_logger(metrics.log_asyncpg_query)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global db, redis_client, broker
+    await asyncio.to_thread(service.initialize_services)
+    await asyncio.to_thread(service.init_database)
+    service.start_background_jobs()
+
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(WSGI_THREADS))
+    db = await asyncpg.create_pool(
+        host=DB_CONFIG['host'], port=DB_CONFIG['port'], database=DB_CONFIG['database'],
+        user=DB_CONFIG['user'], password=DB_CONFIG['password'],
+        min_size=POOL_MIN, max_size=POOL_MAX,
+        init=init_connection
+    )
+    redis_client = metrics.AsyncInstrumentedRedis(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        decode_responses=True
+    )
+    broker = AsyncEventBroker(redis_client)
+    try:
+        yield
+    finally:
+        await broker.close()
+        await redis_client.close()
+        await db.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/stats', get_stats, methods=['GET']),
+        Route('/api/projects', list_projects, methods=['GET']),
+        Route('/api/projects', create_project, methods=['POST']),
+        Route('/api/tests', list_tests, methods=['GET']),
+        Route('/api/tests', create_test, methods=['POST']),
+        Route('/api/executions', list_executions, methods=['GET']),
+        Route('/api/executions/stream', execution_stream, methods=['GET']),
+        Route('/api/executions/{execution_id:int}/results', execution_results, methods=['GET']),
+        Route('/api/tests/{test_case_id:int}/results', test_case_results, methods=['GET']),
+        Route('/api/evidence', list_evidence, methods=['GET']),
+        # Everything else (and other methods on the paths above) goes to Flask
+        Mount('/', app=WSGIMiddleware(service.app, workers=WSGI_THREADS)),
+    ],
+    # Native routes only; the Flask app records its own (and serves /metrics)
+    middleware=[Middleware(metrics.MetricsMiddleware)],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv('PORT', 8869)))
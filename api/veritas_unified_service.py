@@ -1,12 +1,26 @@
 #!/usr/bin/env python3
 import os
 import threading
+import mimetypes
 import time
-from flask import Flask, request, jsonify, render_template
-import psycopg2
-import redis
-from minio import Minio
-import json
+from flask import Flask, request, jsonify, render_template, Response
+import storage
+import storage_index
+import db_pool
+import metrics
+import profiling
+import serialization
+from retention import RetentionEngine, RETENTION_INTERVAL, open_object
+import result_ingestion
+import partitions
+import counters
+import test_case_search
+import query_log
+from health import HealthMonitor, database_probe
+from http_cache import ResponseCache
+import execution_events
+from execution_events import EventBroker
+from pagination import parse_limit, decode_cursor, keyset_condition, split_page, with_next_cursor
 from datetime import datetime
 import logging
 from config import DB_CONFIG, REDIS_CONFIG, MINIO_CONFIG
@@ -17,25 +31,35 @@ logger = logging.getLogger(__name__)
 
 # Unified Veritas Service
 app = Flask(__name__)
+metrics.instrument_app(app)
+profiling.instrument_app(app, 'veritas-unified')
+serialization.install(app)
 
 def init_database():
     """Initialize database tables if they don't exist"""
     try:
         conn = get_db()
         with conn.cursor() as cur:
-            # Create test_executions table if it doesn't exist
+            # Create test_executions table if it doesn't exist (monthly partitions on executed_at)
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS test_executions (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     test_case_id INTEGER,
                     project_id INTEGER,
                     execution_name VARCHAR(255),
                     status VARCHAR(50) DEFAULT 'pending',
                     results TEXT,
-                    executed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    end_time TIMESTAMP
-                )
+                    executed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    end_time TIMESTAMP,
+                    PRIMARY KEY (id, executed_at)
+                ) PARTITION BY RANGE (executed_at)
             """)
+            if partitions.is_partitioned(cur):
+                cur.execute("CREATE TABLE IF NOT EXISTS test_executions_default PARTITION OF test_executions DEFAULT")
+            else:
+                logger.warning("test_executions is not partitioned; run partitions.py --migrate executed_at")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_executions_executed_at ON test_executions(executed_at DESC, id DESC)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_executions_project_executed ON test_executions(project_id, executed_at DESC)")
             
             # Create other tables if needed
             cur.execute("""
@@ -57,28 +81,94 @@ def init_database():
                 )
             """)
             
+            # Per-test results ingested from JUnit / pytest reports
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS test_results (
+                    id BIGSERIAL PRIMARY KEY,
+                    execution_id INTEGER NOT NULL,
+                    test_case_id INTEGER,
+                    name VARCHAR(1024),
+                    classname VARCHAR(1024),
+                    status VARCHAR(20) NOT NULL,
+                    duration DOUBLE PRECISION,
+                    message TEXT,
+                    error_details TEXT,
+                    error_hash VARCHAR(40),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("ALTER TABLE test_results ADD COLUMN IF NOT EXISTS error_hash VARCHAR(40)")
+            cur.execute("DROP INDEX IF EXISTS idx_test_results_execution_id")
+            # "failures in execution Y"
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_results_execution_status ON test_results(execution_id, status)")
+            # "last N results of test X"
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_results_case_created ON test_results(test_case_id, created_at DESC)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_results_error_hash ON test_results(error_hash) WHERE error_hash IS NOT NULL")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_cases_name ON test_cases(name)")
+            
+            # Keyset pagination indexes for the list endpoints
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_projects_created_id ON projects(created_at DESC, id DESC)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_test_cases_created_id ON test_cases(created_at DESC, id DESC)")
+            cur.execute("SELECT to_regclass('evidence_files')")
+            if cur.fetchone()[0] is not None:
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_evidence_files_uploaded_id ON evidence_files(uploaded_at DESC, id DESC)")
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_evidence_files_project_uploaded ON evidence_files(project_id, uploaded_at DESC, id DESC)")
+            
+            # Retention engine bookkeeping
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS retention_policies (
+                    project_name VARCHAR(255) PRIMARY KEY,
+                    hot_days INTEGER NOT NULL DEFAULT 30,
+                    temp_hours INTEGER NOT NULL DEFAULT 24,
+                    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS archived_objects (
+                    object_key VARCHAR(1024) PRIMARY KEY,
+                    archive_key VARCHAR(1024) NOT NULL,
+                    size BIGINT,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
         conn.commit()
+        partitions.ensure_partitions(conn)
+        counters.install(conn)
+        test_case_search.install(conn)
+        storage_index.install(conn)
         conn.close()
     except Exception as e:
         print(f"Database initialization error: {e}")
 
 # Database connection
 def get_db():
-    return psycopg2.connect(**DB_CONFIG)
+    return db_pool.connect()
+
+# Every put_bytes upload is recorded in storage_objects
+object_index = storage_index.StorageIndex(get_db)
+storage.set_index(object_index)
 
 # Redis connection
-redis_client = redis.Redis(
+redis_client = metrics.InstrumentedRedis(
     host=os.getenv('REDIS_HOST', 'localhost'),
     port=int(os.getenv('REDIS_PORT', 6379)),
     decode_responses=True
 )
 
+# Version counters and cached bodies for conditional GETs (stored as bytes)
+response_cache = ResponseCache(metrics.InstrumentedRedis(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    port=int(os.getenv('REDIS_PORT', 6379))
+))
+
 # MinIO connection
-minio_client = Minio(
+minio_client = storage.get_client(
     os.getenv('MINIO_ENDPOINT', 'localhost:9898'),
-    access_key=os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
-    secret_key=os.getenv('MINIO_SECRET_KEY', 'minioadmin123'),
-    secure=False
+    os.getenv('MINIO_ACCESS_KEY', 'minioadmin'),
+    os.getenv('MINIO_SECRET_KEY', 'minioadmin123')
 )
 
 bucket_name = os.getenv('MINIO_BUCKET', 'veritas-projects')
@@ -87,15 +177,54 @@ bucket_name = os.getenv('MINIO_BUCKET', 'veritas-projects')
 def initialize_services():
     try:
         # Create bucket if not exists
-        if not minio_client.bucket_exists(bucket_name):
-            minio_client.make_bucket(bucket_name)
-            logger.info(f"Created bucket: {bucket_name}")
+        storage.ensure_bucket(minio_client, bucket_name)
         
         logger.info("Services initialized successfully")
         
     except Exception as e:
         logger.error(f"Initialization error: {e}")
 
+execution_broker = EventBroker(redis_client)
+
+retention_engine = RetentionEngine(minio_client, bucket_name, get_db, redis_client)
+
+# Background jobs
+def run_periodically(name, interval, func):
+    def loop():
+        while True:
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"Background job {name} failed: {e}")
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def start_background_jobs():
+    if os.getenv('RETENTION_ENABLED', 'true').lower() == 'true':
+        run_periodically('retention', RETENTION_INTERVAL, retention_engine.run_once)
+    run_periodically('partitions', partitions.MAINTENANCE_INTERVAL, run_partition_maintenance)
+    run_periodically('counters', counters.RECONCILE_INTERVAL, run_counter_reconcile)
+    run_periodically('counter-fold', counters.FOLD_INTERVAL, lambda: counters.run_fold(get_db))
+    run_periodically('storage-reindex', storage_index.REINDEX_INTERVAL, run_storage_reindex)
+
+def run_storage_reindex():
+    indexed, removed = object_index.reindex(minio_client, bucket_name)
+    logger.info(f"Storage index synced: {indexed} objects, {removed} stale rows removed")
+
+def run_partition_maintenance():
+    result = partitions.run_maintenance(get_db)
+    # Detaching drops rows without firing DELETE triggers
+    if result['detached']:
+        run_counter_reconcile()
+        response_cache.bump('executions')
+
+def run_counter_reconcile():
+    if counters.run_reconcile(get_db):
+        response_cache.bump(*counters.COUNTED_TABLES)
+
 # Main Portal Routes
 @app.route('/')
 def main_portal():
@@ -189,48 +318,111 @@ def evidence_manager():
 def test_results_viewer():
     return render_template('test_results_viewer.html')
 
+# Row serializers shared with the async serving mode (veritas_async_service.py)
+def project_json(row):
+    return {
+        'id': row[0],
+        'name': row[1],
+        'description': row[2],
+        'created_at': row[3].isoformat() if row[3] else None
+    }
+
+def test_json(row):
+    return {
+        'id': row[0],
+        'suite_id': row[1],
+        'name': row[2],
+        'description': row[3],
+        'priority': row[4],
+        'status': row[5],
+        'test_type': row[7] if len(row) > 7 else 'unit'
+    }
+
+def execution_json(row):
+    return {
+        'id': row[0],
+        'project_id': row[1],
+        'status': row[2],
+        'result': row[3],
+        'executed_at': row[4].isoformat() if row[4] else None,
+        'project_name': row[5]
+    }
+
+def result_json(row):
+    return {
+        'id': row[0],
+        'test_case_id': row[1],
+        'name': row[2],
+        'classname': row[3],
+        'status': row[4],
+        'duration': row[5],
+        'message': row[6],
+        'error_hash': row[7]
+    }
+
+def case_result_json(row):
+    return {
+        'execution_id': row[0],
+        'status': row[1],
+        'duration': row[2],
+        'message': row[3],
+        'error_hash': row[4],
+        'created_at': row[5].isoformat() if row[5] else None
+    }
+
+def evidence_json(row):
+    return {
+        'id': row[0],
+        'project_id': row[1],
+        'test_execution_id': row[2],
+        'file_name': row[3],
+        'file_path': row[4],
+        'file_type': row[5],
+        'file_size': row[6],
+        'uploaded_at': row[7].isoformat() if row[7] else None,
+        'download_url': f"/api/evidence/{row[0]}/download"
+    }
+
 # API Routes
 @app.route('/api/stats')
+@response_cache.cached('projects', 'test_cases', 'executions')
 def get_stats():
     try:
+        # Trigger-maintained counters (see counters.py) instead of COUNT(*) scans
         conn = get_db()
-        with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) FROM projects")
-            projects = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM test_cases")
-            test_cases = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM test_executions")
-            executions = cur.fetchone()[0]
-        
+        stats = counters.snapshot(conn)
         conn.close()
         return jsonify({
-            'projects': projects,
-            'test_cases': test_cases,
-            'executions': executions
+            'projects': stats['projects'],
+            'test_cases': stats['test_cases'],
+            'executions': stats['executions']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Projects API
 @app.route('/api/projects', methods=['GET', 'POST'])
+@response_cache.cached('projects')
 def projects_api():
     if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            keyset, params = keyset_condition(decode_cursor(request.args.get('cursor')), 'created_at', 'id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         try:
             conn = get_db()
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM projects ORDER BY created_at DESC")
-                projects = []
-                for row in cur.fetchall():
-                    projects.append({
-                        'id': row[0],
-                        'name': row[1],
-                        'description': row[2],
-                        'created_at': row[3].isoformat() if row[3] else None
-                    })
+                cur.execute(f"""
+                    SELECT id, name, description, created_at FROM projects
+                    WHERE {keyset}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, params + [limit + 1])
+                rows, next_cursor = split_page(cur.fetchall(), limit, lambda row: (row[3], row[0]))
+                projects = [project_json(row) for row in rows]
             conn.close()
-            return jsonify(projects)
+            return with_next_cursor(jsonify(projects), next_cursor)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -246,11 +438,11 @@ def projects_api():
                 project_id = cur.fetchone()[0]
                 conn.commit()
             conn.close()
+            response_cache.bump('projects')
             
             # Create project folder in MinIO
-            from io import BytesIO
             folder_path = f"projects/{data['name']}/tests/"
-            minio_client.put_object(bucket_name, folder_path, BytesIO(b''), 0)
+            storage.put_bytes(minio_client, bucket_name, folder_path, b'')
             
             return jsonify({'id': project_id, 'message': 'Project created successfully'})
         except Exception as e:
@@ -260,28 +452,31 @@ def projects_api():
 @app.route('/api/tests', methods=['GET', 'POST'])
 def tests_api():
     if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            keyset, params = keyset_condition(decode_cursor(request.args.get('cursor')), 'created_at', 'id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         try:
             suite_id = request.args.get('suite_id')
             conn = get_db()
             with conn.cursor() as cur:
                 if suite_id:
-                    cur.execute("SELECT * FROM test_cases WHERE suite_id = %s", (suite_id,))
+                    cur.execute(f"""
+                        SELECT * FROM test_cases WHERE suite_id = %s AND {keyset}
+                        ORDER BY created_at DESC, id DESC LIMIT %s
+                    """, [suite_id] + params + [limit + 1])
                 else:
-                    cur.execute("SELECT * FROM test_cases")
+                    cur.execute(f"""
+                        SELECT * FROM test_cases WHERE {keyset}
+                        ORDER BY created_at DESC, id DESC LIMIT %s
+                    """, params + [limit + 1])
                 
-                tests = []
-                for row in cur.fetchall():
-                    tests.append({
-                        'id': row[0],
-                        'suite_id': row[1],
-                        'name': row[2],
-                        'description': row[3],
-                        'priority': row[4],
-                        'status': row[5],
-                        'test_type': row[7] if len(row) > 7 else 'unit'
-                    })
+                created_at = [d[0] for d in cur.description].index('created_at')
+                rows, next_cursor = split_page(cur.fetchall(), limit, lambda row: (row[created_at], row[0]))
+                tests = [test_json(row) for row in rows]
             conn.close()
-            return jsonify(tests)
+            return with_next_cursor(jsonify(tests), next_cursor)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -297,35 +492,60 @@ def tests_api():
                 test_id = cur.fetchone()[0]
                 conn.commit()
             conn.close()
+            response_cache.bump('test_cases')
             return jsonify({'id': test_id, 'message': 'Test case created successfully'})
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/tests/search')
+@response_cache.cached('test_cases')
+def search_tests():
+    """Ranked full-text search with facets: ?q=&priority=&status=&test_type=&suite_id=&limit=&offset="""
+    try:
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+    try:
+        filters = test_case_search.parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        conn = get_db()
+        try:
+            page = test_case_search.search(
+                conn, request.args.get('q'), filters,
+                parse_limit(request.args.get('limit'), default=50), offset
+            )
+        finally:
+            conn.close()
+        return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Test Execution API
 @app.route('/api/executions', methods=['GET', 'POST'])
 def executions_api():
     if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            keyset, params = keyset_condition(decode_cursor(request.args.get('cursor')), 'e.executed_at', 'e.id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         try:
             conn = get_db()
             with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT e.*, p.name as project_name 
+                cur.execute(f"""
+                    SELECT e.id, e.project_id, e.status, e.results, e.executed_at, p.name as project_name 
                     FROM test_executions e
                     JOIN projects p ON e.project_id = p.id
-                    ORDER BY e.executed_at DESC
-                """)
-                executions = []
-                for row in cur.fetchall():
-                    executions.append({
-                        'id': row[0],
-                        'project_id': row[1],
-                        'status': row[2],
-                        'result': row[3],
-                        'executed_at': row[4].isoformat() if row[4] else None,
-                        'project_name': row[5]
-                    })
+                    WHERE {keyset}
+                    ORDER BY e.executed_at DESC, e.id DESC
+                    LIMIT %s
+                """, params + [limit + 1])
+                rows, next_cursor = split_page(cur.fetchall(), limit, lambda row: (row[4], row[0]))
+                executions = [execution_json(row) for row in rows]
             conn.close()
-            return jsonify(executions)
+            return with_next_cursor(jsonify(executions), next_cursor)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
@@ -333,6 +553,7 @@ def executions_api():
         try:
             data = request.json
             start_time = datetime.now()
+            test_results = data.get('test_results')
             
             # Simulate test execution
             results = {
@@ -345,17 +566,33 @@ def executions_api():
             }
             
             conn = get_db()
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO test_executions (project_id, execution_name, status, results, end_time) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-                    (data['project_id'], data.get('execution_name', 'Test Execution'), 'completed', json.dumps(results), datetime.now())
-                )
-                execution_id = cur.fetchone()[0]
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "INSERT INTO test_executions (project_id, execution_name, status, results, end_time) VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                        (data['project_id'], data.get('execution_name', 'Test Execution'), 'completed', serialization.dumps_str(results), datetime.now())
+                    )
+                    execution_id = cur.fetchone()[0]
+                
+                # Per-test outcomes supplied by the caller go to test_results
+                if test_results:
+                    summary = result_ingestion.ingest(
+                        conn, execution_id, (result_ingestion.normalize(r) for r in test_results),
+                        on_batch=lambda progress: execution_events.publish(
+                            redis_client, 'progress', execution_id, data['project_id'], **progress)
+                    )
+                    results.update(summary)
+                    results['message'] = f"Test executed at {start_time.isoformat()}"
+                    with conn.cursor() as cur:
+                        cur.execute("UPDATE test_executions SET results = %s WHERE id = %s", (serialization.dumps_str(results), execution_id))
                 conn.commit()
-            conn.close()
+            finally:
+                conn.close()
+            response_cache.bump('executions')
+            execution_events.publish(redis_client, 'execution', execution_id, data['project_id'],
+                                     status='completed', results=results)
             
             # Store execution evidence in MinIO
-            from io import BytesIO
             evidence_data = {
                 'execution_id': str(execution_id),
                 'project_id': data['project_id'],
@@ -363,9 +600,9 @@ def executions_api():
                 'timestamp': start_time.isoformat(),
                 'evidence_files': []
             }
-            evidence_json = json.dumps(evidence_data, indent=2).encode('utf-8')
+            evidence_json = serialization.dumps(evidence_data, indent=True)
             evidence_path = f"projects/{data.get('project_name', 'unknown')}/evidence/{execution_id}_execution.json"
-            minio_client.put_object(bucket_name, evidence_path, BytesIO(evidence_json), len(evidence_json))
+            storage.put_bytes(minio_client, bucket_name, evidence_path, evidence_json, 'application/json')
             
             return jsonify({
                 'id': execution_id,
@@ -376,51 +613,205 @@ def executions_api():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/executions/ingest', methods=['POST'])
+def ingest_results():
+    """Ingest a JUnit XML or pytest-json report as the per-test results of an execution"""
+    try:
+        report_format = result_ingestion.detect_format(request.args.get('format'), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    project_id = request.args.get('project_id')
+    execution_id = request.args.get('execution_id')
+    if not project_id and not execution_id:
+        return jsonify({'error': 'project_id or execution_id is required'}), 400
+    try:
+        project_id = int(project_id) if project_id else None
+        execution_id = int(execution_id) if execution_id else None
+    except ValueError:
+        return jsonify({'error': 'project_id and execution_id must be integers'}), 400
+    
+    # Multipart uploads are spooled by Werkzeug; raw bodies are read straight from the socket
+    upload = request.files.get('report')
+    stream = upload.stream if upload else request.stream
+    
+    conn = get_db()
+    try:
+        with conn.cursor() as cur:
+            if execution_id:
+                cur.execute("UPDATE test_executions SET status = 'running' WHERE id = %s RETURNING project_id", (execution_id,))
+                row = cur.fetchone()
+                if not row:
+                    return jsonify({'error': 'Execution not found'}), 404
+                project_id = row[0]
+            else:
+                cur.execute(
+                    "INSERT INTO test_executions (project_id, execution_name, status) VALUES (%s, %s, %s) RETURNING id, project_id",
+                    (project_id, request.args.get('execution_name', f'Imported {report_format} report'), 'running')
+                )
+                execution_id, project_id = cur.fetchone()
+        # Commit 'running' on its own so it is visible while the report is ingested
+        conn.commit()
+        
+        execution_events.publish(redis_client, 'execution', execution_id, project_id, status='running')
+        summary = result_ingestion.ingest(
+            conn, execution_id, result_ingestion.iter_results(stream, report_format),
+            on_batch=lambda progress: execution_events.publish(redis_client, 'progress', execution_id, project_id, **progress)
+        )
+        
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE test_executions SET status = %s, results = %s, end_time = %s WHERE id = %s",
+                ('completed', serialization.dumps_str(summary), datetime.now(), execution_id)
+            )
+        conn.commit()
+        response_cache.bump('executions')
+        execution_events.publish(redis_client, 'execution', execution_id, project_id, status='completed', results=summary)
+        
+        return jsonify({'id': execution_id, 'status': 'completed', 'results': summary}), 201
+    except Exception as e:
+        conn.rollback()
+        if execution_id:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("UPDATE test_executions SET status = 'failed', end_time = %s WHERE id = %s",
+                                (datetime.now(), execution_id))
+                conn.commit()
+            except Exception as update_error:
+                conn.rollback()
+                logger.warning(f"Could not mark execution {execution_id} as failed: {update_error}")
+            response_cache.bump('executions')
+            execution_events.publish(redis_client, 'execution', execution_id, project_id, status='failed', error=str(e))
+        status = 400 if isinstance(e, result_ingestion.PARSE_ERRORS) else 500
+        return jsonify({'error': str(e)}), status
+    finally:
+        conn.close()
+
+@app.route('/api/executions/stream')
+def execution_stream():
+    """Server-sent events with execution state transitions and per-test progress"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        execution_broker.stream(last_event_id, request.args.get('project_id')),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/executions/<int:execution_id>/results')
+def execution_results(execution_id):
+    """Per-test results of one execution, optionally filtered by status"""
+    try:
+        status = request.args.get('status')
+        conn = get_db()
+        with conn.cursor() as cur:
+            if status == 'failed':
+                cur.execute("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = %s AND status IN ('failed', 'error')
+                    ORDER BY id
+                """, (execution_id,))
+            elif status:
+                cur.execute("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = %s AND status = %s
+                    ORDER BY id
+                """, (execution_id, status))
+            else:
+                cur.execute("""
+                    SELECT id, test_case_id, name, classname, status, duration, message, error_hash
+                    FROM test_results WHERE execution_id = %s
+                    ORDER BY id
+                """, (execution_id,))
+            rows = cur.fetchall()
+        conn.close()
+        return jsonify([result_json(row) for row in rows])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/tests/<int:test_case_id>/results')
+def test_case_results(test_case_id):
+    """Most recent results of one test case"""
+    try:
+        limit = parse_limit(request.args.get('limit'), default=20, maximum=500)
+        conn = get_db()
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT execution_id, status, duration, message, error_hash, created_at
+                FROM test_results WHERE test_case_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (test_case_id, limit))
+            rows = cur.fetchall()
+        conn.close()
+        return jsonify([case_result_json(row) for row in rows])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # Evidence Management API
 @app.route('/api/evidence', methods=['GET', 'POST'])
 def evidence_api():
     if request.method == 'GET':
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            keyset, params = keyset_condition(decode_cursor(request.args.get('cursor')), 'uploaded_at', 'id')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         try:
             project_id = request.args.get('project_id')
             conn = get_db()
             with conn.cursor() as cur:
                 if project_id:
-                    cur.execute("SELECT * FROM evidence_files WHERE project_id = %s", (project_id,))
+                    cur.execute(f"""
+                        SELECT * FROM evidence_files WHERE project_id = %s AND {keyset}
+                        ORDER BY uploaded_at DESC, id DESC LIMIT %s
+                    """, [project_id] + params + [limit + 1])
                 else:
-                    cur.execute("SELECT * FROM evidence_files")
+                    cur.execute(f"""
+                        SELECT * FROM evidence_files WHERE {keyset}
+                        ORDER BY uploaded_at DESC, id DESC LIMIT %s
+                    """, params + [limit + 1])
                 
-                files = []
-                for row in cur.fetchall():
-                    files.append({
-                        'id': row[0],
-                        'project_id': row[1],
-                        'test_execution_id': row[2],
-                        'file_name': row[3],
-                        'file_path': row[4],
-                        'file_type': row[5],
-                        'file_size': row[6],
-                        'uploaded_at': row[7].isoformat() if row[7] else None,
-                        'download_url': f"/api/evidence/{row[0]}/download"
-                    })
+                rows, next_cursor = split_page(cur.fetchall(), limit, lambda row: (row[7], row[0]))
+                files = [evidence_json(row) for row in rows]
             conn.close()
-            return jsonify(files)
+            return with_next_cursor(jsonify(files), next_cursor)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
-# Health check
-@app.route('/health')
-def health():
-    return jsonify({
-        'status': 'healthy',
-        'services': {
-            'database': 'connected',
-            'redis': 'connected',
-            'minio': 'connected'
-        },
-        'timestamp': datetime.now().isoformat()
-    })
+@app.route('/api/evidence/<evidence_id>/download')
+def download_evidence(evidence_id):
+    """Evidence file content, also once retention has moved it into an archive bundle"""
+    try:
+        conn = get_db()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT file_name, file_path FROM evidence_files WHERE id = %s", (evidence_id,))
+                row = cur.fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return jsonify({'error': 'Evidence not found'}), 404
+        stream = open_object(minio_client, bucket_name, row[1], get_db)
+    except FileNotFoundError:
+        return jsonify({'error': 'Evidence file is no longer in storage'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return Response(stream, mimetype=mimetypes.guess_type(row[0] or '')[0] or 'application/octet-stream',
+                    headers={'Content-Disposition': f'attachment; filename="{row[0]}"'})
+
+# Health checks (/health, /health/ready, /health/live) from background probes
+health_monitor = HealthMonitor('veritas-unified')
+health_monitor.add_check('database', database_probe(get_db))
+# Reads and uploads degrade without these, but the API keeps serving
+health_monitor.add_check('redis', redis_client.ping, critical=False)
+health_monitor.add_check('minio', lambda: minio_client.bucket_exists(bucket_name), critical=False)
+health_monitor.register(app)
+
+# Top statements by time across workers (/api/slow-queries)
+query_log.configure(redis_client).register(app)
 
 if __name__ == '__main__':
     initialize_services()
     init_database()  # Initialize database tables
+    start_background_jobs()
     app.run(host='0.0.0.0', port=8869, debug=False)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Production entry point for the unified service:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing this module performs the one-time setup. With preload_app the
+gunicorn master imports it once and forks the workers; init_worker() runs in
+every worker after the fork to drop connections inherited from the master.
+The background jobs run in whichever worker holds BACKGROUND_JOBS_LOCK; when
+that worker exits the lock is released and its replacement takes them over.
+"""
+import os
+import fcntl
+import veritas_unified_service as service
+import db_pool
+import storage
+
+service.initialize_services()
+service.init_database()
+
+app = service.app
+
+BACKGROUND_JOBS_LOCK = os.getenv('BACKGROUND_JOBS_LOCK', '/tmp/veritas-background-jobs.lock')
+# Kept open for the life of the worker: closing it releases the lock
+_background_lock = None
+
+
+def init_worker():
+    db_pool.reset()
+    storage.after_fork()
+    db_pool.init_pool()
+
+
+def start_background_jobs():
+    """Start the jobs if no other worker runs them; returns whether this one does"""
+    global _background_lock
+    lock = open(BACKGROUND_JOBS_LOCK, 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return False
+    _background_lock = lock
+    service.start_background_jobs()
+    return True
@@ -2,6 +2,8 @@
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
+-- Trigram indexes for substring search on test case names
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Projects table
 CREATE TABLE IF NOT EXISTS projects (
@@ -33,18 +35,42 @@ CREATE TABLE IF NOT EXISTS test_cases (
     status VARCHAR(20) DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+-- Written by the test manager and the unified service
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS test_type VARCHAR(50) DEFAULT 'unit';
+ALTER TABLE test_cases ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('simple', coalesce(name, '')), 'A') || setweight(to_tsvector('simple', coalesce(description, '')), 'B')) STORED;
 
--- Test executions table
+-- Test executions table, range partitioned by month on start_time.
+-- Future partitions are created and old ones detached by api/partitions.py.
 CREATE TABLE IF NOT EXISTS test_executions (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
     execution_name VARCHAR(255),
     status VARCHAR(20) DEFAULT 'running',
-    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    start_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     end_time TIMESTAMP,
     results JSONB,
-    report_url VARCHAR(500)
-);
+    report_url VARCHAR(500),
+    PRIMARY KEY (id, start_time)
+) PARTITION BY RANGE (start_time);
+
+CREATE TABLE IF NOT EXISTS test_executions_default PARTITION OF test_executions DEFAULT;
+
+-- Current month plus three months ahead
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR i IN 0..3 LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF test_executions FOR VALUES FROM (%L) TO (%L)',
+            'test_executions_p' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::DATE
+        );
+    END LOOP;
+END $$;
 
 -- User stories table
 CREATE TABLE IF NOT EXISTS user_stories (
@@ -67,13 +93,73 @@ CREATE TABLE IF NOT EXISTS test_plans (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Per-test results ingested from JUnit / pytest reports
+CREATE TABLE IF NOT EXISTS test_results (
+    id BIGSERIAL PRIMARY KEY,
+    execution_id UUID NOT NULL,
+    test_case_id UUID,
+    name VARCHAR(1024),
+    classname VARCHAR(1024),
+    status VARCHAR(20) NOT NULL,
+    duration DOUBLE PRECISION,
+    message TEXT,
+    error_details TEXT,
+    error_hash VARCHAR(40),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Retention policies per project (hot window for evidence/reports, temp purge window)
+CREATE TABLE IF NOT EXISTS retention_policies (
+    project_name VARCHAR(255) PRIMARY KEY,
+    hot_days INTEGER NOT NULL DEFAULT 30,
+    temp_hours INTEGER NOT NULL DEFAULT 24,
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Objects moved into archive bundles by the retention engine
+CREATE TABLE IF NOT EXISTS archived_objects (
+    object_key VARCHAR(1024) PRIMARY KEY,
+    archive_key VARCHAR(1024) NOT NULL,
+    size BIGINT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Metadata index mirroring objects stored in MinIO (same definition as api/storage_index.py)
+CREATE TABLE IF NOT EXISTS storage_objects (
+    bucket VARCHAR(255) NOT NULL,
+    object_name VARCHAR(1024) NOT NULL,
+    project VARCHAR(255),
+    storage_type VARCHAR(100),
+    size BIGINT NOT NULL DEFAULT 0,
+    content_type VARCHAR(255),
+    etag VARCHAR(255),
+    last_modified TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (bucket, object_name)
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
 CREATE INDEX IF NOT EXISTS idx_test_suites_project_id ON test_suites(project_id);
 CREATE INDEX IF NOT EXISTS idx_test_cases_suite_id ON test_cases(suite_id);
-CREATE INDEX IF NOT EXISTS idx_test_executions_project_id ON test_executions(project_id);
+CREATE INDEX IF NOT EXISTS idx_test_executions_project_start ON test_executions(project_id, start_time DESC);
+CREATE INDEX IF NOT EXISTS idx_test_executions_start_time ON test_executions(start_time DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_projects_created_id ON projects(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_test_cases_created_id ON test_cases(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_test_cases_suite_created ON test_cases(suite_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_user_stories_project_id ON user_stories(project_id);
 CREATE INDEX IF NOT EXISTS idx_test_plans_project_id ON test_plans(project_id);
+CREATE INDEX IF NOT EXISTS idx_test_results_execution_status ON test_results(execution_id, status);
+CREATE INDEX IF NOT EXISTS idx_test_results_case_created ON test_results(test_case_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_test_results_error_hash ON test_results(error_hash) WHERE error_hash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_test_cases_name ON test_cases(name);
+-- Test case search (api/test_case_search.py)
+CREATE INDEX IF NOT EXISTS idx_test_cases_search ON test_cases USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_test_cases_name_trgm ON test_cases USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_archived_objects_archive_key ON archived_objects(archive_key);
+CREATE INDEX IF NOT EXISTS idx_storage_objects_prefix ON storage_objects(bucket, object_name varchar_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_storage_objects_project_modified ON storage_objects(bucket, project, last_modified);
+CREATE INDEX IF NOT EXISTS idx_storage_objects_modified ON storage_objects(bucket, last_modified);
 
 -- Insert sample data
 INSERT INTO projects (name, repository, description) VALUES 
@@ -93,3 +179,6 @@ $$ language 'plpgsql';
 -- Create trigger for projects table
 CREATE TRIGGER update_projects_updated_at BEFORE UPDATE ON projects
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Row counters for the dashboard statistics (entity_counters, entity_counter_deltas
+-- and their triggers) are created by api/counters.py when the unified service starts
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for RepositoryAnalyzer on synthetic repositories.
+
+Generates repositories with scripts/synthetic_repo.py for each --files size and
+times every analyzer method plus clone_and_analyze from a local bare
+repository, reporting wall time, peak RSS and files per second as JSON:
+
+    python scripts/benchmark-analyzer.py --files 100 --files 1000 --files 5000 --output analyzer.json
+    python scripts/benchmark-analyzer.py --files 1000 --compare analyzer.json
+
+Each method runs in a forked child (--repeat times, after one warm-up call).
+The child resets its peak RSS after the warm-up, and the report gives the
+growth of the peak over the RSS at that point (rss_delta_mb), so the
+interpreter and imported modules do not hide what the method allocates.
+--compare checks time and that delta. Needs the api/
+requirements (gitpython, Flask) to import the analyzer.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+import synthetic_repo
+
+METHODS = [
+    'analyze_structure',
+    'detect_languages',
+    'detect_frameworks',
+    'find_api_endpoints',
+    'find_database_models',
+    'identify_components',
+    'calculate_complexity',
+    'clone_and_analyze',
+]
+
+
+RSS_NOISE_MB = 1.0
+
+
+def _status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def _reset_peak_rss():
+    """Reset VmHWM to the current RSS (Linux 4.0+); False if not supported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _measure(method, repo_path, bare_path, clone_dir, repeat, conn):
+    """Child process: warm up, time repeat calls and report peak RSS"""
+    try:
+        from repository_analyzer import RepositoryAnalyzer
+        analyzer = RepositoryAnalyzer()
+        analyzer.temp_dir = clone_dir
+        if method == 'clone_and_analyze':
+            call = lambda: analyzer.clone_and_analyze(bare_path, 'bench')
+        else:
+            call = lambda: getattr(analyzer, method)(repo_path)
+
+        result = call()
+        if isinstance(result, dict) and result.get('error'):
+            raise RuntimeError(result['error'])
+        reset = _reset_peak_rss()
+        baseline_rss = _status_mb('VmRSS')
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - started)
+        if reset:
+            peak_rss = _status_mb('VmHWM')
+        else:
+            # ru_maxrss is in kilobytes on Linux and includes the warm-up
+            peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        conn.send({'times': times, 'baseline_rss_mb': baseline_rss, 'peak_rss_mb': peak_rss})
+    except Exception as e:
+        conn.send({'error': f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def measure(method, repo_path, bare_path, clone_dir, repeat, files):
+    context = multiprocessing.get_context('fork')
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_measure, args=(method, repo_path, bare_path, clone_dir, repeat, child))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {'error': 'benchmark process died'}
+    process.join()
+    if 'error' in result:
+        return result
+
+    times = result['times']
+    median = statistics.median(times)
+    return {
+        'repeat': len(times),
+        'median_ms': round(median * 1000, 2),
+        'min_ms': round(min(times) * 1000, 2),
+        'max_ms': round(max(times) * 1000, 2),
+        'files_per_s': round(files / median, 1) if median else None,
+        'peak_rss_mb': round(result['peak_rss_mb'], 1),
+        'baseline_rss_mb': round(result['baseline_rss_mb'], 1) if result['baseline_rss_mb'] else None,
+        'rss_delta_mb': round(max(0.0, result['peak_rss_mb'] - result['baseline_rss_mb']), 1)
+        if result['baseline_rss_mb'] else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'repeat': args.repeat,
+        'repositories': {}
+    }
+    workdir = tempfile.mkdtemp(prefix='veritas-analyzer-bench-')
+    try:
+        for files in args.files:
+            repo_path = os.path.join(workdir, f'repo-{files}')
+            total = synthetic_repo.make_repo(repo_path, files=files, lines=args.lines, depth=args.depth,
+                                             languages=args.languages, routes=args.routes, models=args.models)
+            bare_path = synthetic_repo.make_bare(repo_path, repo_path + '.git')
+            clone_dir = os.path.join(workdir, f'clones-{files}')
+            os.makedirs(clone_dir)
+
+            methods = {}
+            for method in args.method:
+                print(f"{files} files: {method}", file=sys.stderr)
+                methods[method] = measure(method, repo_path, bare_path, clone_dir, args.repeat, total)
+            report['repositories'][str(files)] = {
+                'files': total,
+                'depth': args.depth,
+                'methods': methods
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Methods whose median time or RSS growth rose by more than threshold (fraction)"""
+    regressions = []
+    for size, repository in report['repositories'].items():
+        previous_methods = baseline.get('repositories', {}).get(size, {}).get('methods', {})
+        for method, current in repository['methods'].items():
+            previous = previous_methods.get(method)
+            if not previous or 'error' in current or 'error' in previous:
+                continue
+            if current['median_ms'] > previous['median_ms'] * (1 + threshold):
+                regressions.append(f"{size} files {method}: {previous['median_ms']}ms -> {current['median_ms']}ms")
+            current_delta, previous_delta = current.get('rss_delta_mb'), previous.get('rss_delta_mb')
+            if current_delta is None or previous_delta is None:
+                continue
+            # Ignore sub-megabyte changes, which are allocator noise
+            if current_delta > previous_delta * (1 + threshold) and current_delta - previous_delta > RSS_NOISE_MB:
+                regressions.append(f"{size} files {method}: RSS growth {previous_delta}MB -> {current_delta}MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, action='append', help='Repository size in files (repeatable, default 100 and 1000)')
+    parser.add_argument('--lines', type=int, default=80, help='Average lines per file')
+    parser.add_argument('--depth', type=int, default=3, help='Maximum directory nesting')
+    parser.add_argument('--languages', type=synthetic_repo.parse_languages, help='Extension weights, e.g. py=3,js=1,java=1')
+    parser.add_argument('--routes', type=int, default=4, help='Maximum Flask routes per Python file')
+    parser.add_argument('--models', type=int, default=2, help='Maximum SQLAlchemy models per Python file')
+    parser.add_argument('--method', action='append', choices=METHODS, help='Method to time (repeatable, default all)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', help='Baseline report; exit 1 when a method regressed')
+    parser.add_argument('--threshold', type=float, default=20, help='Allowed regression in percent')
+    args = parser.parse_args()
+    args.files = args.files or [100, 1000]
+    args.method = args.method or METHODS
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['baseline'] = {'commit': baseline.get('commit'), 'timestamp': baseline.get('timestamp')}
+        report['regressions'] = compare(report, baseline, args.threshold / 100)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+JSON serialization benchmark on the largest API payloads.
+
+Builds synthetic payloads shaped like the biggest responses and stored
+objects (a full page of test cases as database rows, execution results,
+analytics trends, stored evidence and a speedscope profile) and times them
+through Flask's stock JSON provider and through api/serialization.py:
+
+    python scripts/benchmark-serialization.py --output serialization.json
+    python scripts/benchmark-serialization.py --compare serialization.json
+
+Each payload is measured as a Flask response (jsonify), a cache write
+(compact dumps), a stored object (indented dumps) and a cache read (loads).
+Needs the api/ requirements (Flask, orjson).
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timedelta
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import serialization
+
+STATUSES = ['passed', 'failed', 'skipped', 'error']
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+
+
+def _timestamp(rng):
+    return datetime(2026, 1, 1) + timedelta(seconds=rng.randint(0, 3600 * 24 * 300))
+
+
+def test_case_rows(rng, count):
+    """Rows as the test case listing gets them from psycopg2: UUIDs and datetimes"""
+    return {'test_cases': [{
+        'id': uuid.UUID(int=rng.getrandbits(128)),
+        'suite_id': uuid.UUID(int=rng.getrandbits(128)),
+        'name': f'test_case_{index}_checks_login_redirect',
+        'description': 'Verifies that an unauthenticated user is redirected to the login page ' * 2,
+        'priority': rng.choice(PRIORITIES),
+        'status': 'active',
+        'created_at': _timestamp(rng),
+        'test_type': 'integration'
+    } for index in range(count)]}
+
+
+def execution_results(rng, count):
+    return [{
+        'id': index,
+        'test_case_id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'name': f'test_{index}',
+        'classname': f'tests.module_{index % 50}.TestSuite',
+        'status': rng.choice(STATUSES),
+        'duration': round(rng.random() * 5, 3),
+        'message': 'AssertionError: expected 200, got 500' if rng.random() < 0.1 else None,
+        'error_hash': f'{rng.getrandbits(64):016x}'
+    } for index in range(count)]
+
+
+def trends(rng, count):
+    """Daily quality metrics per project, as served by analytics"""
+    return {'trends': [{
+        'project_id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'date': (datetime(2026, 1, 1) + timedelta(days=day)).date(),
+        'executions': rng.randint(0, 200),
+        'pass_rate': round(rng.random() * 100, 2),
+        'avg_duration': round(rng.random() * 60, 3),
+        'flaky_tests': rng.randint(0, 20)
+    } for day in range(365) for _ in range(max(1, count // 365))]}
+
+
+def evidence(rng, count):
+    return {
+        'execution_id': str(uuid.uuid4()),
+        'project_id': 1,
+        'results': execution_results(rng, count),
+        'timestamp': datetime(2026, 1, 1).isoformat(),
+        'evidence_files': []
+    }
+
+
+def speedscope_profile(rng, count):
+    frames = [{'name': f'function_{index}', 'file': f'/app/module_{index % 40}.py', 'line': index}
+              for index in range(500)]
+    samples = [[rng.randrange(500) for _ in range(rng.randint(5, 40))] for _ in range(count)]
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': 'request', 'unit': 'seconds', 'startValue': 0,
+            'endValue': count / 1000, 'samples': samples, 'weights': [0.001] * count
+        }]
+    }
+
+
+PAYLOADS = {
+    'test_cases_page': (test_case_rows, 500),
+    'execution_results': (execution_results, 5000),
+    'analytics_trends': (trends, 7300),
+    'stored_evidence': (evidence, 5000),
+    'speedscope_profile': (speedscope_profile, 20000),
+}
+
+
+def _time(call, repeat):
+    call()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def measure(payload, repeat):
+    stock_app = Flask('stock')
+    stock_app.json = DefaultJSONProvider(stock_app)
+    fast_app = serialization.install(Flask('fast'))
+    stock_text = json.dumps(payload, default=str)
+    fast_bytes = serialization.dumps(payload)
+
+    cases = {
+        'response': (lambda: stock_app.json.response(payload).get_data(),
+                     lambda: fast_app.json.response(payload).get_data()),
+        'cache_write': (lambda: json.dumps(payload, default=str),
+                        lambda: serialization.dumps(payload)),
+        'stored_object': (lambda: json.dumps(payload, default=str, indent=2).encode('utf-8'),
+                          lambda: serialization.dumps(payload, indent=True)),
+        'cache_read': (lambda: json.loads(stock_text),
+                       lambda: serialization.loads(fast_bytes)),
+    }
+    results = {'bytes': len(fast_bytes)}
+    with stock_app.app_context():
+        for name, (stock, fast) in cases.items():
+            stock_s = _time(stock, repeat)
+            fast_s = _time(fast, repeat)
+            results[name] = {
+                'stdlib_ms': round(stock_s * 1000, 3),
+                'serialization_ms': round(fast_s * 1000, 3),
+                'speedup': round(stock_s / fast_s, 2) if fast_s else None,
+                'mb_per_s': round(len(fast_bytes) / fast_s / 1e6, 1) if fast_s else None
+            }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, threshold):
+    """Cases whose serialization time grew by more than threshold (fraction)"""
+    regressions = []
+    for payload, current in report['payloads'].items():
+        previous_cases = baseline.get('payloads', {}).get(payload, {})
+        for name, result in current.items():
+            previous = previous_cases.get(name)
+            if not isinstance(result, dict) or not previous:
+                continue
+            if result['serialization_ms'] > previous['serialization_ms'] * (1 + threshold):
+                regressions.append(f"{payload} {name}: {previous['serialization_ms']}ms -> {result['serialization_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payload', action='append', choices=list(PAYLOADS), help='Payload to time (repeatable, default all)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for the payload sizes')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', help='Baseline report; exit 1 when a case regressed')
+    parser.add_argument('--threshold', type=float, default=20, help='Allowed regression in percent')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'orjson': getattr(serialization.orjson, '__version__', None),
+        'repeat': args.repeat,
+        'payloads': {}
+    }
+    for name in args.payload or PAYLOADS:
+        build, count = PAYLOADS[name]
+        print(f"{name}", file=sys.stderr)
+        payload = build(random.Random(args.seed), max(1, int(count * args.scale)))
+        report['payloads'][name] = measure(payload, args.repeat)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['baseline'] = {'commit': baseline.get('commit'), 'timestamp': baseline.get('timestamp')}
+        report['regressions'] = compare(report, baseline, args.threshold / 100)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark suite for the unified service.
+
+Boots the service (gunicorn, or uvicorn with --server async) and the
+repository analyzer against local stand-ins, drives a fixed set of realistic
+workloads and writes throughput and latency percentiles as JSON:
+
+    python scripts/benchmark-suite.py --output bench.json
+    python scripts/benchmark-suite.py --compare bench.json      # exit 1 on regression
+
+Stand-ins are started unless an existing dependency is given:
+
+    PostgreSQL   an ephemeral server from the pgserver package  (--postgres-dsn)
+    Redis        an in-memory fakeredis TCP server               (--redis host:port)
+    MinIO        a minimal in-memory S3 server in this script    (--s3 host:port)
+
+Workloads (request counts are multiplied by --scale):
+
+    create_projects     POST /api/projects
+    execution_bursts    POST /api/executions with 100 test results each
+    report_uploads      POST /api/executions/ingest with a 200 test JUnit report
+    dashboard_polling   GET /api/stats, /api/projects and /api/executions, revalidating ETags
+    repo_analysis       POST /api/analyze on a generated synthetic git repository
+
+Requires the api/ requirements plus pgserver and fakeredis for the stand-ins.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+import http.client
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_repo
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, 'api')
+
+WORKLOADS = ['create_projects', 'execution_bursts', 'report_uploads', 'dashboard_polling', 'repo_analysis']
+# Requests per workload at --scale 1
+REQUESTS = {
+    'create_projects': 200,
+    'execution_bursts': 100,
+    'report_uploads': 40,
+    'dashboard_polling': 1500,
+    'repo_analysis': 10,
+}
+RESULTS_PER_EXECUTION = 100
+TESTS_PER_REPORT = 200
+SYNTHETIC_FILES = 300
+
+S3_NS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
+
+# --- Local S3 stand-in -------------------------------------------------------
+
+class S3Handler(BaseHTTPRequestHandler):
+    """Path-style bucket and object operations used by the minio client, kept in memory"""
+    protocol_version = 'HTTP/1.1'
+    buckets = {}
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _split(self):
+        url = urlsplit(self.path)
+        bucket, _, key = url.path.lstrip('/').partition('/')
+        return unquote(bucket), unquote(key), parse_qs(url.query, keep_blank_values=True)
+
+    def _send(self, status, body=b'', headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if 'Content-Length' not in (headers or {}):
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, code):
+        self._send(status, f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code>'
+                           f'<Message>{code}</Message><Resource>{escape(self.path)}</Resource>'
+                           f'<RequestId>0</RequestId></Error>', {'Content-Type': 'application/xml'})
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def do_HEAD(self):
+        bucket, key, _ = self._split()
+        objects = self.buckets.get(bucket)
+        if objects is None:
+            return self._error(404, 'NoSuchBucket')
+        if not key:
+            return self._send(200)
+        entry = objects.get(key)
+        if entry is None:
+            return self._error(404, 'NoSuchKey')
+        self._send(200, b'', self._object_headers(entry, len(entry['data'])))
+
+    def do_PUT(self):
+        bucket, key, _ = self._split()
+        data = self._body()
+        with self.lock:
+            if not key:
+                self.buckets.setdefault(bucket, {})
+                return self._send(200)
+            if bucket not in self.buckets:
+                return self._error(404, 'NoSuchBucket')
+            etag = f'"{uuid.uuid4().hex}"'
+            self.buckets[bucket][key] = {
+                'data': data, 'etag': etag, 'modified': datetime.now(timezone.utc),
+                'type': self.headers.get('Content-Type', 'application/octet-stream')
+            }
+        self._send(200, b'', {'ETag': etag})
+
+    def do_GET(self):
+        bucket, key, query = self._split()
+        objects = self.buckets.get(bucket)
+        if objects is None:
+            return self._error(404, 'NoSuchBucket')
+        if not key and 'location' in query:
+            return self._send(200, f'<?xml version="1.0" encoding="UTF-8"?>'
+                                   f'<LocationConstraint xmlns="{S3_NS}"></LocationConstraint>',
+                              {'Content-Type': 'application/xml'})
+        if not key:
+            return self._list(bucket, objects, query)
+        entry = objects.get(key)
+        if entry is None:
+            return self._error(404, 'NoSuchKey')
+        self._send(200, entry['data'], self._object_headers(entry))
+
+    def do_DELETE(self):
+        bucket, key, _ = self._split()
+        with self.lock:
+            self.buckets.get(bucket, {}).pop(key, None)
+        self._send(204)
+
+    def do_POST(self):
+        bucket, _, query = self._split()
+        if 'delete' not in query:
+            return self._error(501, 'NotImplemented')
+        keys = re.findall(r'<Key>(.*?)</Key>', self._body().decode())
+        with self.lock:
+            for key in keys:
+                self.buckets.get(bucket, {}).pop(key, None)
+        self._send(200, f'<?xml version="1.0" encoding="UTF-8"?><DeleteResult xmlns="{S3_NS}"></DeleteResult>',
+                   {'Content-Type': 'application/xml'})
+
+    @staticmethod
+    def _object_headers(entry, length=None):
+        headers = {
+            'ETag': entry['etag'],
+            'Content-Type': entry['type'],
+            'Last-Modified': entry['modified'].strftime('%a, %d %b %Y %H:%M:%S GMT'),
+        }
+        if length is not None:
+            # HEAD responses carry the object size but no body
+            headers['Content-Length'] = str(length)
+        return headers
+
+    def _list(self, bucket, objects, query):
+        prefix = query.get('prefix', [''])[0]
+        delimiter = query.get('delimiter', [''])[0]
+        after = query.get('start-after', [''])[0] or query.get('continuation-token', [''])[0]
+        max_keys = int(query.get('max-keys', ['1000'])[0])
+
+        contents, prefixes = [], set()
+        with self.lock:
+            keys = sorted(key for key in objects if key.startswith(prefix) and key > after)
+        truncated = False
+        for key in keys:
+            if len(contents) + len(prefixes) >= max_keys:
+                truncated = True
+                break
+            if delimiter and delimiter in key[len(prefix):]:
+                prefixes.add(prefix + key[len(prefix):].split(delimiter, 1)[0] + delimiter)
+                continue
+            contents.append(key)
+
+        parts = [f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{S3_NS}">',
+                 f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix>',
+                 f'<KeyCount>{len(contents) + len(prefixes)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>',
+                 f'<IsTruncated>{str(truncated).lower()}</IsTruncated>']
+        if truncated and contents:
+            parts.append(f'<NextContinuationToken>{escape(contents[-1])}</NextContinuationToken>')
+        for key in contents:
+            entry = objects[key]
+            parts.append(f'<Contents><Key>{escape(key)}</Key>'
+                         f'<LastModified>{entry["modified"].strftime("%Y-%m-%dT%H:%M:%S.000Z")}</LastModified>'
+                         f'<ETag>{escape(entry["etag"])}</ETag><Size>{len(entry["data"])}</Size>'
+                         f'<StorageClass>STANDARD</StorageClass></Contents>')
+        for common in sorted(prefixes):
+            parts.append(f'<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>')
+        parts.append('</ListBucketResult>')
+        self._send(200, ''.join(parts), {'Content-Type': 'application/xml'})
+
+
+def serve_s3(port):
+    ThreadingHTTPServer(('127.0.0.1', port), S3Handler).serve_forever()
+
+
+def serve_redis(port):
+    from fakeredis import TcpFakeServer
+    TcpFakeServer(('127.0.0.1', port), server_type='redis').serve_forever()
+
+
+# --- Environment ---------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on {host}:{port} after {timeout}s")
+
+
+def wait_for_http(port, path, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with {process.returncode} before serving {path}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{path} on port {port} not ready after {timeout}s")
+
+
+class Environment:
+    """Stand-in dependencies and the services under test, stopped on exit"""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix='veritas-bench-')
+        self.processes = []
+        self.logs = []
+        self.postgres = None
+        self.service_port = None
+        self.analyzer_port = None
+        self.analyzer_error = None
+
+    def __enter__(self):
+        try:
+            self.env = dict(os.environ, **self._postgres(), **self._redis(), **self._s3())
+            self._start_service()
+            if 'repo_analysis' in self.args.workload:
+                self._start_analyzer()
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        for process in reversed(self.processes):
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log in self.logs:
+            log.close()
+        if self.postgres is not None:
+            self.postgres.cleanup()
+        if not self.args.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def _spawn(self, name, command, cwd=None, env=None):
+        log = open(os.path.join(self.workdir, f'{name}.log'), 'w')
+        self.logs.append(log)
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def _postgres(self):
+        if self.args.postgres_dsn:
+            from psycopg2.extensions import parse_dsn
+            dsn = parse_dsn(self.args.postgres_dsn)
+        else:
+            import pgserver
+            self.postgres = pgserver.get_server(os.path.join(self.workdir, 'pgdata'), cleanup_mode='stop')
+            from psycopg2.extensions import parse_dsn
+            dsn = parse_dsn(self.postgres.get_uri())
+        # The service creates its own schema on an empty database
+        return {
+            'POSTGRES_HOST': dsn.get('host', 'localhost'),
+            'POSTGRES_PORT': dsn.get('port', '5432'),
+            'POSTGRES_DB': dsn.get('dbname', 'postgres'),
+            'POSTGRES_USER': dsn.get('user', 'postgres'),
+            'POSTGRES_PASSWORD': dsn.get('password', ''),
+        }
+
+    def _redis(self):
+        if self.args.redis:
+            host, port = self.args.redis.rsplit(':', 1)
+        else:
+            host, port = '127.0.0.1', free_port()
+            self._spawn('redis', [sys.executable, __file__, '--serve-redis', str(port)])
+            wait_for_port(host, int(port))
+        return {'REDIS_HOST': host, 'REDIS_PORT': str(port)}
+
+    def _s3(self):
+        if self.args.s3:
+            endpoint = self.args.s3
+        else:
+            port = free_port()
+            self._spawn('s3', [sys.executable, __file__, '--serve-s3', str(port)])
+            wait_for_port('127.0.0.1', port)
+            endpoint = f'127.0.0.1:{port}'
+        return {'MINIO_ENDPOINT': endpoint}
+
+    def _start_service(self):
+        self.service_port = free_port()
+        env = dict(self.env, PORT=str(self.service_port),
+                   GUNICORN_WORKERS=str(self.args.workers),
+                   PROMETHEUS_MULTIPROC_DIR=os.path.join(self.workdir, 'metrics'),
+                   RETENTION_ENABLED='false')
+        os.makedirs(env['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+        if self.args.server == 'async':
+            command = [sys.executable, '-m', 'uvicorn', 'veritas_async_service:app',
+                       '--host', '127.0.0.1', '--port', str(self.service_port), '--loop', 'uvloop',
+                       '--no-access-log']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+        process = self._spawn('service', command, cwd=API_DIR, env=env)
+        wait_for_http(self.service_port, '/health/live', process)
+
+    def _start_analyzer(self):
+        self.analyzer_port = free_port()
+        process = self._spawn('analyzer', [
+            sys.executable, '-m', 'gunicorn', '-b', f'127.0.0.1:{self.analyzer_port}',
+            '-w', str(self.args.workers), '--timeout', '300', 'repository_analyzer:app'
+        ], cwd=API_DIR, env=self.env)
+        try:
+            wait_for_http(self.analyzer_port, '/health', process)
+        except RuntimeError as e:
+            # The analyzer has its own dependencies (gitpython); the rest of the suite still runs
+            self.analyzer_error = str(e)
+
+
+# --- Load generation -------------------------------------------------------------
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Client:
+    """A keep-alive connection per thread"""
+
+    def __init__(self, port, timeout):
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.getheaders(), response.read()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+def response_error(status, payload):
+    """Error text for a failed request, including a 2xx body that reports an error (e.g. /api/analyze)"""
+    if status >= 400:
+        return f"{status} {payload[:200].decode(errors='replace')}"
+    if b'"error"' in payload:
+        try:
+            body = json.loads(payload)
+        except ValueError:
+            return None
+        if isinstance(body, dict) and body.get('error'):
+            return f"{status} {str(body['error'])[:200]}"
+    return None
+
+
+def run_workload(client, requests, concurrency):
+    """Issue requests (callables returning method, path, body, headers) from concurrency threads"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def call(make_request):
+        method, path, body, headers = make_request()
+        started = time.perf_counter()
+        try:
+            status, _, payload = client.request(method, path, body, headers)
+            elapsed = time.perf_counter() - started
+            error = response_error(status, payload)
+        except Exception as e:
+            elapsed, error = time.perf_counter() - started, f"{type(e).__name__}: {e}"
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, requests))
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'concurrency': concurrency,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def json_request(method, path, data):
+    return lambda: (method, path, json.dumps(data), {'Content-Type': 'application/json'})
+
+
+def junit_report(index):
+    cases = []
+    for test in range(TESTS_PER_REPORT):
+        outcome = '<failure message="assertion failed">Traceback</failure>' if test % 17 == 0 else ''
+        cases.append(f'<testcase classname="bench.suite{test % 10}" name="test_{test}" time="0.{test % 10}">{outcome}</testcase>')
+    return (f'<?xml version="1.0" encoding="UTF-8"?><testsuite name="bench-{index}" tests="{TESTS_PER_REPORT}">'
+            + ''.join(cases) + '</testsuite>').encode()
+
+
+def multipart(field, filename, content, content_type):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n').encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def build_requests(name, count, run_id, project_ids, repo_path):
+    if name == 'create_projects':
+        return [json_request('POST', '/api/projects', {'name': f'bench-{run_id}-{i}', 'description': 'benchmark'})
+                for i in range(count)]
+
+    if name == 'execution_bursts':
+        def execution(i):
+            results = [{'name': f'test_{t}', 'classname': f'bench.suite{t % 10}', 'suite': 'bench',
+                        'status': 'failed' if t % 13 == 0 else 'passed', 'duration': (t % 10) / 10}
+                       for t in range(RESULTS_PER_EXECUTION)]
+            return json_request('POST', '/api/executions', {
+                'project_id': project_ids[i % len(project_ids)], 'project_name': f'bench-{run_id}',
+                'execution_name': f'burst {i}', 'test_results': results
+            })
+        return [execution(i) for i in range(count)]
+
+    if name == 'report_uploads':
+        def upload(i):
+            body, headers = multipart('report', f'report-{i}.xml', junit_report(i), 'application/xml')
+            path = f'/api/executions/ingest?project_id={project_ids[i % len(project_ids)]}&format=junit'
+            return lambda: ('POST', path, body, headers)
+        return [upload(i) for i in range(count)]
+
+    if name == 'dashboard_polling':
+        paths = ['/api/stats', '/api/projects?limit=50', '/api/executions?limit=50']
+        etags = {}
+
+        def poll(path):
+            # Dashboards revalidate with the last ETag they saw for each view
+            def make():
+                headers = {'Accept': 'application/json'}
+                if path in etags:
+                    headers['If-None-Match'] = etags[path]
+                return 'GET', path, None, headers
+            return make
+        return [poll(paths[i % len(paths)]) for i in range(count)], etags
+
+    if name == 'repo_analysis':
+        return [json_request('POST', '/api/analyze', {
+            'repository_url': repo_path, 'project_name': f'bench-{run_id}-{i}'
+        }) for i in range(count)]
+
+    raise ValueError(name)
+
+
+def seed_projects(client, run_id, count=10):
+    ids = []
+    for i in range(count):
+        status, _, body = client.request('POST', '/api/projects',
+                                         json.dumps({'name': f'bench-{run_id}-seed-{i}'}),
+                                         {'Content-Type': 'application/json'})
+        if status != 200:
+            raise RuntimeError(f"Could not create seed project: {status} {body[:200]}")
+        ids.append(json.loads(body)['id'])
+    return ids
+
+
+def poll_with_etags(client, requests, etags, concurrency):
+    """dashboard_polling: remember ETags from 200 responses so later polls revalidate"""
+    wrapped = client.request
+
+    def request(method, path, body=None, headers=None):
+        status, response_headers, payload = wrapped(method, path, body, headers)
+        etag = dict((k.lower(), v) for k, v in response_headers).get('etag')
+        if status == 200 and etag:
+            etags[path] = etag
+        return status, response_headers, payload
+
+    client.request = request
+    try:
+        return run_workload(client, requests, concurrency)
+    finally:
+        client.request = wrapped
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    run_id = uuid.uuid4().hex[:8]
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'server': args.server,
+        'workers': args.workers,
+        'scale': args.scale,
+        'workloads': {}
+    }
+
+    with Environment(args) as environment:
+        client = Client(environment.service_port, args.timeout)
+        project_ids = seed_projects(client, run_id)
+
+        repo_path = None
+        if 'repo_analysis' in args.workload:
+            repo_path = os.path.join(environment.workdir, 'synthetic-repo')
+            synthetic_repo.make_repo(repo_path, files=SYNTHETIC_FILES)
+
+        for name in WORKLOADS:
+            if name not in args.workload:
+                continue
+            count = max(1, int(REQUESTS[name] * args.scale))
+            print(f"{name}: {count} requests", file=sys.stderr)
+            if name == 'repo_analysis':
+                if environment.analyzer_error:
+                    report['workloads'][name] = {'error': environment.analyzer_error}
+                    continue
+                analyzer = Client(environment.analyzer_port, max(args.timeout, 300))
+                requests = build_requests(name, count, run_id, project_ids, repo_path)
+                # Cloning and walking the tree is CPU bound; one request per worker
+                report['workloads'][name] = run_workload(analyzer, requests, args.workers)
+                shutil.rmtree('/tmp/repo_analysis', ignore_errors=True)
+            elif name == 'dashboard_polling':
+                requests, etags = build_requests(name, count, run_id, project_ids, repo_path)
+                report['workloads'][name] = poll_with_etags(client, requests, etags, args.concurrency)
+            else:
+                requests = build_requests(name, count, run_id, project_ids, repo_path)
+                report['workloads'][name] = run_workload(client, requests, args.concurrency)
+
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Regressions where p99 grew or throughput dropped by more than threshold (fraction)"""
+    regressions = []
+    for name, current in report['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        if previous.get('p99_ms') and current['p99_ms'] > previous['p99_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p99 {previous['p99_ms']}ms -> {current['p99_ms']}ms")
+        if previous.get('throughput_rps') and current['throughput_rps'] < previous['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workload', action='append', choices=WORKLOADS, help='Workload to run (repeatable, default all)')
+    parser.add_argument('--scale', type=float, default=1, help='Multiplier for the number of requests')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--server', choices=['gunicorn', 'async'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers for the services')
+    parser.add_argument('--postgres-dsn', help='Use this database instead of an ephemeral server')
+    parser.add_argument('--redis', help='host:port of an existing Redis')
+    parser.add_argument('--s3', help='host:port of an existing MinIO')
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    parser.add_argument('--compare', help='Baseline report; exit 1 when a workload regressed')
+    parser.add_argument('--threshold', type=float, default=20, help='Allowed regression in percent')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory (logs, data)')
+    parser.add_argument('--serve-s3', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--serve-redis', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_s3:
+        return serve_s3(args.serve_s3)
+    if args.serve_redis:
+        return serve_redis(args.serve_redis)
+    args.workload = args.workload or WORKLOADS
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report['baseline'] = {'commit': baseline.get('commit'), 'timestamp': baseline.get('timestamp')}
+        report['regressions'] = compare(report, baseline, args.threshold / 100)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+HTTP load generator for comparing the Veritas serving modes.
+
+Keeps --concurrency keep-alive connections busy against the given paths for
+--duration seconds while optionally holding --streams open SSE subscriptions,
+then prints throughput and latency percentiles as JSON:
+
+    python scripts/load-test.py --url http://localhost:8869 --path /api/stats \\
+        --path /api/projects --concurrency 200 --duration 20 --streams 1000
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; returns (status, body_length)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        length = int(headers['content-length'])
+        await reader.readexactly(length)
+        return status, length
+
+    length = 0
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(size + 2)
+            length += size
+            if size == 0:
+                return status, length
+    return status, length
+
+
+async def worker(host, port, paths, deadline, timeout, latencies, errors, index):
+    reader = writer = None
+    sent = index
+    while time.perf_counter() < deadline:
+        path = paths[sent % len(paths)]
+        sent += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port, limit=2 ** 24)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n".encode())
+            status, _ = await asyncio.wait_for(read_response(reader), timeout)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def hold_stream(host, port, path, opened, stop):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        if b' 200 ' not in head.split(b'\r\n', 1)[0]:
+            return
+        opened.append(1)
+        # Drain events and keep-alives until the test ends
+        while not stop.is_set():
+            try:
+                if not await asyncio.wait_for(reader.read(65536), 1):
+                    break
+            except asyncio.TimeoutError:
+                pass
+        writer.close()
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+
+    stop = asyncio.Event()
+    opened = []
+    streams = [
+        asyncio.create_task(hold_stream(host, port, args.stream_path, opened, stop))
+        for _ in range(args.streams)
+    ]
+    if streams:
+        # Give the subscriptions time to connect before measuring
+        await asyncio.sleep(min(10, 1 + args.streams / 500))
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        worker(host, port, args.path, deadline, args.timeout, latencies, errors, i)
+        for i in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    streams_open = len(opened)
+    stop.set()
+    await asyncio.gather(*streams, return_exceptions=True)
+
+    return {
+        'url': args.url,
+        'paths': args.path,
+        'concurrency': args.concurrency,
+        'duration': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': len(errors),
+        'error_samples': [str(e) for e in errors[:5]],
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'streams_requested': args.streams,
+        'streams_open': streams_open
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8869')
+    parser.add_argument('--path', action='append', help='Path to request (repeatable)')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--timeout', type=float, default=5, help='Per-request timeout in seconds')
+    parser.add_argument('--streams', type=int, default=0, help='SSE subscriptions held open during the test')
+    parser.add_argument('--stream-path', default='/api/executions/stream')
+    args = parser.parse_args()
+    args.path = args.path or ['/api/stats']
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
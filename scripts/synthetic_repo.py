@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic git repositories for benchmarking the repository analyzer.
+
+    python scripts/synthetic_repo.py /tmp/synthetic --files 500 --depth 4 --languages py=3,js=1,java=1
+
+The layout mimics a typical service: api/, models/, auth/, static/, tests/,
+docs/ and config/ directories nested up to --depth levels, with Python (Flask
+routes, SQLAlchemy models), JavaScript, TypeScript and Java sources plus the
+framework marker files the analyzer looks for. The same arguments always
+produce the same tree.
+"""
+import os
+import sys
+import random
+import argparse
+import subprocess
+
+DIRECTORIES = ['api', 'api/v1', 'models', 'auth', 'static/js', 'templates/ui', 'tests', 'docs', 'config', 'services/core']
+SUBDIRECTORIES = ['handlers', 'utils', 'internal', 'legacy', 'shared']
+# Relative weight of each extension
+LANGUAGES = {'py': 3, 'js': 1, 'ts': 1, 'java': 1, 'md': 1, 'json': 1}
+
+MARKERS = {
+    'requirements.txt': 'Flask==2.3.3\nSQLAlchemy==2.0.20\n',
+    'package.json': '{"name": "synthetic", "dependencies": {"react": "^18.0.0", "express": "^4.18.0"}}\n',
+    'Dockerfile': 'FROM python:3.11-slim\nCOPY . /app\n',
+    'docker-compose.yml': 'services:\n  app:\n    build: .\n',
+}
+
+GIT_ENV = {'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@localhost',
+           'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@localhost'}
+
+
+def parse_languages(value):
+    """'py=3,js=1' -> {'py': 3, 'js': 1}"""
+    languages = {}
+    for item in value.split(','):
+        extension, _, weight = item.strip().partition('=')
+        languages[extension.lstrip('.')] = float(weight or 1)
+    return languages
+
+
+def _python_source(rng, index, lines, routes, models):
+    out = ['from flask import Flask, jsonify', 'from flask_sqlalchemy import SQLAlchemy', '',
+           'app = Flask(__name__)', 'db = SQLAlchemy(app)', '']
+    for model in range(rng.randint(0, models)):
+        out += [f'class Model{index}_{model}(db.Model):', '    id = db.Column(db.Integer, primary_key=True)', '']
+    for route in range(rng.randint(1, routes) if routes else 0):
+        out += [f"@app.route('/api/resource{index}/{route}', methods=['GET'])",
+                f'def handler_{index}_{route}():', f"    return jsonify({{'id': {route}}})", '']
+    while len(out) < lines:
+        out.append(f'value_{len(out)} = {rng.randint(0, 10 ** 6)}  # filler')
+    return '\n'.join(out) + '\n'
+
+
+def _generic_source(rng, index, extension, lines):
+    comment = '#' if extension == '.md' else '//'
+    out = [f'{comment} synthetic file {index}{extension}']
+    while len(out) < lines:
+        out.append(f'{comment} line {len(out)} {rng.random():.6f}')
+    return '\n'.join(out) + '\n'
+
+
+def make_repo(path, files=200, lines=80, seed=42, depth=2, languages=None, routes=4, models=2, commit=True):
+    """Create a repository at path; returns the number of files written.
+
+    routes and models are the maximum Flask routes and SQLAlchemy models per
+    Python file; depth is the maximum directory nesting.
+    """
+    rng = random.Random(seed)
+    languages = languages or LANGUAGES
+    extensions = [f'.{extension}' for extension in languages]
+    weights = list(languages.values())
+
+    os.makedirs(path, exist_ok=True)
+    for name, content in MARKERS.items():
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(content)
+
+    for index in range(files):
+        parts = rng.choice(DIRECTORIES).split('/')
+        while len(parts) < depth and rng.random() < 0.5:
+            parts.append(rng.choice(SUBDIRECTORIES))
+        directory = os.path.join(path, *parts[:max(depth, 1)])
+        os.makedirs(directory, exist_ok=True)
+        extension = rng.choices(extensions, weights)[0]
+        file_lines = max(5, int(rng.gauss(lines, lines / 3)))
+        if extension == '.py':
+            content = _python_source(rng, index, file_lines, routes, models)
+        else:
+            content = _generic_source(rng, index, extension, file_lines)
+        with open(os.path.join(directory, f'module_{index}{extension}'), 'w') as f:
+            f.write(content)
+
+    if commit:
+        env = dict(os.environ, **GIT_ENV)
+        for command in (['git', 'init', '-q'], ['git', 'add', '-A'], ['git', 'commit', '-q', '-m', 'synthetic']):
+            subprocess.run(command, cwd=path, env=env, check=True, stdout=subprocess.DEVNULL)
+    return files + len(MARKERS)
+
+
+def make_bare(path, bare_path):
+    """Bare clone of the repository at path, as a local remote for clone benchmarks"""
+    subprocess.run(['git', 'clone', '-q', '--bare', path, bare_path], check=True, stdout=subprocess.DEVNULL)
+    return bare_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path')
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=80, help='Average lines per file')
+    parser.add_argument('--depth', type=int, default=2, help='Maximum directory nesting')
+    parser.add_argument('--languages', type=parse_languages, help='Extension weights, e.g. py=3,js=1,ts=1,java=1')
+    parser.add_argument('--routes', type=int, default=4, help='Maximum Flask routes per Python file')
+    parser.add_argument('--models', type=int, default=2, help='Maximum SQLAlchemy models per Python file')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    print(make_repo(args.path, args.files, args.lines, args.seed, args.depth, args.languages, args.routes, args.models))
+
+
+if __name__ == '__main__':
+    sys.exit(main())